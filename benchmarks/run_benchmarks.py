@@ -0,0 +1,282 @@
+"""Benchmarks for the competition hot paths.
+
+Run from the repository root:
+
+    python -m benchmarks.run_benchmarks --output bench.json
+    python -m benchmarks.run_benchmarks --compare bench.json   # against an earlier commit's results
+
+Everything runs offline; the end-to-end benchmark uses the mock provider.
+"""
+import argparse
+import itertools
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import timeit
+from pathlib import Path
+
+ROOT = Path(__file__).parent.parent
+
+# Realistic model output around the riddle JSON: fences, prose, escaped quotes, odd quoting
+MESSY_RESPONSES = [
+    '{"type": "word", "riddle": "What has keys but can\'t open locks?", "answer": "A piano"}',
+    '```json\n{\n    "type": "word",\n    "riddle": "What gets wetter the more it dries?",\n    "answer": "A towel"\n}\n```',
+    'Here is a unique riddle for you:\n\n{\n  "type": "math",\n  "riddle": "What is 457 multiplied by 23?",\n'
+    '  "answer": "10511",\n  "solution": "457 * 23 = 10511"\n}\n\nI hope you enjoy it!',
+    "{'type': 'word', 'riddle': 'What has a head and a tail but no body?', 'answer': 'A coin'}",
+    '{\\"type\\": \\"word\\", \\"riddle\\": \\"What has hands but can\'t clap?\\", \\"answer\\": \\"A clock\\"}',
+    '{type: "math", riddle: "If you have 12 apples and give away 5, how many are left?", answer: "7", '
+    'solution: "12 - 5 = 7"}',
+    'Sure! {"type": "word", "riddle": "I\'m tall when I\'m young, and short when I\'m old. What am I?", '
+    '"answer": "A candle"',
+]
+
+MOCK_CONFIG = {
+    "llm_configs": [
+        {"provider": f"mock-{i}", "adapter": "mock", "model": f"mock-model-{i}",
+         "options": {"seed": i, "latency": {"distribution": "fixed", "ms": 20}, "accuracy": 0.8},
+         "rate_limits": {"max_retries": 3, "base_delay": 0.01}}
+        for i in range(4)
+    ],
+    "cache": {"mode": "off"}
+}
+
+
+def measure(fn, repeat=5):
+    """Seconds per call of fn: best and median over repeat timing runs of autoranged length"""
+    timer = timeit.Timer(fn)
+    number, _ = timer.autorange()
+    runs = [elapsed / number for elapsed in timer.repeat(repeat=repeat, number=number)]
+    return {"best": min(runs), "median": statistics.median(runs), "calls_per_run": number, "runs": repeat}
+
+
+def synthetic_riddles(count, seed=0):
+    """Distinct made-up riddles, like the mock provider's, for filling similarity history"""
+    from riddlegenerator.mock_provider import _pseudo_word
+    rng = random.Random(seed)
+    return [f"I am {_pseudo_word(rng.random())} in the {_pseudo_word(rng.random())} and "
+            f"{_pseudo_word(rng.random())} by the {_pseudo_word(rng.random())}. What am I?"
+            for _ in range(count)]
+
+
+def result_rows(count, seed=0):
+    """Result rows resampled from the checked-in results file"""
+    from riddlegenerator.result_sink import read_results
+    sample = read_results(ROOT / 'riddle_competition_results.csv').to_dict('records')
+    rng = random.Random(seed)
+    return [dict(rng.choice(sample), Round=i // 12 + 1) for i in range(count)]
+
+
+def bench_extract_json(generator):
+    results = {}
+    for i, response in enumerate(MESSY_RESPONSES):
+        def extract():
+            try:
+                generator._extract_json(response)
+            except Exception:
+                pass
+        results[f"extract_json[{i}]"] = measure(extract)
+    return results
+
+
+def bench_similarity(generator, sizes):
+    results = {}
+    queries = synthetic_riddles(200, seed=1)
+    for size in sizes:
+        generator.used_riddles = synthetic_riddles(size)
+        generator.riddle_index = type(generator.riddle_index)()
+        generator._indexed_riddles = 0
+        start = time.perf_counter()
+        generator._is_similar_riddle(queries[0])  # Indexes the history
+        index_seconds = time.perf_counter() - start
+
+        cycle = itertools.cycle(queries)
+        results[f"is_similar_riddle[history={size}]"] = dict(measure(lambda: generator._is_similar_riddle(next(cycle))),
+                                                             index_seconds=index_seconds)
+    return results
+
+
+def bench_check_answer(competition, bulk_size):
+    from riddlegenerator.answer_scoring import score_answers
+    rows = result_rows(bulk_size)
+    pairs = [(row['Given Answer'], row['Correct Answer']) for row in rows]
+    cycle = itertools.cycle(pairs)
+    results = {"check_answer": measure(lambda: competition._check_answer(*next(cycle)))}
+
+    given, correct = zip(*pairs)
+    results[f"score_answers[rows={bulk_size}]"] = measure(lambda: score_answers(given, correct), repeat=3)
+    return results
+
+
+def bench_generate_report(competition, sizes, work_dir):
+    from riddlegenerator.result_sink import open_result_sink
+    import pandas as pd
+    results = {}
+    for size in sizes:
+        path = os.path.join(work_dir, f"results-{size}.csv")
+        sink = open_result_sink(path)
+        sink.write_frame(pd.DataFrame(result_rows(size)))
+        results[f"generate_report[rows={size}]"] = measure(lambda: competition._generate_report(sink), repeat=3)
+        sink.close()
+    return results
+
+
+# Python snippets timed in a fresh interpreter each, as a CLI run or short script would pay for them
+STARTUP_SNIPPETS = {
+    "import_competition": "import riddlegenerator.riddle_competition",
+    "create_generator": "from riddlegenerator.riddle_generator import RiddleGenerator; "
+                        "RiddleGenerator(config_path={config_path!r}).close()",
+    "create_generator[all_providers]": "from riddlegenerator.riddle_generator import RiddleGenerator; "
+                                       "RiddleGenerator().close()",
+    "cli_help": "import runpy, sys; sys.argv = ['run_competition.py', '--help']\n"
+                "try: runpy.run_path('run_competition.py', run_name='__main__')\n"
+                "except SystemExit: pass",
+}
+VENDOR_MODULES = ("openai", "anthropic", "groq", "google.generativeai", "pandas", "icecream")
+
+
+def bench_startup(config_path, repeat=5):
+    """Wall time of fresh interpreters doing STARTUP_SNIPPETS, and the heavy modules each one loaded"""
+    # Dummy keys so every real provider's adapter is built, as on a configured machine
+    env = dict(os.environ, **{f"{provider}_API_KEY": os.environ.get(f"{provider}_API_KEY", "unused")
+                              for provider in ("GROQ", "OPENAI", "GOOGLE", "ANTHROPIC")})
+    results = {}
+    for name, snippet in STARTUP_SNIPPETS.items():
+        code = (snippet.format(config_path=config_path) +
+                f"\nimport sys; print('loaded:' + ','.join(m for m in {VENDOR_MODULES!r} if m in sys.modules))")
+        runs = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            output = subprocess.run([sys.executable, "-c", code], cwd=ROOT, env=env, capture_output=True,
+                                    text=True, check=True).stdout
+            runs.append(time.perf_counter() - start)
+        loaded = output.rsplit("loaded:", 1)[-1].strip()
+        results[f"startup[{name}]"] = {"best": min(runs), "median": statistics.median(runs), "runs": repeat,
+                                       "modules_loaded": [m for m in loaded.split(",") if m]}
+    return results
+
+
+def bench_end_to_end(config_path, rounds):
+    from riddlegenerator.riddle_competition import RiddleCompetition
+    results = {}
+    for name, options in [("sequential", {}), ("threads", {"concurrency": "threads"}),
+                          ("asyncio", {"concurrency": "asyncio"}),
+                          ("asyncio+pipeline", {"concurrency": "asyncio", "pipeline_depth": 4})]:
+        runs = []
+        for _ in range(3):
+            competition = RiddleCompetition(riddles_per_llm=rounds, config_path=config_path, **options)
+            start = time.perf_counter()
+            report = competition.run_competition()
+            runs.append(time.perf_counter() - start)
+            competition.generator.close()
+        answers = len(report['detailed_results'])
+        results[f"run_competition[{name}]"] = {
+            "best": min(runs), "median": statistics.median(runs), "runs": len(runs),
+            "answers": answers, "answers_per_second": answers / statistics.median(runs)
+        }
+    return results
+
+
+def run(quick=False):
+    from riddlegenerator.riddle_competition import RiddleCompetition
+    history_sizes = [10, 100, 1000] if quick else [10, 100, 1000, 10000, 100000]
+    report_sizes = [1000, 10000] if quick else [10000, 100000, 1000000]
+    bulk_size = 10000 if quick else 1000000
+
+    results = {}
+    with tempfile.TemporaryDirectory() as work_dir:
+        config_path = os.path.join(work_dir, 'mock_config.json')
+        with open(config_path, 'w') as f:
+            json.dump(MOCK_CONFIG, f)
+        competition = RiddleCompetition(riddles_per_llm=2, config_path=config_path)
+
+        results.update(bench_startup(config_path, repeat=3 if quick else 5))
+        with _quiet():
+            results.update(bench_extract_json(competition.generator))
+        results.update(bench_similarity(competition.generator, history_sizes))
+        results.update(bench_check_answer(competition, bulk_size))
+        results.update(bench_generate_report(competition, report_sizes, work_dir))
+        with _quiet():
+            results.update(bench_end_to_end(config_path, rounds=2 if quick else 4))
+        competition.generator.close()
+    return results
+
+
+class _quiet:
+    """Silence the progress output and icecream warnings of the code under test"""
+
+    def __enter__(self):
+        from icecream import ic
+        self._stdout = sys.stdout
+        sys.stdout = open(os.devnull, 'w')
+        ic.disable()
+
+    def __exit__(self, *exc):
+        from icecream import ic
+        sys.stdout.close()
+        sys.stdout = self._stdout
+        ic.enable()
+
+
+def metadata():
+    try:
+        commit = subprocess.run(['git', 'rev-parse', 'HEAD'], cwd=ROOT, capture_output=True,
+                                text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {"commit": commit, "python": platform.python_version(), "platform": platform.platform(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z")}
+
+
+def compare(baseline, current, max_regression):
+    """Print the change of each benchmark's median against a baseline; return the names that regressed"""
+    regressions = []
+    print(f"\n{'benchmark':45} {'baseline':>12} {'current':>12} {'change':>8}")
+    for name, result in current.items():
+        if name not in baseline:
+            continue
+        before, after = baseline[name]['median'], result['median']
+        change = (after - before) / before * 100 if before else 0.0
+        flag = ""
+        if change > max_regression:
+            regressions.append(name)
+            flag = "  REGRESSION"
+        print(f"{name:45} {before:12.6f} {after:12.6f} {change:+7.1f}%{flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the riddle competition hot paths')
+    parser.add_argument('--output', type=str, default='benchmark_results.json',
+                        help='JSON file for the results (default: benchmark_results.json)')
+    parser.add_argument('--quick', action='store_true',
+                        help='Smaller sizes for a fast smoke run')
+    parser.add_argument('--compare', type=str, default=None,
+                        help='Earlier results JSON to compare medians against')
+    parser.add_argument('--max-regression', type=float, default=10.0,
+                        help='Percent slowdown that counts as a regression with --compare (default: 10)')
+    args = parser.parse_args()
+
+    results = run(quick=args.quick)
+    for name, result in results.items():
+        print(f"{name:45} median {result['median']:.6f}s  best {result['best']:.6f}s")
+
+    with open(args.output, 'w') as f:
+        json.dump({"meta": metadata(), "results": results}, f, indent=2)
+    print(f"\nBenchmark results saved to {args.output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        if compare(baseline['results'], results, args.max_regression):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
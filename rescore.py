@@ -0,0 +1,55 @@
+import argparse
+from riddlegenerator.debug import ic
+from riddlegenerator.rescore import JUDGES, LLMJudge, Rescorer
+from riddlegenerator.result_sink import SINK_FORMATS
+
+
+
+def main():
+    # Set up command line argument parsing
+    parser = argparse.ArgumentParser(description='Recompute Is Correct for saved competition results')
+    parser.add_argument('input', type=str,
+                       help='Results file written by run_competition.py')
+    parser.add_argument('output', type=str,
+                       help='New file for the rescored results')
+    parser.add_argument('--judge', choices=tuple(JUDGES) + ('llm',), default='heuristic',
+                       help='How answers are judged (default: heuristic, the competition\'s own check)')
+    parser.add_argument('--judge-provider', type=str, default=None,
+                       help='Provider of the LLM judge (default: first entry in the config)')
+    parser.add_argument('--judge-model', type=str, default=None,
+                       help='Model of the LLM judge (default: first entry in the config)')
+    parser.add_argument('--workers', type=int, default=None,
+                       help='Worker processes, or concurrent judge calls for the LLM judge (default: CPU count / 8)')
+    parser.add_argument('--chunksize', type=int, default=50000,
+                       help='Rows read and scored at a time (default: 50000)')
+    parser.add_argument('--format', choices=SINK_FORMATS, default=None,
+                       help='Format of the output file (default: from the file extension, else csv)')
+    
+    args = parser.parse_args()
+    
+    try:
+        judge = args.judge
+        if judge == 'llm':
+            # Only the LLM judge needs provider clients
+            from riddlegenerator.riddle_generator import RiddleGenerator
+            generator = RiddleGenerator()
+            default_config = generator.config['llm_configs'][0]
+            judge = LLMJudge(generator,
+                             args.judge_provider or default_config['provider'],
+                             args.judge_model or default_config['model'],
+                             max_workers=args.workers or 8)
+        
+        stats = Rescorer(judge=judge, workers=args.workers, chunksize=args.chunksize).run(
+            args.input, args.output, output_format=args.format)
+        
+        print(f"Rescored {stats['rows']} answers, {stats['changed']} verdicts changed")
+        for key, count in sorted(stats['correct'].items()):
+            print(f"{key}: {count} correct")
+        print(f"\nRescored results saved to {args.output}")
+        
+    except Exception as e:
+        ic(e)
+        raise
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+import math
+import re
+from difflib import SequenceMatcher
+from functools import lru_cache
+from riddlegenerator.riddle_index import normalize_text
+
+try:
+    from rapidfuzz import fuzz, process
+except ImportError:  # Optional: only speeds up bulk scoring
+    fuzz = process = None
+
+SIMILARITY_THRESHOLD = 0.8  # Word answers must be at least this similar to the correct answer
+_NUMBER = re.compile(r'-?\d+\.?\d*')
+
+
+@lru_cache(maxsize=1 << 16)
+def _normalized(text):
+    """Normalized answer text, cached because the same answers repeat across rounds"""
+    return normalize_text(text)
+
+
+@lru_cache(maxsize=1 << 16)
+def _first_number(normalized):
+    """First number in a normalized answer, or None"""
+    match = _NUMBER.search(normalized)
+    return float(match.group()) if match else None
+
+
+def _is_numeric(normalized):
+    return any(char.isdigit() for char in normalized)
+
+
+def answer_text(value):
+    """Answer as a string, treating missing values (None/NaN from a CSV) as empty"""
+    if value is None or (isinstance(value, float) and math.isnan(value)):
+        return ''
+    return str(value)
+
+
+def answer_line(text):
+    """First complete answer line of a reply that is still being streamed, or None.
+
+    A line is complete once the newline after it has arrived; empty lines, code fences and
+    lead-ins ending in a colon ("The answer is:") are skipped.
+    """
+    for line in text.split('\n')[:-1]:  # The last line may still be growing
+        line = line.strip()
+        if line and not line.endswith(':') and not line.startswith('```'):
+            return line
+    return None
+
+
+def _similar(given, correct, threshold=SIMILARITY_THRESHOLD):
+    """SequenceMatcher similarity test, cheapest bounds first"""
+    if given == correct:
+        return True
+    matcher = SequenceMatcher(None, given, correct)
+    return (matcher.real_quick_ratio() > threshold
+            and matcher.quick_ratio() > threshold
+            and matcher.ratio() > threshold)
+
+
+def check_answer(given_answer, correct_answer, threshold=SIMILARITY_THRESHOLD):
+    """Check if the given answer matches the correct answer.
+
+    Math answers (a correct answer containing digits) compare their first numbers; word
+    answers need a SequenceMatcher ratio above threshold after normalization.
+    """
+    given = _normalized(answer_text(given_answer))
+    correct = _normalized(answer_text(correct_answer))
+
+    if _is_numeric(correct):
+        given_num, correct_num = _first_number(given), _first_number(correct)
+        if given_num is not None and correct_num is not None:
+            return given_num == correct_num
+        return False
+    return _similar(given, correct, threshold)
+
+
+def score_answers(given_answers, correct_answers, threshold=SIMILARITY_THRESHOLD):
+    """Score many (given, correct) answer pairs at once; returns a boolean numpy array.
+
+    Gives the same verdicts as check_answer. Each distinct pair is scored once, and word
+    pairs are first screened in bulk with rapidfuzz when it is installed: its Indel ratio
+    is never below SequenceMatcher's, so pairs it rejects need no further work.
+    """
+    given_answers = [answer_text(value) for value in given_answers]
+    correct_answers = [answer_text(value) for value in correct_answers]
+    if len(given_answers) != len(correct_answers):
+        raise ValueError("given_answers and correct_answers must be the same length")
+
+    import numpy as np
+    # Score each distinct pair once and map the verdicts back to every row
+    pair_ids = {}
+    inverse = np.fromiter((pair_ids.setdefault(pair, len(pair_ids))
+                           for pair in zip(given_answers, correct_answers)),
+                          dtype=np.int64, count=len(given_answers))
+    givens = [_normalized(given) for given, _ in pair_ids]
+    corrects = [_normalized(correct) for _, correct in pair_ids]
+    verdicts = np.zeros(len(pair_ids), dtype=bool)
+
+    words = []
+    for i, (given, correct) in enumerate(zip(givens, corrects)):
+        if _is_numeric(correct):
+            given_num, correct_num = _first_number(given), _first_number(correct)
+            verdicts[i] = given_num is not None and correct_num is not None and given_num == correct_num
+        else:
+            words.append(i)
+
+    if words:
+        candidates = words
+        if process is not None:
+            upper_bounds = process.cpdist([givens[i] for i in words], [corrects[i] for i in words],
+                                          scorer=fuzz.ratio, workers=-1)
+            candidates = [i for i, bound in zip(words, upper_bounds) if bound > threshold * 100 - 1e-3]
+        for i in candidates:
+            verdicts[i] = _similar(givens[i], corrects[i], threshold)
+
+    return verdicts[inverse]
+
+
+def score_frame(df, given_column='Given Answer', correct_column='Correct Answer', threshold=SIMILARITY_THRESHOLD):
+    """Score a DataFrame of results, returning an 'Is Correct' boolean Series"""
+    import pandas as pd
+    return pd.Series(score_answers(df[given_column], df[correct_column], threshold),
+                     index=df.index, name='Is Correct')
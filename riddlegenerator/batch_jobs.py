@@ -0,0 +1,139 @@
+import asyncio
+import json
+import os
+import re
+import time
+import uuid
+from riddlegenerator.debug import ic
+
+
+class BatchJobRunner:
+    """Runs prompts through provider batch APIs for offline, non-interactive competitions.
+
+    Requests are grouped by provider and model (batch APIs take one model per batch),
+    written to the provider's batch JSONL format in work_dir, submitted, and polled until
+    every batch has finished. Providers whose
+    adapter has no batch API are asked directly instead, concurrently.
+
+    A batch keeps running (and is billed) whether or not polling it works, so errors while
+    polling are retried on the next poll; its requests only fail once the batch itself
+    fails or max_poll_errors polls in a row have gone wrong.
+    """
+
+    def __init__(self, generator, work_dir="batches", poll_interval=60, temperature=0.1, max_poll_errors=5):
+        self.generator = generator
+        self.work_dir = work_dir
+        self.poll_interval = poll_interval
+        self.temperature = temperature
+        self.max_poll_errors = max_poll_errors
+
+    def run(self, requests):
+        """Answer every request; see arun"""
+        return self.generator.run_async(self.arun(requests))
+
+    async def arun(self, requests):
+        """Answer requests given as dicts with custom_id, provider, model, prompt and optional system_prompt.
+
+        Returns {custom_id: (response, error)}, with the response stripped as in get_raw_response.
+        """
+        groups = {}  # (provider, model) -> requests
+        for request in requests:
+            groups.setdefault((request['provider'], request['model']), []).append(request)
+
+        results = {}
+        batches = {}  # (provider, model) -> batch id
+        live = []
+        for (provider, model), group_requests in groups.items():
+            try:
+                adapter = self.generator._get_adapter(provider)
+            except Exception as e:
+                results.update({r['custom_id']: (None, e) for r in group_requests})
+                continue
+
+            if not adapter.supports_batch:
+                live.extend(group_requests)
+                continue
+
+            path = self._write_batch_file(provider, model, adapter, group_requests)
+            try:
+                batches[(provider, model)] = await adapter.submit_batch(path)
+                print(f"Submitted {len(group_requests)} {provider} {model} requests "
+                      f"as batch {batches[(provider, model)]}")
+            except Exception as e:
+                ic(f"Failed to submit {provider} {model} batch: {str(e)}")
+                results.update({r['custom_id']: (None, e) for r in group_requests})
+
+        if live:
+            results.update(await self._answer_live(live))
+        results.update(await self._collect_batches(batches, groups))
+        return results
+
+    def _write_batch_file(self, provider, model, adapter, requests):
+        """Write the requests for one provider and model to a new JSONL file and return its path"""
+        os.makedirs(self.work_dir, exist_ok=True)
+        # Model names may contain slashes; the uuid keeps files written in the same second apart
+        safe_model = re.sub(r'[^\w.-]', '_', model)
+        path = os.path.join(self.work_dir, f"{provider}-{safe_model}-{int(time.time())}-{uuid.uuid4().hex[:8]}.jsonl")
+        with open(path, 'w', encoding='utf-8') as f:
+            for request in requests:
+                line = adapter.batch_line(request['custom_id'], request['model'], request['prompt'],
+                                          system_prompt=request.get('system_prompt'),
+                                          temperature=self.temperature,
+                                          max_tokens=self.generator.max_tokens['solver'])
+                f.write(json.dumps(line) + "\n")
+        return path
+
+    async def _answer_live(self, requests):
+        """Ask providers without a batch API directly"""
+        async def ask(request):
+            try:
+                response = await self.generator.aget_raw_response(
+                    request['provider'], request['model'], request['prompt'], request.get('system_prompt')
+                )
+                return request['custom_id'], (response, None)
+            except Exception as e:
+                return request['custom_id'], (None, e)
+
+        return dict(await asyncio.gather(*(ask(request) for request in requests)))
+
+    async def _collect_batches(self, batches, groups):
+        """Poll submitted batches until they finish and gather their results"""
+        results = {}
+        pending = dict(batches)
+        poll_errors = {group: 0 for group in pending}  # Failed polls in a row per batch
+        while pending:
+            for (provider, model), batch_id in list(pending.items()):
+                group = (provider, model)
+                adapter = self.generator._get_adapter(provider)
+                try:
+                    status = await adapter.batch_status(batch_id)
+                    if status == "in_progress":
+                        poll_errors[group] = 0
+                        continue
+                    completions = None if status == "failed" else await adapter.batch_results(batch_id)
+                except Exception as e:
+                    poll_errors[group] += 1
+                    if poll_errors[group] < self.max_poll_errors:
+                        ic(f"Error polling {provider} batch {batch_id} ({poll_errors[group]} in a row), "
+                           f"retrying: {str(e)}")
+                        continue
+                    ic(f"Giving up on {provider} batch {batch_id} after {poll_errors[group]} errors: {str(e)}")
+                    completions = {request['custom_id']: e for request in groups[group]}
+                if completions is None:
+                    error = Exception(f"Batch {batch_id} failed")
+                    ic(f"{provider} batch {batch_id} failed")
+                    completions = {request['custom_id']: error for request in groups[group]}
+
+                for request in groups[group]:
+                    outcome = completions.get(request['custom_id'],
+                                              Exception(f"No result for {request['custom_id']} in batch {batch_id}"))
+                    if isinstance(outcome, Exception):
+                        results[request['custom_id']] = (None, outcome)
+                    else:
+                        results[request['custom_id']] = (outcome.text.strip(), None)
+                print(f"{provider} batch {batch_id} finished")
+                del pending[group]
+
+            if pending:
+                await asyncio.sleep(self.poll_interval)
+        return results
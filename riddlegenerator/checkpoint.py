@@ -0,0 +1,56 @@
+import json
+import os
+import time
+
+CHECKPOINT_VERSION = 1
+
+# Minimum seconds between two saves of a running competition's progress
+DEFAULT_CHECKPOINT_INTERVAL = 30
+
+
+class Checkpoint:
+    """Progress of a competition saved as JSON, so an interrupted run can be resumed.
+
+    Each save writes a temporary file and renames it over the old checkpoint, so a crash
+    while saving leaves the previous checkpoint intact. Saving rewrites the whole state, so
+    callers only save once due(): at most every interval seconds.
+    """
+
+    def __init__(self, path, interval=None):
+        self.path = str(path)
+        self.interval = DEFAULT_CHECKPOINT_INTERVAL if interval is None else interval
+        self._saved_at = None  # time.monotonic() of the last save
+
+    def exists(self):
+        return os.path.exists(self.path)
+
+    def due(self):
+        """Whether the interval since the last save has passed"""
+        return self._saved_at is None or time.monotonic() - self._saved_at >= self.interval
+
+    def load(self):
+        """Return the saved state, or None if there is no checkpoint"""
+        if not self.exists():
+            return None
+        with open(self.path, 'r', encoding='utf-8') as f:
+            state = json.load(f)
+        if state.get('version') != CHECKPOINT_VERSION:
+            raise ValueError(f"Unsupported checkpoint version in {self.path}: {state.get('version')}")
+        return state
+
+    def save(self, state):
+        """Atomically replace the checkpoint with state"""
+        if os.path.dirname(self.path):
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(dict(state, version=CHECKPOINT_VERSION), f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
+        self._saved_at = time.monotonic()
+
+    def delete(self):
+        """Remove the checkpoint, e.g. once the run it was for has finished"""
+        if self.exists():
+            os.remove(self.path)
@@ -0,0 +1,4 @@
+def ic(*args):
+    """icecream's ic, imported on first use since icecream takes a while to import"""
+    from icecream import ic as icecream_ic
+    return icecream_ic(*args)
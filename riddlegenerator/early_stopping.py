@@ -0,0 +1,65 @@
+import math
+from statistics import NormalDist
+
+
+def wilson_interval(successes, trials, confidence=0.95):
+    """Wilson score interval (low, high) for a success rate; (0.0, 1.0) without any trials"""
+    if trials == 0:
+        return 0.0, 1.0
+    z = NormalDist().inv_cdf((1 + confidence) / 2)
+    rate = successes / trials
+    denominator = 1 + z * z / trials
+    centre = (rate + z * z / (2 * trials)) / denominator
+    margin = z * math.sqrt(rate * (1 - rate) / trials + z * z / (4 * trials * trials)) / denominator
+    return max(0.0, centre - margin), min(1.0, centre + margin)
+
+
+class RankingMonitor:
+    """Decides when the solvers' ranking by success rate is settled, so the remaining rounds can be skipped.
+
+    Every solver gets a Wilson interval for its success rate at the given confidence. The
+    ranking is settled once every solver has at least min_answers answers and each pair of
+    neighbours in it is either separated (their intervals don't overlap) or tied (both
+    intervals together span at most tie_margin), so more rounds wouldn't reorder it. With
+    top, only the first top places need settling, e.g. top=1 stops once the winner is clear.
+    """
+
+    def __init__(self, confidence=0.95, min_answers=10, tie_margin=0.1, top=None):
+        if not 0 < confidence < 1:
+            raise ValueError(f"confidence must be between 0 and 1, not {confidence}")
+        self.confidence = confidence
+        self.min_answers = min_answers
+        self.tie_margin = tie_margin
+        self.top = top
+
+    @classmethod
+    def from_config(cls, config):
+        """Build from an 'early_stopping' config entry; the 'enabled' key is for the caller"""
+        return cls(confidence=config.get('confidence', 0.95),
+                   min_answers=config.get('min_answers', 10),
+                   tie_margin=config.get('tie_margin', 0.1),
+                   top=config.get('top'))
+
+    def intervals(self, correct, answered):
+        """Solver -> (low, high) interval from {solver: correct answers} and {solver: answers}"""
+        return {solver: wilson_interval(correct.get(solver, 0), answered[solver], self.confidence)
+                for solver in answered}
+
+    def ranking(self, correct, answered):
+        """Solvers from the highest success rate to the lowest"""
+        return sorted(answered, key=lambda solver: -correct.get(solver, 0) / max(answered[solver], 1))
+
+    def settled(self, correct, answered):
+        """Whether the ranking of the solvers in answered is settled at this monitor's confidence"""
+        if len(answered) < 2 or min(answered.values()) < self.min_answers:
+            return False
+        intervals = self.intervals(correct, answered)
+        ranking = self.ranking(correct, answered)
+        neighbours = list(zip(ranking, ranking[1:]))
+        for upper, lower in neighbours[:self.top]:
+            (upper_low, upper_high), (lower_low, lower_high) = intervals[upper], intervals[lower]
+            separated = upper_low > lower_high
+            tied = max(upper_high, lower_high) - min(upper_low, lower_low) <= self.tie_margin
+            if not (separated or tied):
+                return False
+        return True
@@ -0,0 +1,340 @@
+import json
+import re
+
+_DECODER = json.JSONDecoder()
+_CLOSERS = {"{": "}", "[": "]"}
+_KINDS = ("object", "array")
+_WHITESPACE = re.compile(r'(?:\s|\\[nrt])*')  # Also skips the literal "\n" between tokens of escaped JSON
+_DOUBLE_QUOTED = re.compile(r'(?:[^"\\]|\\.)*', re.S)  # String body up to the next unescaped quote
+_KEY = re.compile(r'[A-Za-z_$][\w$-]*')
+_BARE_VALUE = re.compile(r'[^,}\]\n]+')
+_NUMBER = re.compile(r'-?(?:0|[1-9]\d*)(?:\.\d+)?(?:[eE][+-]?\d+)?$')
+_LITERALS = {"true": "true", "false": "false", "null": "null", "True": "true", "False": "false", "None": "null"}
+_STRING_FIXES = re.compile(r'\\(?:u[0-9a-fA-F]{4}|["\\/bfnrt])|\\\'|\\|"|[\x00-\x1f]')
+
+
+class JsonExtractError(ValueError):
+    """No JSON value could be recovered from a response"""
+
+
+class ExtractedJson:
+    """A JSON value found in a response, with the repairs that were needed to parse it"""
+
+    def __init__(self, value, repairs, start, end):
+        self.value = value
+        self.repairs = repairs  # e.g. ["single_quotes", "trailing_commas"]; empty for valid JSON
+        self.start = start  # Span of the value in the response
+        self.end = end
+
+    def __repr__(self):
+        return f"ExtractedJson(value={self.value!r}, repairs={self.repairs})"
+
+
+class _Malformed(Exception):
+    """The candidate value can't be repaired; scanning moves on to the next opening bracket"""
+
+
+def _find_opener(text, start, kind):
+    """Index of the first character that can start a value of this kind, or -1"""
+    brace = text.find("{", start)
+    if kind == "object":
+        return brace
+    bracket = text.find("[", start)
+    # A batch may come back as a lone object (or one wrapping the array)
+    return bracket if brace < 0 or 0 <= bracket < brace else brace
+
+
+def extract_json(text, kind="object"):
+    """Find the first JSON object (kind="object") or array (kind="array") in a complete response.
+
+    Valid JSON is parsed directly; anything else goes through IncrementalJsonExtractor's
+    repairs. Raises JsonExtractError if no value can be recovered.
+    """
+    if kind not in _KINDS:
+        raise ValueError(f"Unknown JSON kind '{kind}', expected one of {_KINDS}")
+    start = _find_opener(text, 0, kind)
+    if start >= 0:
+        try:
+            value, end = _DECODER.raw_decode(text, start)
+            return ExtractedJson(value, [], start, end)
+        except json.JSONDecodeError:
+            pass
+    extractor = IncrementalJsonExtractor(kind)
+    extractor.feed(text)
+    return extractor.finish()
+
+
+class IncrementalJsonExtractor:
+    """Single-pass tolerant parser for the first JSON value in a (streamed) response.
+
+    feed() takes the response a chunk at a time and returns an ExtractedJson as soon as the
+    first balanced object or array has closed, so the rest of the stream can be dropped.
+    finish() marks the end of the response and closes anything left open.
+
+    Leading prose, code fences and trailing text are skipped. Repairs: escaped_quotes,
+    single_quotes, unescaped_quotes, unquoted_keys, unquoted_values, python_literals,
+    missing_commas, trailing_commas, control_characters, invalid_escapes and truncated.
+    A candidate that can't be repaired is abandoned for the next opening bracket.
+
+    An extractor is also a stop condition for ProviderAdapter.stream: called with the text
+    so far, it returns True once the value is complete.
+    """
+
+    def __init__(self, kind="object"):
+        if kind not in _KINDS:
+            raise ValueError(f"Unknown JSON kind '{kind}', expected one of {_KINDS}")
+        self.kind = kind
+        self._buffer = ""
+        self.result = None  # ExtractedJson once the value is complete
+        self._reset(0)
+
+    def _reset(self, search_from):
+        self._search_from = search_from  # Where to look for the next opening bracket
+        self._start = None  # Index of the current candidate's opening bracket
+        self._pos = search_from
+        self._stack = []  # Open brackets
+        self._out = []  # Repaired JSON text of the candidate so far
+        self._expect = "value"  # "key", "colon", "value" or "comma"
+        self._pending_comma = False  # A comma was read but not yet written, in case it turns out trailing
+        self._key_mark = 0  # len(self._out) before the latest key, to drop it if truncated after it
+        self._repairs = []
+
+    def __call__(self, text):
+        if not text.startswith(self._buffer):
+            # A retried stream starts over
+            self._buffer = ""
+            self.result = None
+            self._reset(0)
+        return self.feed(text[len(self._buffer):]) is not None
+
+    def feed(self, chunk):
+        """Add the next piece of the response; returns the ExtractedJson once complete, else None"""
+        if self.result is None:
+            self._buffer += chunk
+            self._scan(final=False)
+        return self.result
+
+    def finish(self):
+        """End of the response: return the ExtractedJson, closing a truncated value if necessary"""
+        if self.result is None:
+            self._scan(final=True)
+        return self.result
+
+    def _repair(self, name):
+        if name not in self._repairs:
+            self._repairs.append(name)
+
+    def _scan(self, final):
+        buffer = self._buffer
+        while self.result is None:
+            if self._start is None:
+                start = _find_opener(buffer, self._search_from, self.kind)
+                if start < 0:
+                    self._search_from = len(buffer)
+                    if final:
+                        raise JsonExtractError("No JSON object found" if self.kind == "object"
+                                               else "No JSON array found")
+                    return
+                self._start = self._pos = start
+
+            try:
+                pos = _WHITESPACE.match(buffer, self._pos).end()
+                if pos >= len(buffer):
+                    if not final:
+                        self._pos = pos
+                        return
+                    self._close_truncated(len(buffer))
+                    continue
+                end = self._token(buffer, pos, final)
+            except _Malformed:
+                self._reset(self._start + 1)
+                continue
+            if end is None:
+                self._pos = pos  # The token may still be growing; wait for more
+                return
+            self._pos = end
+
+    def _token(self, buffer, pos, final):
+        """Consume the token at pos; returns the position after it, or None if it may be incomplete"""
+        char = buffer[pos]
+        expect = self._expect
+        if char == "\\" and pos + 1 >= len(buffer) and not final:
+            return None  # Maybe the start of an escaped quote
+
+        if expect == "comma":
+            if char == ",":
+                self._pending_comma = True
+                self._expect = "key" if self._stack[-1] == "{" else "value"
+                return pos + 1
+            if char in "}]":
+                return self._close(char, pos)
+            if char in "\"'\\{[" or char.isalnum():
+                # Another key or value straight after the last one
+                self._repair("missing_commas")
+                self._pending_comma = True
+                self._expect = "key" if self._stack[-1] == "{" else "value"
+                return pos
+            raise _Malformed()
+
+        if expect == "colon":
+            if char != ":":
+                raise _Malformed()
+            self._out.append(":")
+            self._expect = "value"
+            return pos + 1
+
+        if char in "}]" and self._stack:
+            if self._out[-1] == ":":
+                raise _Malformed()
+            if self._pending_comma:
+                self._repair("trailing_commas")
+                self._pending_comma = False
+            return self._close(char, pos)
+
+        if char in "\"'" or buffer.startswith('\\"', pos):
+            token = self._string(buffer, pos, final)
+        elif expect == "key":
+            token = self._bare_key(buffer, pos, final)
+        elif char in "{[":
+            token = char, pos + 1
+        else:
+            token = self._bare_value(buffer, pos, final)
+        if token is None:
+            return None
+
+        text, end = token
+        mark = len(self._out)
+        if self._pending_comma:
+            self._out.append(",")
+            self._pending_comma = False
+        self._out.append(text)
+        if expect == "key":
+            self._key_mark = mark
+            self._expect = "colon"
+        elif text in ("{", "["):
+            self._stack.append(text)
+            self._expect = "key" if text == "{" else "value"
+        else:
+            self._expect = "comma"
+        return end
+
+    def _close(self, char, pos):
+        if not self._stack or _CLOSERS[self._stack[-1]] != char:
+            raise _Malformed()
+        self._stack.pop()
+        self._out.append(char)
+        self._expect = "comma"
+        if not self._stack:
+            self._complete(pos + 1)
+        return pos + 1
+
+    def _complete(self, end):
+        try:
+            value = json.loads("".join(self._out))
+        except json.JSONDecodeError:
+            raise _Malformed()
+        self.result = ExtractedJson(value, self._repairs, self._start, end)
+
+    def _close_truncated(self, end):
+        """The response ended inside the value: drop a dangling key and close the open brackets"""
+        self._repair("truncated")
+        self._pending_comma = False
+        if self._expect == "colon" or (self._expect == "value" and self._out[-1] == ":"):
+            del self._out[self._key_mark:]
+        for opener in reversed(self._stack):
+            self._out.append(_CLOSERS[opener])
+        self._stack = []
+        self._complete(end)
+
+    def _ends_string(self, buffer, quote_end):
+        """Whether the quote just before quote_end closes the string, or None if that isn't known yet"""
+        after = _WHITESPACE.match(buffer, quote_end).end()
+        if after >= len(buffer):
+            return None
+        return buffer[after] in ":,}]" or ("\n" in buffer[quote_end:after] and buffer[after] in "\"'")
+
+    def _string(self, buffer, pos, final):
+        """A quoted string as JSON text, and the position after its closing quote"""
+        if buffer.startswith('\\"', pos):
+            # The whole value was escaped, as in {\"type\": \"word\"}
+            self._repair("escaped_quotes")
+            close = buffer.find('\\"', pos + 2)
+            if close < 0:
+                return self._unterminated(buffer, pos + 2, final)
+            return self._json_string(buffer[pos + 2:close]), close + 2
+
+        quote = buffer[pos]
+        search = pos + 1
+        while True:
+            if quote == '"':
+                close = _DOUBLE_QUOTED.match(buffer, search).end()
+                if close >= len(buffer) or buffer[close] != '"':
+                    return self._unterminated(buffer, pos + 1, final)
+            else:
+                close = buffer.find("'", search)
+                if close < 0:
+                    return self._unterminated(buffer, pos + 1, final)
+            ends = self._ends_string(buffer, close + 1)
+            if ends is None and not final:
+                return None
+            if ends is not False:
+                break
+            # A quote or apostrophe inside the string
+            if quote == '"':
+                self._repair("unescaped_quotes")
+            search = close + 1
+
+        if quote == "'":
+            self._repair("single_quotes")
+        return self._json_string(buffer[pos + 1:close]), close + 1
+
+    def _unterminated(self, buffer, body_start, final):
+        if not final:
+            return None
+        self._repair("truncated")
+        return self._json_string(buffer[body_start:].rstrip("\\")), len(buffer)
+
+    def _json_string(self, body):
+        """JSON string literal for a raw string body, fixing quotes, escapes and control characters"""
+        def fix(match):
+            text = match.group()
+            if text == "\\'":
+                self._repair("invalid_escapes")
+                return "'"
+            if len(text) > 1:
+                return text  # Valid escape
+            if text == "\\":
+                self._repair("invalid_escapes")
+                return "\\\\"
+            if text == '"':
+                return '\\"'
+            self._repair("control_characters")
+            return json.dumps(text)[1:-1]
+        return f'"{_STRING_FIXES.sub(fix, body)}"'
+
+    def _bare_key(self, buffer, pos, final):
+        match = _KEY.match(buffer, pos)
+        if not match:
+            raise _Malformed()
+        if match.end() >= len(buffer) and not final:
+            return None
+        self._repair("unquoted_keys")
+        return json.dumps(match.group()), match.end()
+
+    def _bare_value(self, buffer, pos, final):
+        match = _BARE_VALUE.match(buffer, pos)
+        if match is None:
+            if pos >= len(buffer) and not final:
+                return None
+            raise _Malformed()  # A missing value, as in '{"a": ,' or '[,]'
+        if match.end() >= len(buffer) and not final:
+            return None
+        raw = match.group().strip()
+        if raw in _LITERALS:
+            if _LITERALS[raw] != raw:
+                self._repair("python_literals")
+            return _LITERALS[raw], match.end()
+        if _NUMBER.match(raw):
+            return raw, match.end()
+        self._repair("unquoted_values")
+        return json.dumps(raw), match.end()
@@ -0,0 +1,277 @@
+import bisect
+import random
+import threading
+from collections import defaultdict, deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from itertools import accumulate
+
+# Upper bounds (seconds) of the Prometheus latency histogram buckets
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+# Values kept per distribution for percentiles, and recent successful latencies kept for hedging
+RESERVOIR_SIZE = 2048
+OK_LATENCY_WINDOW = 1000
+
+
+class _Distribution:
+    """Durations recorded for one series, in memory that doesn't grow with the run.
+
+    Count, sum, max and the histogram bucket counts are exact; percentiles come from a
+    uniform random sample of at most RESERVOIR_SIZE values (reservoir sampling).
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.sum = 0.0
+        self.max = None
+        self.buckets = [0] * len(LATENCY_BUCKETS)  # Values up to each bound, not cumulative
+        self.sample = []
+
+    def add(self, value):
+        self.count += 1
+        self.sum += value
+        self.max = value if self.max is None else max(self.max, value)
+        bucket = bisect.bisect_left(LATENCY_BUCKETS, value)
+        if bucket < len(self.buckets):
+            self.buckets[bucket] += 1
+        if len(self.sample) < RESERVOIR_SIZE:
+            self.sample.append(value)
+        else:
+            index = random.randrange(self.count)
+            if index < RESERVOIR_SIZE:
+                self.sample[index] = value
+
+    def merge(self, other):
+        """Add another distribution (or its export()); the merged sample keeps each side's share of values"""
+        other = other if isinstance(other, dict) else other.export()
+        count = self.count + other['count']
+        if len(self.sample) + len(other['sample']) > RESERVOIR_SIZE:
+            own = round(RESERVOIR_SIZE * self.count / count)
+            self.sample = (random.sample(self.sample, min(own, len(self.sample)))
+                           + random.sample(other['sample'], min(RESERVOIR_SIZE - own, len(other['sample']))))
+        else:
+            self.sample = self.sample + other['sample']
+        self.count = count
+        self.sum += other['sum']
+        if other['max'] is not None:
+            self.max = other['max'] if self.max is None else max(self.max, other['max'])
+        self.buckets = [mine + theirs for mine, theirs in zip(self.buckets, other['buckets'])]
+
+    def export(self):
+        return {"count": self.count, "sum": self.sum, "max": self.max, "buckets": list(self.buckets),
+                "sample": list(self.sample)}
+
+
+class _Series:
+    """Everything recorded for one (provider, model, kind)"""
+
+    def __init__(self):
+        self.latencies = _Distribution()
+        # Latencies of the latest successful, uncached calls, for hedging delays
+        self.ok_latencies = deque(maxlen=OK_LATENCY_WINDOW)
+        self.ttfts = _Distribution()
+        self.outcomes = defaultdict(int)
+        self.input_tokens = 0
+        self.cached_input_tokens = 0  # Part of input_tokens read from the provider's prompt cache
+        self.output_tokens = 0
+        self.retries = 0
+        self.hedges = 0
+
+
+def _percentiles(distribution):
+    if not distribution.count:
+        return None
+    import numpy as np
+    p50, p95, p99 = np.percentile(distribution.sample, [50, 95, 99])
+    return {"p50": round(float(p50), 4), "p95": round(float(p95), 4), "p99": round(float(p99), 4),
+            "mean": round(distribution.sum / distribution.count, 4), "max": round(float(distribution.max), 4)}
+
+
+class MetricsRecorder:
+    """Per-call instrumentation of provider calls.
+
+    Each call records its provider, model, kind ("riddle" or "response"), wall latency,
+    time to first token, token usage (and cached prompt tokens), governor retries, hedged duplicates and outcome
+    ("ok", "cache_hit", "rate_limited", "timeout", "circuit_open" or "error"). A "circuit_open"
+    call is one a circuit breaker skipped: it counts as an outcome, not as a call with a latency.
+    summary() aggregates them into p50/p95/p99 per provider and model; prometheus_text() renders
+    the same data in the Prometheus exposition format.
+    """
+
+    def __init__(self):
+        self._series = defaultdict(_Series)  # (provider, model, kind) -> _Series
+        self._lock = threading.Lock()
+
+    def record(self, provider, model, kind, latency, ttft=None, input_tokens=None, output_tokens=None,
+               retries=0, hedges=0, outcome="ok", cached_input_tokens=None):
+        """Record one call; ttft defaults to the latency for calls that weren't streamed"""
+        with self._lock:
+            series = self._series[(provider, model, kind)]
+            series.outcomes[outcome] += 1
+            if outcome == "circuit_open":
+                return
+            series.latencies.add(latency)
+            if outcome == "ok":
+                series.ok_latencies.append(latency)
+            if outcome != "cache_hit":
+                series.ttfts.add(latency if ttft is None else ttft)
+            series.input_tokens += input_tokens or 0
+            series.cached_input_tokens += cached_input_tokens or 0
+            series.output_tokens += output_tokens or 0
+            series.retries += retries
+            series.hedges += hedges
+
+    def export(self):
+        """Everything recorded, as JSON-friendly rows that merge() can add to another recorder"""
+        with self._lock:
+            return [dict(vars(series), provider=provider, model=model, kind=kind, outcomes=dict(series.outcomes),
+                         latencies=series.latencies.export(), ttfts=series.ttfts.export(),
+                         ok_latencies=list(series.ok_latencies))
+                    for (provider, model, kind), series in self._series.items()]
+
+    def merge(self, rows):
+        """Add the calls exported by another recorder, e.g. one in a shard's worker process"""
+        with self._lock:
+            for row in rows:
+                series = self._series[(row['provider'], row['model'], row['kind'])]
+                series.latencies.merge(row['latencies'])
+                series.ttfts.merge(row['ttfts'])
+                series.ok_latencies.extend(row['ok_latencies'])
+                for outcome, count in row['outcomes'].items():
+                    series.outcomes[outcome] += count
+                for name in ("input_tokens", "cached_input_tokens", "output_tokens", "retries", "hedges"):
+                    setattr(series, name, getattr(series, name) + row.get(name, 0))
+
+    def latency_percentile(self, provider, model, kind, percentile, min_samples=1):
+        """Percentile of successful call latencies, or None with fewer than min_samples calls"""
+        with self._lock:
+            series = self._series.get((provider, model, kind))
+            latencies = list(series.ok_latencies) if series else []
+        if len(latencies) < max(1, min_samples):
+            return None
+        import numpy as np
+        return float(np.percentile(latencies, percentile))
+
+    def summary(self):
+        """Per-provider JSON-friendly aggregates, with a breakdown per model and call kind"""
+        with self._lock:
+            grouped = defaultdict(list)
+            for (provider, model, kind), series in self._series.items():
+                grouped[provider].append((model, kind, series))
+
+            summary = {}
+            for provider, entries in grouped.items():
+                summary[provider] = self._aggregate([series for _, _, series in entries])
+                summary[provider]["by_model"] = {
+                    f"{model}/{kind}": self._aggregate([series]) for model, kind, series in entries
+                }
+            return summary
+
+    def _aggregate(self, series_list):
+        latencies, ttfts = _Distribution(), _Distribution()
+        for series in series_list:
+            latencies.merge(series.latencies)
+            ttfts.merge(series.ttfts)
+        outcomes = defaultdict(int)
+        for series in series_list:
+            for outcome, count in series.outcomes.items():
+                outcomes[outcome] += count
+        input_tokens = sum(series.input_tokens for series in series_list)
+        cached_input_tokens = sum(series.cached_input_tokens for series in series_list)
+        return {
+            "calls": latencies.count,
+            "outcomes": dict(outcomes),
+            "retries": sum(series.retries for series in series_list),
+            "hedges": sum(series.hedges for series in series_list),
+            "input_tokens": input_tokens,
+            "cached_input_tokens": cached_input_tokens,
+            "cached_input_share": round(cached_input_tokens / input_tokens, 4) if input_tokens else None,
+            "output_tokens": sum(series.output_tokens for series in series_list),
+            "latency_seconds": _percentiles(latencies),
+            "ttft_seconds": _percentiles(ttfts)
+        }
+
+    def prometheus_text(self):
+        """Current metrics in the Prometheus text exposition format"""
+        lines = [
+            "# HELP riddle_llm_calls_total Provider calls by outcome.",
+            "# TYPE riddle_llm_calls_total counter",
+        ]
+        with self._lock:
+            series_items = sorted(self._series.items())
+            for (provider, model, kind), series in series_items:
+                for outcome, count in sorted(series.outcomes.items()):
+                    lines.append(f'riddle_llm_calls_total{{{_labels(provider, model, kind)},outcome="{outcome}"}} {count}')
+
+            lines += ["# HELP riddle_llm_retries_total Retries made by the rate limiter.",
+                      "# TYPE riddle_llm_retries_total counter"]
+            for (provider, model, kind), series in series_items:
+                lines.append(f"riddle_llm_retries_total{{{_labels(provider, model, kind)}}} {series.retries}")
+
+            lines += ["# HELP riddle_llm_hedges_total Duplicate requests started for slow calls.",
+                      "# TYPE riddle_llm_hedges_total counter"]
+            for (provider, model, kind), series in series_items:
+                lines.append(f"riddle_llm_hedges_total{{{_labels(provider, model, kind)}}} {series.hedges}")
+
+            lines += ["# HELP riddle_llm_tokens_total Tokens reported by providers.",
+                      "# TYPE riddle_llm_tokens_total counter"]
+            for (provider, model, kind), series in series_items:
+                labels = _labels(provider, model, kind)
+                lines.append(f'riddle_llm_tokens_total{{{labels},direction="input"}} {series.input_tokens}')
+                lines.append(f'riddle_llm_tokens_total{{{labels},direction="output"}} {series.output_tokens}')
+
+            lines += ["# HELP riddle_llm_cached_input_tokens_total Input tokens read from provider prompt caches.",
+                      "# TYPE riddle_llm_cached_input_tokens_total counter"]
+            for (provider, model, kind), series in series_items:
+                lines.append(f"riddle_llm_cached_input_tokens_total{{{_labels(provider, model, kind)}}} "
+                             f"{series.cached_input_tokens}")
+
+            for name, help_text, attribute in [
+                ("riddle_llm_call_latency_seconds", "Wall time of provider calls.", "latencies"),
+                ("riddle_llm_time_to_first_token_seconds", "Time until the first token arrived.", "ttfts"),
+            ]:
+                lines += [f"# HELP {name} {help_text}", f"# TYPE {name} histogram"]
+                for (provider, model, kind), series in series_items:
+                    lines += _histogram_lines(name, _labels(provider, model, kind), getattr(series, attribute))
+        return "\n".join(lines) + "\n"
+
+    def serve(self, port, host="127.0.0.1"):
+        """Serve prometheus_text() at http://host:port/metrics from a daemon thread; returns the server"""
+        recorder = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.rstrip('/') not in ('', '/metrics'):
+                    self.send_error(404)
+                    return
+                body = recorder.prometheus_text().encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass  # Scrapes would otherwise be printed between competition rounds
+
+        server = ThreadingHTTPServer((host, port), Handler)
+        threading.Thread(target=server.serve_forever, name="riddle-metrics", daemon=True).start()
+        return server
+
+
+def _labels(provider, model, kind):
+    return f'provider="{_escape(provider)}",model="{_escape(model)}",kind="{kind}"'
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _histogram_lines(name, labels, distribution):
+    counts = accumulate(distribution.buckets)
+    lines = [f'{name}_bucket{{{labels},le="{bound}"}} {count}' for bound, count in zip(LATENCY_BUCKETS, counts)]
+    lines.append(f'{name}_bucket{{{labels},le="+Inf"}} {distribution.count}')
+    lines.append(f"{name}_sum{{{labels}}} {distribution.sum}")
+    lines.append(f"{name}_count{{{labels}}} {distribution.count}")
+    return lines
+
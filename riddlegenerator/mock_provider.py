@@ -0,0 +1,263 @@
+import asyncio
+import hashlib
+import json
+import re
+import zlib
+from collections import Counter
+import random
+from riddlegenerator.providers import PROMPT_CACHE_MIN_TOKENS, Completion, ProviderAdapter, register_adapter
+
+# Classic riddles handed out first; after these run out, riddles are made up from pseudo-words
+WORD_RIDDLES = [
+    ("What has keys but can't open locks?", "A piano"),
+    ("What gets wetter the more it dries?", "A towel"),
+    ("I speak without a mouth and hear without ears. I have no body, but come alive with wind. What am I?", "An echo"),
+    ("What has cities, but no houses; forests, but no trees; and water, but no fish?", "A map"),
+    ("What belongs to you, but other people use it more than you do?", "Your name"),
+    ("What can travel around the world while staying in a corner?", "A stamp"),
+    ("The more of this there is, the less you see. What is it?", "Darkness"),
+    ("What has a head and a tail but no body?", "A coin"),
+    ("What goes up but never comes down?", "Your age"),
+    ("What has hands but can't clap?", "A clock"),
+    ("What can you catch but not throw?", "A cold"),
+    ("What has many teeth but can't bite?", "A comb"),
+    ("What runs but never walks, has a mouth but never talks?", "A river"),
+    ("I'm tall when I'm young, and short when I'm old. What am I?", "A candle"),
+    ("What comes once in a minute, twice in a moment, but never in a thousand years?", "The letter M"),
+    ("The more you take, the more you leave behind. What are they?", "Footsteps"),
+    ("What has one eye but can't see?", "A needle"),
+    ("What has a neck but no head?", "A bottle"),
+    ("What is full of holes but still holds water?", "A sponge"),
+    ("What building has the most stories?", "A library"),
+    ("What kind of band never plays music?", "A rubber band"),
+    ("What has legs but doesn't walk?", "A table"),
+    ("What can fill a room but takes up no space?", "Light"),
+    ("If you drop me I'm sure to crack, but give me a smile and I'll always smile back. What am I?", "A mirror"),
+]
+_WORD_ANSWERS = {riddle: answer for riddle, answer in WORD_RIDDLES}
+_SYLLABLES = ["ba", "ko", "ri", "zu", "mel", "tor", "vin", "qua", "sep", "lo", "dri", "fen", "gal", "hu", "pim", "wex"]
+_SYNTHETIC = re.compile(r"^I am (\w+) in the (\w+) and (\w+) by the (\w+)\. What am I\?$")
+_MATH = re.compile(r"What is (\d+) ([+\-*]) (\d+)\?")
+_OPERATORS = {"+": lambda a, b: a + b, "-": lambda a, b: a - b, "*": lambda a, b: a * b}
+
+
+class MockProviderError(Exception):
+    """Simulated provider failure carrying an HTTP status like the real SDK errors"""
+
+    def __init__(self, message, status_code, retry_after=None):
+        super().__init__(message)
+        self.status_code = status_code
+        self.response = MockResponse({'retry-after': str(retry_after)} if retry_after is not None else {})
+
+
+class MockResponse:
+    """Just enough of an HTTP response for the rate limiter to read Retry-After"""
+
+    def __init__(self, headers):
+        self.headers = headers
+
+
+def _pseudo_word(seed):
+    """Made-up word, the same for the same seed"""
+    rng = random.Random(seed)
+    return "".join(rng.choice(_SYLLABLES) for _ in range(rng.randint(2, 3)))
+
+
+def _synthetic_answer(riddle):
+    """Answer to a made-up riddle, derived from its text so any mock solver can work it out"""
+    return _pseudo_word(zlib.crc32(riddle.encode('utf-8'))).capitalize()
+
+
+def known_answer(riddle):
+    """Correct answer to a riddle the mock provider made up, or None"""
+    riddle = riddle.strip()
+    if riddle in _WORD_ANSWERS:
+        return _WORD_ANSWERS[riddle]
+    if _SYNTHETIC.match(riddle):
+        return _synthetic_answer(riddle)
+    match = _MATH.search(riddle)
+    if match:
+        return str(_OPERATORS[match.group(2)](int(match.group(1)), int(match.group(3))))
+    return None
+
+
+class MockAdapter(ProviderAdapter):
+    """Offline stand-in for an LLM provider, for load tests and benchmarks.
+
+    Answers riddle-generation prompts with seeded riddles and solver prompts with the right
+    answer at a configured accuracy, after a simulated latency. Behaviour comes from the
+    config entry's "options":
+
+        seed             base seed; every call is seeded from it, the model and the prompt
+        latency          {"distribution": "fixed" | "uniform" | "normal" | "lognormal" | "exponential",
+                          plus "ms" / "min_ms", "max_ms" / "mean_ms", "stddev_ms" / "median_ms", "sigma"}
+        accuracy         chance of answering correctly, a number or {"word": ..., "math": ...}
+        error_rate       chance of a simulated 500 error
+        rate_limit_rate  chance of a simulated 429, with retry_after seconds in Retry-After
+        malformed_rate   chance that generated riddle JSON is broken (plain-text replies only)
+        structured_output  whether to honour response schemas, as the real providers do (default true)
+        token_ms         time between streamed tokens (of ~4 characters); latency is the time to the first
+        verbosity        chance that an answer is followed by an explanation nobody asked for
+        cache_min_tokens shortest system prompt (in tokens) kept by the simulated prompt cache, which
+                         reports a repeated system prompt as cached input (default 1024, as OpenAI; null = off)
+    """
+
+    requires_api_key = False
+    supports_streaming = True
+    supports_structured_output = True
+
+    def __init__(self, api_key=None, http_config=None, base_url=None, options=None):
+        super().__init__(api_key, http_config, base_url, options)
+        self.seed = self.options.get('seed', 0)
+        self.latency = self.options.get('latency', {"distribution": "fixed", "ms": 0})
+        self.accuracy = self.options.get('accuracy', 0.8)
+        self.error_rate = self.options.get('error_rate', 0.0)
+        self.rate_limit_rate = self.options.get('rate_limit_rate', 0.0)
+        self.retry_after = self.options.get('retry_after', 1.0)
+        self.malformed_rate = self.options.get('malformed_rate', 0.0)
+        self.token_ms = self.options.get('token_ms', 0)
+        self.verbosity = self.options.get('verbosity', 0.0)
+        self.supports_structured_output = self.options.get('structured_output', True)
+        self.cache_min_tokens = self.options.get('cache_min_tokens', PROMPT_CACHE_MIN_TOKENS)
+        self._cached_prefixes = set()  # (model, system prompt) pairs in the simulated prompt cache
+        self._occurrences = Counter()  # How often each (model, prompt) has been seen, so repeats differ
+
+    def _rng(self, model, prompt, system_prompt):
+        call = (model, prompt, system_prompt)
+        occurrence = self._occurrences[call]
+        self._occurrences[call] += 1
+        digest = hashlib.sha256(json.dumps([self.seed, *call, occurrence]).encode('utf-8')).digest()
+        return random.Random(digest), occurrence
+
+    def _latency_seconds(self, rng):
+        """Draw a simulated response time from the configured distribution"""
+        latency = self.latency
+        distribution = latency.get('distribution', 'fixed')
+        if distribution == 'fixed':
+            ms = latency.get('ms', 0)
+        elif distribution == 'uniform':
+            ms = rng.uniform(latency.get('min_ms', 0), latency.get('max_ms', 0))
+        elif distribution == 'normal':
+            ms = rng.gauss(latency.get('mean_ms', 0), latency.get('stddev_ms', 0))
+        elif distribution == 'lognormal':
+            ms = latency.get('median_ms', 0) * rng.lognormvariate(0, latency.get('sigma', 0.5))
+        elif distribution == 'exponential':
+            ms = rng.expovariate(1 / latency['mean_ms']) if latency.get('mean_ms') else 0
+        else:
+            raise ValueError(f"Unknown mock latency distribution '{distribution}'")
+        return max(0.0, ms) / 1000
+
+    def _accuracy(self, riddle_type):
+        if isinstance(self.accuracy, dict):
+            return self.accuracy.get(riddle_type, 0.8)
+        return self.accuracy
+
+    async def complete(self, model, prompt, system_prompt=None, temperature=0.1, max_tokens=None,
+                       response_schema=None):
+        text, tokens = await self._respond(model, prompt, system_prompt, max_tokens, response_schema)
+        await asyncio.sleep(self.token_ms / 1000 * (len(tokens) - 1))
+        return Completion("".join(tokens), input_tokens=len(text) // 4, output_tokens=len(tokens),
+                          cached_input_tokens=self._cached_tokens(model, system_prompt))
+
+    def _cached_tokens(self, model, system_prompt):
+        """Tokens of a system prompt this model has already seen, which a prompt cache would serve"""
+        if self.cache_min_tokens is None or not system_prompt or len(system_prompt) // 4 < self.cache_min_tokens:
+            return 0
+        if (model, system_prompt) in self._cached_prefixes:
+            return len(system_prompt) // 4
+        self._cached_prefixes.add((model, system_prompt))
+        return 0
+
+    async def _stream_text(self, completion, model, prompt, system_prompt=None, temperature=0.1, max_tokens=None,
+                           response_schema=None):
+        text, tokens = await self._respond(model, prompt, system_prompt, max_tokens, response_schema)
+        completion.input_tokens = len(text) // 4
+        completion.cached_input_tokens = self._cached_tokens(model, system_prompt)
+        for i, token in enumerate(tokens):
+            if i:
+                await asyncio.sleep(self.token_ms / 1000)
+            completion.output_tokens = i + 1
+            yield token
+
+    async def _respond(self, model, prompt, system_prompt, max_tokens, response_schema=None):
+        """Wait out the simulated time to first token, then return the prompt text and the reply's tokens"""
+        rng, occurrence = self._rng(model, prompt, system_prompt)
+        latency = self._latency_seconds(rng)
+
+        outcome = rng.random()
+        if outcome < self.rate_limit_rate:
+            await asyncio.sleep(latency / 10)  # Throttled calls are turned away quickly
+            raise MockProviderError("Simulated rate limit", 429, retry_after=self.retry_after)
+        await asyncio.sleep(latency)
+        if outcome < self.rate_limit_rate + self.error_rate:
+            raise MockProviderError("Simulated server error", 500)
+
+        text = f"{system_prompt}\n{prompt}" if system_prompt else prompt
+        if '"type": "word"' in text or '"type": "math"' in text:
+            response = self._riddles(rng, model, text, occurrence, response_schema)
+        else:
+            response = self._answer(rng, prompt)
+        tokens = [response[i:i + 4] for i in range(0, len(response), 4)] or [""]
+        return text, tokens[:max_tokens] if max_tokens else tokens
+
+    def _riddles(self, rng, model, prompt, occurrence, response_schema=None):
+        """JSON for a generation prompt: one riddle, or an array for a batch prompt.
+
+        With a response schema the JSON is always well formed, and batches come wrapped
+        in {"riddles": [...]} like riddle_schema.batch_schema asks.
+        """
+        riddle_type = "math" if '"type": "math"' in prompt else "word"
+        count = re.search(r"exactly (\d+) objects", prompt)
+        if count:
+            riddles = [self._riddle(rng, model, riddle_type, occurrence * int(count.group(1)) + i)
+                       for i in range(int(count.group(1)))]
+            content = json.dumps({"riddles": riddles} if response_schema else riddles, indent=2)
+        else:
+            content = json.dumps(self._riddle(rng, model, riddle_type, occurrence), indent=2)
+
+        if rng.random() < self.malformed_rate and not response_schema:
+            content = rng.choice([
+                lambda c: c[:-1],  # Truncated before the closing bracket
+                lambda c: c.replace('"', "'"),  # Single-quoted
+                lambda c: c.replace('",\n', '"\n', 1),  # Missing comma
+                lambda c: "I'm sorry, I can't generate riddles right now.",
+            ])(content)
+        return content
+
+    def _riddle(self, rng, model, riddle_type, number):
+        """The number-th riddle of a type from this model"""
+        if riddle_type == "math":
+            a, b = rng.randint(2, 99), rng.randint(2, 20)
+            operator = rng.choice(list(_OPERATORS))
+            answer = _OPERATORS[operator](a, b)
+            return {"type": "math", "riddle": f"What is {a} {operator} {b}?", "answer": str(answer),
+                    "solution": f"{a} {operator} {b} = {answer}"}
+
+        # Each model walks the bank in its own seeded order, then makes riddles up
+        order = list(range(len(WORD_RIDDLES)))
+        random.Random(json.dumps([self.seed, model])).shuffle(order)
+        if number < len(order):
+            riddle, answer = WORD_RIDDLES[order[number]]
+        else:
+            words = [_pseudo_word(rng.random()) for _ in range(4)]
+            riddle = f"I am {words[0]} in the {words[1]} and {words[2]} by the {words[3]}. What am I?"
+            answer = _synthetic_answer(riddle)
+        return {"type": "word", "riddle": riddle, "answer": answer}
+
+    def _answer(self, rng, prompt):
+        """Reply to a solver prompt, correctly with the configured accuracy"""
+        riddle = prompt.split(': ', 1)[1] if 'Answer this riddle' in prompt else prompt
+        answer = known_answer(riddle)
+        riddle_type = "math" if _MATH.search(riddle) else "word"
+        if answer is not None and rng.random() < self._accuracy(riddle_type):
+            reply = answer
+        elif riddle_type == "math" and answer is not None:
+            reply = str(int(answer) + rng.choice([-2, -1, 1, 2]))
+        else:
+            reply = "I don't know"
+        if rng.random() < self.verbosity:
+            reply += ("\n\nExplanation: " + " ".join(_pseudo_word(rng.random()) for _ in range(rng.randint(20, 60))))
+        return reply
+
+
+register_adapter("mock", MockAdapter)
@@ -0,0 +1,537 @@
+import asyncio
+import importlib
+import importlib.util
+import json
+import threading
+import time
+from riddlegenerator.riddle_schema import without_keywords
+
+# Shortest prefix, in tokens, that vendors cache (Anthropic's Haiku models need 2048)
+PROMPT_CACHE_MIN_TOKENS = 1024
+
+
+class Completion:
+    """Text returned by a provider together with the token usage it reported"""
+
+    def __init__(self, text, input_tokens=None, output_tokens=None, cached_input_tokens=None):
+        self.text = text
+        self.input_tokens = input_tokens
+        self.output_tokens = output_tokens
+        self.cached_input_tokens = cached_input_tokens  # Input tokens read from the provider's prompt cache
+        self.time_to_first_token = None  # Seconds until the first streamed text arrived
+        self.stopped_early = False  # Whether a streamed reply was cut off by its stop condition
+
+    def __repr__(self):
+        return f"Completion(text={self.text!r}, input_tokens={self.input_tokens}, output_tokens={self.output_tokens})"
+
+
+class ProviderAdapter:
+    """Base class for provider adapters.
+
+    An adapter owns one async client (and its HTTP connection pool) for a provider and
+    is shared by every model and every concurrent call to that provider. The vendor SDK
+    is imported and the client built on first use, so unused providers cost nothing.
+    """
+
+    requires_api_key = True  # Whether RiddleGenerator needs a <PROVIDER>_API_KEY to build this adapter
+    sdk_name = None  # Module of the vendor SDK, imported on first use
+
+    def __init__(self, api_key, http_config=None, base_url=None, options=None):
+        self.api_key = api_key
+        self.http_config = http_config or {}
+        self.base_url = base_url  # Optional endpoint override, e.g. a proxy or a local stub
+        self.options = options or {}  # Adapter-specific settings from the config entry's "options"
+        self._client = None
+
+    @property
+    def sdk(self):
+        """The vendor SDK module"""
+        return importlib.import_module(self.sdk_name)
+
+    @property
+    def client(self):
+        """The SDK client, built on first use"""
+        if self._client is None:
+            self._client = self._create_client()
+        return self._client
+
+    def _create_client(self):
+        raise NotImplementedError(f"{type(self).__name__} has no SDK client")
+
+    async def complete(self, model, prompt, system_prompt=None, temperature=0.1, max_tokens=None):
+        """Send a single-turn prompt and return a Completion.
+
+        Adapters that set supports_structured_output also take response_schema, a
+        {"name": ..., "schema": JSON schema} dict the reply must conform to.
+        """
+        raise NotImplementedError
+
+    supports_structured_output = False
+
+    # Adapters that can stream set supports_streaming and implement _stream_text
+    supports_streaming = False
+
+    async def stream(self, model, prompt, system_prompt=None, temperature=0.1, max_tokens=None, stop=None,
+                     response_schema=None):
+        """Like complete, but reads the reply as it is generated and ends the stream as soon as
+        stop(text so far) is true. Falls back to complete for adapters that can't stream."""
+        schema = {"response_schema": response_schema} if response_schema else {}
+        if not self.supports_streaming:
+            return await self.complete(model, prompt, system_prompt, temperature, max_tokens, **schema)
+
+        start = time.perf_counter()
+        completion = Completion("")
+        parts = []
+        chunks = self._stream_text(completion, model, prompt, system_prompt, temperature, max_tokens, **schema)
+        try:
+            async for text in chunks:
+                if completion.time_to_first_token is None:
+                    completion.time_to_first_token = time.perf_counter() - start
+                parts.append(text)
+                if stop and stop("".join(parts)):
+                    completion.stopped_early = True
+                    break
+        finally:
+            await chunks.aclose()  # Closes the HTTP stream when stopping early
+        completion.text = "".join(parts)
+        if completion.stopped_early and completion.output_tokens is None:
+            completion.output_tokens = max(1, len(completion.text) // 4)  # No usage is sent for cut-off streams
+        return completion
+
+    def _stream_text(self, completion, model, prompt, system_prompt=None, temperature=0.1, max_tokens=None):
+        """Async generator of reply text pieces; sets completion's token counts when usage arrives"""
+        raise NotImplementedError(f"{type(self).__name__} does not support streaming")
+
+    async def aclose(self):
+        """Release the adapter's connections, if a client was ever built"""
+        if self._client is not None:
+            await self._client.close()
+            self._client = None
+
+    # Offline batch jobs: adapters that support them set supports_batch and implement the methods below
+    supports_batch = False
+
+    def batch_line(self, custom_id, model, prompt, system_prompt=None, temperature=0.1, max_tokens=None):
+        """One request in the provider's batch-job JSONL format"""
+        raise NotImplementedError(f"{type(self).__name__} does not support batch jobs")
+
+    async def submit_batch(self, path):
+        """Submit a JSONL file of batch_line requests and return the batch id"""
+        raise NotImplementedError(f"{type(self).__name__} does not support batch jobs")
+
+    async def batch_status(self, batch_id):
+        """'in_progress', 'completed' or 'failed'"""
+        raise NotImplementedError(f"{type(self).__name__} does not support batch jobs")
+
+    async def batch_results(self, batch_id):
+        """Map each custom_id of a finished batch to a Completion, or to the Exception it failed with"""
+        raise NotImplementedError(f"{type(self).__name__} does not support batch jobs")
+
+    def _connection_limits(self, sdk):
+        """Connection pool limits for an SDK's own httpx flavour, overridden from the http config"""
+        defaults = sdk.DEFAULT_CONNECTION_LIMITS
+        return type(defaults)(
+            max_connections=self.http_config.get('max_connections', defaults.max_connections),
+            max_keepalive_connections=self.http_config.get('max_keepalive_connections',
+                                                           defaults.max_keepalive_connections),
+            keepalive_expiry=defaults.keepalive_expiry
+        )
+
+    def _http_client(self, sdk):
+        """Pooled async HTTP client shared by all calls made through this adapter"""
+        return sdk.DefaultAsyncHttpxClient(limits=self._connection_limits(sdk))
+
+
+class OpenAIAdapter(ProviderAdapter):
+    """Chat completions through AsyncOpenAI"""
+
+    sdk_name = "openai"
+    client_class_name = "AsyncOpenAI"
+    supports_batch = True
+    supports_streaming = True
+    supports_structured_output = True
+    stream_options = {"include_usage": True}  # Usage arrives in a final chunk with no choices
+
+    def _create_client(self):
+        sdk = self.sdk
+        # Retries are handled by the rate limiter, not the SDK
+        return getattr(sdk, self.client_class_name)(api_key=self.api_key, base_url=self.base_url, max_retries=0,
+                                                    http_client=self._http_client(sdk))
+
+    def _request_body(self, model, prompt, system_prompt=None, temperature=0.1, max_tokens=None,
+                      response_schema=None):
+        messages = []
+        if system_prompt:
+            messages.append({"role": "system", "content": system_prompt})
+        messages.append({"role": "user", "content": prompt})
+
+        body = {"model": model, "temperature": temperature, "messages": messages}
+        if max_tokens:
+            body["max_tokens"] = max_tokens
+        if response_schema:
+            body["response_format"] = self._response_format(response_schema)
+        return body
+
+    def _response_format(self, response_schema):
+        return {"type": "json_schema", "json_schema": dict(response_schema, strict=True)}
+
+    async def complete(self, model, prompt, system_prompt=None, temperature=0.1, max_tokens=None,
+                       response_schema=None):
+        response = await self.client.chat.completions.create(
+            **self._request_body(model, prompt, system_prompt, temperature, max_tokens, response_schema)
+        )
+
+        usage = getattr(response, 'usage', None)
+        return Completion(
+            response.choices[0].message.content,
+            input_tokens=getattr(usage, 'prompt_tokens', None),
+            output_tokens=getattr(usage, 'completion_tokens', None),
+            cached_input_tokens=self._cached_tokens(usage)
+        )
+
+    @staticmethod
+    def _cached_tokens(usage):
+        """Prompt tokens served from the automatic prompt cache, which applies to long shared prefixes"""
+        details = getattr(usage, 'prompt_tokens_details', None)
+        if isinstance(details, dict):
+            return details.get('cached_tokens')
+        return getattr(details, 'cached_tokens', None)
+
+    async def _stream_text(self, completion, model, prompt, system_prompt=None, temperature=0.1, max_tokens=None,
+                           response_schema=None):
+        body = self._request_body(model, prompt, system_prompt, temperature, max_tokens, response_schema)
+        if self.stream_options:
+            body["stream_options"] = self.stream_options
+        stream = await self.client.chat.completions.create(**body, stream=True)
+        async with stream:
+            async for chunk in stream:
+                usage = getattr(chunk, 'usage', None) or getattr(getattr(chunk, 'x_groq', None), 'usage', None)
+                if usage:
+                    completion.input_tokens = getattr(usage, 'prompt_tokens', None)
+                    completion.output_tokens = getattr(usage, 'completion_tokens', None)
+                    completion.cached_input_tokens = self._cached_tokens(usage)
+                if chunk.choices and chunk.choices[0].delta.content:
+                    yield chunk.choices[0].delta.content
+
+    def batch_line(self, custom_id, model, prompt, system_prompt=None, temperature=0.1, max_tokens=None):
+        return {
+            "custom_id": custom_id,
+            "method": "POST",
+            "url": "/v1/chat/completions",
+            "body": self._request_body(model, prompt, system_prompt, temperature, max_tokens)
+        }
+
+    async def submit_batch(self, path):
+        with open(path, 'rb') as f:
+            input_file = await self.client.files.create(file=f, purpose="batch")
+        batch = await self.client.batches.create(input_file_id=input_file.id,
+                                                 endpoint="/v1/chat/completions",
+                                                 completion_window="24h")
+        return batch.id
+
+    async def batch_status(self, batch_id):
+        batch = await self.client.batches.retrieve(batch_id)
+        if batch.status == "completed":
+            return "completed"
+        if batch.status in ("failed", "expired", "cancelled"):
+            return "failed"
+        return "in_progress"
+
+    async def batch_results(self, batch_id):
+        batch = await self.client.batches.retrieve(batch_id)
+        results = {}
+        # Successful requests are in the output file, failed ones in the error file
+        for file_id in (batch.output_file_id, getattr(batch, 'error_file_id', None)):
+            if not file_id:
+                continue
+            content = await self.client.files.content(file_id)
+            for line in content.text.splitlines():
+                if not line.strip():
+                    continue
+                entry = json.loads(line)
+                response = entry.get("response") or {}
+                if response.get("status_code") == 200:
+                    body = response["body"]
+                    usage = body.get("usage") or {}
+                    results[entry["custom_id"]] = Completion(
+                        body["choices"][0]["message"]["content"],
+                        input_tokens=usage.get("prompt_tokens"),
+                        output_tokens=usage.get("completion_tokens"),
+                        cached_input_tokens=self._cached_tokens(usage)
+                    )
+                else:
+                    results[entry["custom_id"]] = Exception(f"Batch request failed: {entry.get('error') or response}")
+        return results
+
+
+class GroqAdapter(OpenAIAdapter):
+    """Groq exposes the same chat completions API as OpenAI"""
+
+    sdk_name = "groq"
+    client_class_name = "AsyncGroq"
+    stream_options = None  # Groq reports streamed usage in x_groq on the last chunk instead
+
+    def _response_format(self, response_schema):
+        return {"type": "json_object"}  # JSON mode; not every Groq model takes a schema
+
+
+class AnthropicAdapter(ProviderAdapter):
+    """Messages API through AsyncAnthropic"""
+
+    supports_batch = True
+    supports_streaming = True
+    supports_structured_output = True
+    sdk_name = "anthropic"
+
+    def _create_client(self):
+        sdk = self.sdk
+        # Retries are handled by the rate limiter, not the SDK
+        return sdk.AsyncAnthropic(api_key=self.api_key, base_url=self.base_url, max_retries=0,
+                                  http_client=self._http_client(sdk))
+
+    def _request_params(self, model, prompt, system_prompt=None, max_tokens=None, response_schema=None):
+        params = {
+            "model": model,
+            "max_tokens": max_tokens or 1024,  # Required by the Messages API
+            "messages": [{"role": "user", "content": prompt}]
+        }
+        if system_prompt:
+            params["system"] = system_prompt
+            # Tools and the system prompt form a cacheable prefix; shorter ones than the model's
+            # minimum aren't cached, so they are sent as is (the built-in prompts are far shorter)
+            min_tokens = self.options.get('cache_min_tokens', PROMPT_CACHE_MIN_TOKENS)
+            if self.options.get('prompt_caching', True) and len(system_prompt) // 4 >= min_tokens:
+                params["system"] = [{"type": "text", "text": system_prompt, "cache_control": {"type": "ephemeral"}}]
+        if response_schema:
+            # The structured reply is the input of a tool call the model is made to use
+            params["tools"] = [{"name": response_schema["name"], "description": "Record the result",
+                                "input_schema": response_schema["schema"]}]
+            params["tool_choice"] = {"type": "tool", "name": response_schema["name"]}
+        return params
+
+    @staticmethod
+    def _message_text(content):
+        """Text of a reply, or the JSON input of its tool call"""
+        for block in content:
+            if block.type == "tool_use":
+                return json.dumps(block.input)
+        return next(block.text for block in content if block.type == "text")
+
+    async def complete(self, model, prompt, system_prompt=None, temperature=0.1, max_tokens=None,
+                       response_schema=None):
+        response = await self.client.messages.create(
+            **self._request_params(model, prompt, system_prompt, max_tokens, response_schema),
+            # Sent as a raw body field since newer SDK releases dropped the temperature keyword
+            extra_body={"temperature": temperature}
+        )
+
+        usage = getattr(response, 'usage', None)
+        return Completion(
+            self._message_text(response.content),
+            input_tokens=self._input_tokens(usage),
+            output_tokens=getattr(usage, 'output_tokens', None),
+            cached_input_tokens=getattr(usage, 'cache_read_input_tokens', None)
+        )
+
+    @staticmethod
+    def _input_tokens(usage):
+        """All prompt tokens; input_tokens leaves out those read from or written to the cache"""
+        tokens = getattr(usage, 'input_tokens', None)
+        if tokens is None:
+            return None
+        return tokens + (getattr(usage, 'cache_read_input_tokens', None) or 0) + \
+            (getattr(usage, 'cache_creation_input_tokens', None) or 0)
+
+    async def _stream_text(self, completion, model, prompt, system_prompt=None, temperature=0.1, max_tokens=None,
+                           response_schema=None):
+        stream = await self.client.messages.create(
+            **self._request_params(model, prompt, system_prompt, max_tokens, response_schema),
+            extra_body={"temperature": temperature},
+            stream=True
+        )
+        async with stream:
+            async for event in stream:
+                if event.type == "message_start":
+                    completion.input_tokens = self._input_tokens(event.message.usage)
+                    completion.cached_input_tokens = getattr(event.message.usage, 'cache_read_input_tokens', None)
+                elif event.type == "message_delta":
+                    completion.output_tokens = getattr(event.usage, 'output_tokens', None)
+                elif event.type == "content_block_delta":
+                    # Text, or the tool call's JSON arriving piece by piece
+                    text = getattr(event.delta, 'text', None) or getattr(event.delta, 'partial_json', None)
+                    if text:
+                        yield text
+
+    def batch_line(self, custom_id, model, prompt, system_prompt=None, temperature=0.1, max_tokens=None):
+        params = self._request_params(model, prompt, system_prompt, max_tokens)
+        params["temperature"] = temperature
+        return {"custom_id": custom_id, "params": params}
+
+    async def submit_batch(self, path):
+        # The Message Batches API takes the requests inline rather than as an uploaded file
+        with open(path, 'r', encoding='utf-8') as f:
+            requests = [json.loads(line) for line in f if line.strip()]
+        batch = await self.client.messages.batches.create(requests=requests)
+        return batch.id
+
+    async def batch_status(self, batch_id):
+        batch = await self.client.messages.batches.retrieve(batch_id)
+        return "completed" if batch.processing_status == "ended" else "in_progress"
+
+    async def batch_results(self, batch_id):
+        results = {}
+        async for entry in await self.client.messages.batches.results(batch_id):
+            if entry.result.type == "succeeded":
+                message = entry.result.message
+                results[entry.custom_id] = Completion(
+                    self._message_text(message.content),
+                    input_tokens=self._input_tokens(message.usage),
+                    output_tokens=getattr(message.usage, 'output_tokens', None),
+                    cached_input_tokens=getattr(message.usage, 'cache_read_input_tokens', None)
+                )
+            else:
+                error = getattr(entry.result, 'error', None)
+                results[entry.custom_id] = Exception(f"Batch request {entry.result.type}: {error}")
+        return results
+
+
+class GoogleAdapter(ProviderAdapter):
+    """Gemini through google.generativeai's async generate_content"""
+
+    supports_streaming = True
+    supports_structured_output = True
+    sdk_name = "google.generativeai"
+
+    def __init__(self, api_key, http_config=None, base_url=None, options=None):
+        super().__init__(api_key, http_config, base_url, options)
+        self.models = {}  # One GenerativeModel per model name
+
+    def _create_client(self):
+        genai = self.sdk
+        # genai keeps the key globally, so it is only set once Gemini is actually called
+        genai.configure(api_key=self.api_key)
+        return genai
+
+    def _model(self, model):
+        if model not in self.models:
+            self.models[model] = self.client.GenerativeModel(model)
+        return self.models[model]
+
+    async def aclose(self):
+        self._client = None  # genai has no connections of its own to close
+
+    def _generation_args(self, prompt, system_prompt=None, temperature=0.1, max_tokens=None, response_schema=None):
+        if system_prompt:
+            prompt = f"{system_prompt}\n\n{prompt}"
+        generation_config = {"temperature": temperature}
+        if max_tokens:
+            generation_config["max_output_tokens"] = max_tokens
+        if response_schema:
+            generation_config["response_mime_type"] = "application/json"
+            # Gemini takes an OpenAPI subset without these keywords
+            generation_config["response_schema"] = without_keywords(response_schema["schema"],
+                                                                    "additionalProperties", "enum")
+        return prompt, generation_config
+
+    async def complete(self, model, prompt, system_prompt=None, temperature=0.1, max_tokens=None,
+                       response_schema=None):
+        prompt, generation_config = self._generation_args(prompt, system_prompt, temperature, max_tokens,
+                                                          response_schema)
+        response = await self._model(model).generate_content_async(prompt, generation_config=generation_config)
+
+        usage = getattr(response, 'usage_metadata', None)
+        return Completion(
+            response.text,
+            input_tokens=getattr(usage, 'prompt_token_count', None),
+            output_tokens=getattr(usage, 'candidates_token_count', None),
+            cached_input_tokens=getattr(usage, 'cached_content_token_count', None)  # Implicit caching
+        )
+
+    async def _stream_text(self, completion, model, prompt, system_prompt=None, temperature=0.1, max_tokens=None,
+                           response_schema=None):
+        prompt, generation_config = self._generation_args(prompt, system_prompt, temperature, max_tokens,
+                                                          response_schema)
+        response = await self._model(model).generate_content_async(prompt, generation_config=generation_config,
+                                                                   stream=True)
+        async for chunk in response:
+            usage = getattr(chunk, 'usage_metadata', None)
+            if usage:
+                completion.input_tokens = getattr(usage, 'prompt_token_count', None)
+                completion.output_tokens = getattr(usage, 'candidates_token_count', None)
+                completion.cached_input_tokens = getattr(usage, 'cached_content_token_count', None)
+            if chunk.candidates and chunk.candidates[0].content.parts:
+                yield chunk.text
+
+
+# Provider name -> adapter class; register_adapter adds new backends
+ADAPTERS = {
+    "openai": OpenAIAdapter,
+    "groq": GroqAdapter,
+    "anthropic": AnthropicAdapter,
+    "google": GoogleAdapter,
+}
+
+
+def register_adapter(provider, adapter_class):
+    """Make a new provider available to RiddleGenerator"""
+    ADAPTERS[provider] = adapter_class
+
+
+def sdk_installed(module_name):
+    """Whether a vendor SDK can be imported, without importing it"""
+    try:
+        return importlib.util.find_spec(module_name) is not None
+    except ModuleNotFoundError:
+        return False  # A parent package, e.g. google, is missing
+
+
+def create_adapter(provider, api_key, http_config=None, base_url=None, options=None):
+    """Build the adapter for a provider; its SDK is checked for but not imported until first use"""
+    if provider not in ADAPTERS:
+        raise ValueError(f"Unknown provider '{provider}'. Available: {sorted(ADAPTERS)}")
+    adapter_class = ADAPTERS[provider]
+    if adapter_class.sdk_name and not sdk_installed(adapter_class.sdk_name):
+        raise ImportError(f"The {provider} adapter requires the '{adapter_class.sdk_name}' package")
+    return adapter_class(api_key, http_config, base_url, options)
+
+
+class BackgroundLoop:
+    """An event loop running in a daemon thread.
+
+    Every adapter call runs on this one loop, so the async clients and their connection
+    pools are created once and reused, while synchronous callers (and any number of
+    threads) simply block on the result.
+    """
+
+    def __init__(self):
+        self._loop = None
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def _ensure_started(self):
+        with self._lock:
+            if self._loop is None:
+                self._loop = asyncio.new_event_loop()
+                self._thread = threading.Thread(target=self._loop.run_forever,
+                                                name="riddle-provider-loop", daemon=True)
+                self._thread.start()
+            return self._loop
+
+    def run(self, coro):
+        """Run a coroutine on the loop and wait for its result"""
+        loop = self._ensure_started()
+        if threading.current_thread() is self._thread:
+            coro.close()
+            raise RuntimeError("Cannot block on the provider loop from inside it; await the coroutine instead")
+        return asyncio.run_coroutine_threadsafe(coro, loop).result()
+
+    def close(self):
+        """Stop the loop and its thread"""
+        with self._lock:
+            if self._loop is None:
+                return
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._thread.join()
+            self._loop.close()
+            self._loop = None
+            self._thread = None
@@ -0,0 +1,158 @@
+import asyncio
+import random
+import time
+
+# HTTP statuses worth retrying: throttling, overload and transient server errors
+RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504, 529}
+
+# Output tokens assumed for a call that sets no max_tokens, until the real usage is known
+DEFAULT_OUTPUT_TOKEN_ESTIMATE = 256
+
+
+def error_status(error):
+    """HTTP status carried by a provider SDK exception, if any"""
+    for attribute in ('status_code', 'code'):
+        status = getattr(error, attribute, None)
+        if isinstance(status, int):
+            return status
+    return None
+
+
+def is_rate_limit_error(error):
+    """True if the provider rejected the call for exceeding its quota"""
+    return error_status(error) == 429
+
+
+def is_retryable_error(error):
+    """True if the call may succeed when retried later"""
+    return error_status(error) in RETRYABLE_STATUS_CODES
+
+
+def estimate_tokens(*texts, max_tokens=None):
+    """Rough token count for a request: ~4 characters per input token plus the output budget"""
+    input_tokens = sum(len(text) for text in texts if text) // 4
+    return input_tokens + (max_tokens or DEFAULT_OUTPUT_TOKEN_ESTIMATE)
+
+
+class TokenBucket:
+    """Token bucket refilled continuously at per_minute, holding at most one minute's worth.
+
+    Callers reserve tokens up front; the bucket may go negative, and the returned wait
+    tells each caller how long to sleep so that reservations are served in order.
+    """
+
+    def __init__(self, per_minute):
+        self.rate = per_minute / 60.0
+        self.capacity = float(per_minute)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def reserve(self, amount):
+        """Take amount tokens and return the seconds to wait before using them"""
+        self._refill()
+        self.tokens -= min(amount, self.capacity)
+        if self.tokens >= 0:
+            return 0.0
+        return -self.tokens / self.rate
+
+    def adjust(self, delta):
+        """Correct an earlier reservation once the real cost is known (positive delta takes more)"""
+        self._refill()
+        self.tokens = min(self.capacity, self.tokens - delta)
+
+
+class ProviderGovernor:
+    """Keeps calls to one provider inside its quota.
+
+    Combines a requests/min bucket, a tokens/min bucket, a cap on calls in flight and
+    retries with jittered exponential backoff for throttled or transiently failing calls.
+    Any limit left as None is not enforced. All methods run on the provider event loop.
+    """
+
+    def __init__(self, requests_per_minute=None, tokens_per_minute=None, max_in_flight=None,
+                 max_retries=5, base_delay=1.0, max_delay=60.0):
+        self.request_bucket = TokenBucket(requests_per_minute) if requests_per_minute else None
+        self.token_bucket = TokenBucket(tokens_per_minute) if tokens_per_minute else None
+        self.max_in_flight = max_in_flight
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.retries = 0  # Total retries made, for reporting
+        self._semaphore = None
+
+    @classmethod
+    def from_config(cls, rate_limits):
+        """Build a governor from an llm_config 'rate_limits' entry"""
+        return cls(
+            requests_per_minute=rate_limits.get('requests_per_minute'),
+            tokens_per_minute=rate_limits.get('tokens_per_minute'),
+            max_in_flight=rate_limits.get('max_in_flight'),
+            max_retries=rate_limits.get('max_retries', 5),
+            base_delay=rate_limits.get('base_delay', 1.0),
+            max_delay=rate_limits.get('max_delay', 60.0)
+        )
+
+    async def _acquire(self, estimated_tokens):
+        """Wait until both buckets allow another request of this size"""
+        wait = 0.0
+        if self.request_bucket:
+            wait = max(wait, self.request_bucket.reserve(1))
+        if self.token_bucket:
+            wait = max(wait, self.token_bucket.reserve(estimated_tokens))
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+    def _backoff(self, attempt, error):
+        """Delay before the next attempt: the server's Retry-After if given, else full jitter"""
+        response = getattr(error, 'response', None)
+        headers = getattr(response, 'headers', None) or {}
+        try:
+            retry_after = float(headers.get('retry-after'))
+        except (TypeError, ValueError):
+            retry_after = None
+        if retry_after is not None:
+            return min(retry_after, self.max_delay)
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+
+    async def call(self, make_call, estimated_tokens=0, on_retry=None):
+        """Run make_call() within the limits, retrying throttled attempts.
+
+        make_call must return a new awaitable each time; its result may carry
+        input_tokens/output_tokens to correct the token bucket. on_retry, if given,
+        is called with the error before each retry.
+        """
+        if self.max_in_flight and self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_in_flight)
+
+        attempt = 0
+        while True:
+            await self._acquire(estimated_tokens)
+            try:
+                if self._semaphore:
+                    async with self._semaphore:
+                        result = await make_call()
+                else:
+                    result = await make_call()
+            except Exception as e:
+                # The attempt still counts as a request, but its tokens were never used
+                if self.token_bucket:
+                    self.token_bucket.adjust(-min(estimated_tokens, self.token_bucket.capacity))
+                if not is_retryable_error(e) or attempt >= self.max_retries:
+                    raise
+                delay = self._backoff(attempt, e)
+                attempt += 1
+                self.retries += 1
+                if on_retry:
+                    on_retry(e)
+                await asyncio.sleep(delay)
+                continue
+
+            used = (getattr(result, 'input_tokens', None) or 0) + (getattr(result, 'output_tokens', None) or 0)
+            if self.token_bucket and used:
+                self.token_bucket.adjust(used - estimated_tokens)
+            return result
@@ -0,0 +1,153 @@
+import os
+import re
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+import numpy as np
+from riddlegenerator.debug import ic
+from riddlegenerator.answer_scoring import answer_text, score_frame
+from riddlegenerator.riddle_index import normalize_text
+from riddlegenerator.result_sink import open_result_sink, read_result_chunks
+
+_RAW_NUMBER = re.compile(r'-?\d+(?:\.\d+)?')
+
+
+def heuristic_judge(df):
+    """The competition's own check: first-number match for math, fuzzy text match for words"""
+    return score_frame(df).to_numpy()
+
+
+def exact_judge(df):
+    """Strict check: math answers must contain the correct number and no other, word answers must match exactly"""
+    verdicts = np.zeros(len(df), dtype=bool)
+    for i, (given, correct) in enumerate(zip(df['Given Answer'], df['Correct Answer'])):
+        given, correct = answer_text(given), answer_text(correct)
+        correct_nums = _RAW_NUMBER.findall(correct)
+        if correct_nums:
+            given_nums = _RAW_NUMBER.findall(given.replace(',', ''))
+            verdicts[i] = len(given_nums) == 1 and float(given_nums[0]) == float(correct_nums[0])
+        else:
+            verdicts[i] = normalize_text(given) == normalize_text(correct)
+    return verdicts
+
+
+# Judges that only look at the results file; they run in worker processes, so must be module-level
+# functions: workers get the function itself, pickled by import path, not its name in JUDGES
+JUDGES = {
+    "heuristic": heuristic_judge,
+    "exact": exact_judge
+}
+
+
+def register_judge(name, judge):
+    """Add a judge: a module-level function taking a results DataFrame and returning its verdicts.
+
+    Worker processes import the judge's module to unpickle it, so it must be importable
+    there (not defined in __main__ of a script or inside another function).
+    """
+    JUDGES[name] = judge
+
+
+class LLMJudge:
+    """Asks a model whether each answer is right, through RiddleGenerator.get_raw_response.
+
+    Each distinct (riddle, correct answer, given answer) is asked once per judge, however
+    many chunks it appears in. Calls run on a thread pool, since they wait on the network
+    rather than the CPU. If a call fails the row keeps its existing verdict, and the
+    question is asked again when it next comes up.
+    """
+
+    def __init__(self, generator, provider, model, max_workers=8):
+        self.generator = generator
+        self.provider = provider
+        self.model = model
+        self.max_workers = max_workers
+        self.errors = 0
+        self.verdicts = {}  # Question -> verdict, for every question answered so far
+
+    def _prompt(self, riddle, correct_answer, given_answer):
+        return ("You are judging a riddle competition.\n"
+                f"Riddle: {riddle}\n"
+                f"Correct answer: {correct_answer}\n"
+                f"Given answer: {given_answer}\n"
+                "Does the given answer mean the same as the correct answer? Reply with just yes or no.")
+
+    def _ask(self, question):
+        try:
+            response = self.generator.get_raw_response(self.provider, self.model, self._prompt(*question))
+            return response.strip().lower().startswith('yes')
+        except Exception as e:
+            ic(f"Judge call failed: {str(e)}")
+            self.errors += 1
+            return None
+
+    def __call__(self, df):
+        questions = list(zip(df['Riddle'].map(answer_text), df['Correct Answer'].map(answer_text),
+                             df['Given Answer'].map(answer_text)))
+        unique = [question for question in dict.fromkeys(questions) if question not in self.verdicts]
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            answers = dict(zip(unique, executor.map(self._ask, unique)))
+        self.verdicts.update((question, verdict) for question, verdict in answers.items() if verdict is not None)
+        return np.array([self.verdicts.get(question, previous)
+                         for question, previous in zip(questions, df['Is Correct'].astype(bool))], dtype=bool)
+
+
+def _judge_chunk(judge, df):
+    """Worker-process entry point: apply a judge function to one chunk"""
+    return judge(df)
+
+
+class Rescorer:
+    """Recomputes 'Is Correct' for an existing results file under a different judge.
+
+    The input is streamed in chunks and written to a new file in the same order, so files
+    larger than memory can be rescored. File-only judges score chunks on a pool of worker
+    processes; an LLMJudge (or any other judge object) runs in this process.
+    """
+
+    def __init__(self, judge="heuristic", workers=None, chunksize=50000):
+        if isinstance(judge, str) and judge not in JUDGES:
+            raise ValueError(f"Unknown judge '{judge}', expected one of {tuple(JUDGES)} or an LLMJudge")
+        self.judge = judge
+        self.workers = workers or os.cpu_count() or 1
+        self.chunksize = chunksize
+
+    def run(self, input_path, output_path, input_format=None, output_format=None):
+        """Rescore input_path into output_path and return counts of rows, changed verdicts and correct answers"""
+        if os.path.abspath(input_path) == os.path.abspath(output_path):
+            raise ValueError("Rescored results must be written to a new file")
+
+        stats = {"rows": 0, "changed": 0, "correct": {}}
+        sink = open_result_sink(output_path, output_format)
+        try:
+            for chunk, verdicts in self._judged_chunks(read_result_chunks(input_path, input_format,
+                                                                          self.chunksize)):
+                previous = chunk['Is Correct'].astype(bool).to_numpy()
+                stats["rows"] += len(chunk)
+                stats["changed"] += int((previous != verdicts).sum())
+                chunk = chunk.assign(**{'Is Correct': verdicts})
+                for (solver, riddle_type), count in chunk[verdicts].groupby(['Solver', 'Type']).size().items():
+                    key = f"{solver}/{riddle_type}"
+                    stats["correct"][key] = stats["correct"].get(key, 0) + int(count)
+                sink.write_frame(chunk)
+        finally:
+            sink.close()
+        return stats
+
+    def _judged_chunks(self, chunks):
+        """Yield (chunk, verdicts) in input order"""
+        if not isinstance(self.judge, str):
+            for chunk in chunks:
+                yield chunk, self.judge(chunk)
+            return
+
+        # Keep a bounded number of chunks in flight so memory stays flat on huge files
+        with ProcessPoolExecutor(max_workers=self.workers) as executor:
+            pending = deque()
+            for chunk in chunks:
+                pending.append((chunk, executor.submit(_judge_chunk, JUDGES[self.judge], chunk)))
+                if len(pending) >= self.workers * 2:
+                    chunk, future = pending.popleft()
+                    yield chunk, future.result()
+            while pending:
+                chunk, future = pending.popleft()
+                yield chunk, future.result()
@@ -0,0 +1,117 @@
+import asyncio
+import threading
+import time
+
+
+class DeadlineExceeded(Exception):
+    """A provider call attempt ran past its deadline"""
+
+    status_code = 504  # Classified like a gateway timeout: retried by the rate limiter, not a broken provider
+
+
+async def with_deadline(awaitable, seconds):
+    """Await with a time limit (None = no limit), raising DeadlineExceeded when it runs out"""
+    if seconds is None:
+        return await awaitable
+    try:
+        return await asyncio.wait_for(awaitable, seconds)
+    except asyncio.TimeoutError:
+        raise DeadlineExceeded(f"No response within {seconds}s")
+
+
+async def hedged(make_call, delay, max_hedges=1, on_hedge=None):
+    """Await make_call(); if it hasn't finished after delay seconds (None = never), start a duplicate.
+
+    Up to max_hedges duplicates are started, delay apart, and the first one to succeed
+    wins; the others are cancelled. An attempt that fails doesn't end the call while
+    others are still running. on_hedge, if given, is called with the number of each hedge.
+    """
+    if delay is None:
+        return await make_call()
+
+    attempts = [asyncio.ensure_future(make_call())]
+    hedges = 0
+    error = None
+    try:
+        while attempts:
+            timeout = delay if hedges < max_hedges else None
+            done, _ = await asyncio.wait(attempts, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+            if not done:
+                attempts.append(asyncio.ensure_future(make_call()))
+                hedges += 1
+                if on_hedge:
+                    on_hedge(hedges)
+                continue
+            for attempt in done:
+                attempts.remove(attempt)
+                if attempt.exception() is None:
+                    return attempt.result()
+                error = attempt.exception()
+        raise error
+    finally:
+        for attempt in attempts:
+            attempt.cancel()
+
+
+class CircuitBreaker:
+    """Pauses a provider after repeated failures and lets it back in after a cool-down.
+
+    Closed: the provider takes part. After failure_threshold failures in a row it opens
+    and is left out for reset_seconds. Then it is half-open: the next call is a trial,
+    and a success closes the circuit while a failure opens it again for twice as long
+    (up to max_reset_seconds).
+    """
+
+    def __init__(self, failure_threshold=3, reset_seconds=30, max_reset_seconds=600, clock=time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.base_reset_seconds = reset_seconds
+        self.max_reset_seconds = max_reset_seconds
+        self.reset_seconds = reset_seconds  # Current cool-down; doubles after a failed trial
+        self.failures = 0  # Failures in a row
+        self.trips = 0  # How often the circuit has opened
+        self._opened_at = None
+        self._clock = clock
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, config):
+        """Build from a 'circuit_breaker' config entry; missing keys use the defaults"""
+        return cls(**{key: config[key] for key in ("failure_threshold", "reset_seconds", "max_reset_seconds")
+                      if key in config})
+
+    @property
+    def state(self):
+        """'closed', 'open' or 'half_open'"""
+        with self._lock:
+            return self._state()
+
+    def _state(self):
+        if self._opened_at is None:
+            return "closed"
+        if self._clock() - self._opened_at < self.reset_seconds:
+            return "open"
+        return "half_open"
+
+    def allow(self):
+        """Whether the provider may be called now (closed, or half-open for a trial)"""
+        return self.state != "open"
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self._opened_at = None
+            self.reset_seconds = self.base_reset_seconds
+
+    def record_failure(self):
+        """Count a failure; returns True if it opened the circuit"""
+        with self._lock:
+            self.failures += 1
+            state = self._state()
+            if state == "half_open":
+                # The trial failed: back out for longer
+                self.reset_seconds = min(self.reset_seconds * 2, self.max_reset_seconds)
+            elif state == "open" or self.failures < self.failure_threshold:
+                return False
+            self._opened_at = self._clock()
+            self.trips += 1
+            return True
@@ -0,0 +1,122 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from riddlegenerator.providers import Completion
+
+CACHE_MODES = ("off", "readwrite", "replay")
+
+
+class CacheMissError(Exception):
+    """Raised in replay mode when a call has no cached response"""
+
+
+class ResponseCache:
+    """On-disk SQLite cache of provider responses.
+
+    Entries expire after ttl_seconds and the least recently used ones are evicted once
+    more than max_entries are stored. In "replay" mode the cache is read-only and a miss
+    raises CacheMissError instead of calling the provider.
+    """
+
+    def __init__(self, path, mode="readwrite", ttl_seconds=None, max_entries=None):
+        if mode not in CACHE_MODES:
+            raise ValueError(f"Unknown cache mode '{mode}', expected one of {CACHE_MODES}")
+        self.path = str(path)
+        self.mode = mode
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+        if os.path.dirname(self.path):
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                provider TEXT,
+                model TEXT,
+                text TEXT,
+                input_tokens INTEGER,
+                output_tokens INTEGER,
+                created_at REAL,
+                accessed_at REAL
+            )""")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS responses_accessed_at ON responses (accessed_at)")
+        self._conn.commit()
+
+    @staticmethod
+    def make_key(provider, model, prompt, system_prompt=None, temperature=None, occurrence=0, request=None):
+        """Hash of everything that determines a response.
+
+        occurrence numbers repeated identical calls within a run, so that e.g. the
+        second request for a riddle replays the second response rather than the first.
+        request holds any other parameters that shape the reply (output cap, response
+        schema, stop condition), so a reply cut short or unstructured isn't replayed for
+        a call that asked for something else.
+        """
+        call = [provider, model, prompt, system_prompt, temperature, occurrence]
+        if request:
+            call.append(request)
+        payload = json.dumps(call, sort_keys=True)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def get(self, key):
+        """Return the cached Completion for key, or None"""
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT text, input_tokens, output_tokens, created_at FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is not None and self.ttl_seconds and now - row[3] > self.ttl_seconds:
+                if self.mode != "replay":
+                    self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                    self._conn.commit()
+                row = None
+            if row is None:
+                self.misses += 1
+                return None
+
+            self.hits += 1
+            if self.mode != "replay":
+                self._conn.execute("UPDATE responses SET accessed_at = ? WHERE key = ?", (now, key))
+                self._conn.commit()
+        return Completion(row[0], input_tokens=row[1], output_tokens=row[2])
+
+    def put(self, key, provider, model, completion):
+        """Store a response, evicting least recently used entries past max_entries"""
+        if self.mode == "replay":
+            return
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (key, provider, model, completion.text, completion.input_tokens,
+                 completion.output_tokens, now, now)
+            )
+            if self.max_entries:
+                self._conn.execute("""
+                    DELETE FROM responses WHERE key IN (
+                        SELECT key FROM responses ORDER BY accessed_at DESC LIMIT -1 OFFSET ?
+                    )""", (self.max_entries,))
+            self._conn.commit()
+
+    def stats(self):
+        """Hit/miss counters and current size"""
+        with self._lock:
+            entries = self._conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups * 100, 2) if lookups else 0.0,
+            "entries": entries
+        }
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,230 @@
+import csv
+import os
+
+RESULT_COLUMNS = ['Round', 'Type', 'Riddler', 'Solver', 'Riddle', 'Correct Answer', 'Given Answer', 'Is Correct']
+SINK_FORMATS = ("csv", "arrow")
+
+# Rows per record batch of an Arrow results file
+ARROW_BATCH_ROWS = 1000
+
+
+class MemoryResultSink:
+    """Keeps result rows in a list; used when no output file is given"""
+
+    def __init__(self, rows=None):
+        self.rows = list(rows or [])
+
+    def write(self, row):
+        self.rows.append(row)
+
+    def write_frame(self, df):
+        """Write a DataFrame of result rows at once"""
+        self.rows.extend(df[RESULT_COLUMNS].to_dict('records'))
+
+    def flush(self):
+        """Get every row written so far onto disk, e.g. before a checkpoint counts them"""
+
+    def close(self):
+        pass
+
+    def read_chunks(self, chunksize=100000):
+        """Yield the rows as DataFrames of at most chunksize rows"""
+        import pandas as pd
+        for start in range(0, len(self.rows), chunksize):
+            yield pd.DataFrame(self.rows[start:start + chunksize], columns=RESULT_COLUMNS)
+
+    def read(self):
+        """All rows as one DataFrame"""
+        import pandas as pd
+        return pd.DataFrame(self.rows, columns=RESULT_COLUMNS)
+
+
+class CsvResultSink(MemoryResultSink):
+    """Appends each result row to a CSV file as soon as it is scored.
+
+    The file is flushed after every row, so a crash loses at most the row being written.
+    With append=True rows are added to an existing file (used when resuming a run); keep_rows
+    then drops any rows after the first keep_rows, e.g. ones written after the last checkpoint.
+    """
+
+    format = "csv"
+
+    def __init__(self, path, append=False, keep_rows=None):
+        self.path = path
+        exists = append and os.path.exists(path) and os.path.getsize(path) > 0
+        if exists and keep_rows is not None:
+            self._truncate(keep_rows)
+        self._file = open(path, 'a' if exists else 'w', newline='', encoding='utf-8')
+        self._writer = csv.DictWriter(self._file, fieldnames=RESULT_COLUMNS)
+        if not exists:
+            self._writer.writeheader()
+            self._file.flush()
+
+    def _truncate(self, keep_rows):
+        """Rewrite the file with only its header and first keep_rows rows"""
+        tmp_path = self.path + '.tmp'
+        with open(self.path, 'r', newline='', encoding='utf-8') as src, \
+                open(tmp_path, 'w', newline='', encoding='utf-8') as dst:
+            reader, writer = csv.reader(src), csv.writer(dst)
+            for line_num, record in enumerate(reader):
+                if line_num > keep_rows:
+                    break
+                writer.writerow(record)
+        os.replace(tmp_path, self.path)
+
+    def write(self, row):
+        self._writer.writerow(row)
+        self._file.flush()
+
+    def write_frame(self, df):
+        df[RESULT_COLUMNS].to_csv(self._file, header=False, index=False, lineterminator='\r\n')  # As csv.writer
+        self._file.flush()
+
+    def flush(self):
+        self._file.flush()
+
+    def close(self):
+        if not self._file.closed:
+            self._file.close()
+
+    def read_chunks(self, chunksize=100000):
+        self._file.flush()
+        yield from read_result_chunks(self.path, "csv", chunksize)
+
+    def read(self):
+        self._file.flush()
+        return read_results(self.path, "csv")
+
+
+class ArrowResultSink(MemoryResultSink):
+    """Appends result rows to an Arrow IPC stream file (requires pyarrow).
+
+    Rows are buffered and written in record batches of batch_rows, and on flush() and
+    close(); the stream format stays readable up to the last complete batch even if the
+    process dies before close().
+    """
+
+    format = "arrow"
+
+    def __init__(self, path, append=False, keep_rows=None, batch_rows=ARROW_BATCH_ROWS):
+        try:
+            import pyarrow as pa
+            import pyarrow.ipc
+        except ImportError:
+            raise ImportError("The arrow results format requires pyarrow: pip install pyarrow")
+        self._pa = pa
+        self.path = path
+        self.batch_rows = batch_rows
+        self._rows = []  # Rows not written yet
+        self.schema = pa.schema([
+            ('Round', pa.int64()), ('Type', pa.string()), ('Riddler', pa.string()), ('Solver', pa.string()),
+            ('Riddle', pa.string()), ('Correct Answer', pa.string()), ('Given Answer', pa.string()),
+            ('Is Correct', pa.bool_())
+        ])
+
+        # A stream can't be reopened for appending, so earlier batches are copied into a new
+        # file that then replaces the old one; the old file is memory-mapped while copying
+        append = append and os.path.exists(path) and os.path.getsize(path) > 0
+        self._sink = pa.OSFile(path + '.tmp' if append else path, 'wb')
+        self._writer = pa.ipc.new_stream(self._sink, self.schema)
+        if append:
+            for batch in _arrow_batches(path):
+                if keep_rows is not None:
+                    if keep_rows <= 0:
+                        break
+                    batch = batch.slice(0, keep_rows)
+                    keep_rows -= batch.num_rows
+                self._writer.write_batch(batch)
+            self._sink.flush()
+            os.replace(path + '.tmp', path)
+
+    def write(self, row):
+        self._rows.append({column: row[column] for column in RESULT_COLUMNS})
+        if len(self._rows) >= self.batch_rows:
+            self.flush()
+
+    def write_frame(self, df):
+        self.flush()
+        self._writer.write_batch(self._pa.RecordBatch.from_pandas(df[RESULT_COLUMNS], schema=self.schema,
+                                                                  preserve_index=False))
+        self._sink.flush()
+
+    def flush(self):
+        if self._rows:
+            self._writer.write_batch(self._pa.RecordBatch.from_pylist(self._rows, schema=self.schema))
+            self._rows = []
+        self._sink.flush()
+
+    def close(self):
+        if not self._sink.closed:
+            self.flush()
+            self._writer.close()
+            self._sink.close()
+
+    def read_chunks(self, chunksize=100000):
+        if not self._sink.closed:
+            self.flush()
+        yield from read_result_chunks(self.path, "arrow", chunksize)
+
+    def read(self):
+        if not self._sink.closed:
+            self.flush()
+        return read_results(self.path, "arrow")
+
+
+def _format_for(path, format=None):
+    format = format or ("arrow" if str(path).endswith(('.arrow', '.arrows')) else "csv")
+    if format not in SINK_FORMATS:
+        raise ValueError(f"Unknown results format '{format}', expected one of {SINK_FORMATS}")
+    return format
+
+
+def _arrow_batches(path):
+    """Record batches of an Arrow IPC stream, stopping at a batch cut short by an interrupted run"""
+    import pyarrow as pa
+    import pyarrow.ipc
+    reader = pa.ipc.open_stream(pa.memory_map(str(path)))
+    while True:
+        try:
+            yield reader.read_next_batch()
+        except (StopIteration, pa.ArrowInvalid, OSError):
+            return
+
+
+def read_result_chunks(path, format=None, chunksize=100000):
+    """Stream a results file written by a sink as DataFrames of about chunksize rows"""
+    import pandas as pd
+    if _format_for(path, format) == "csv":
+        # Answers stay strings ("4", not 4.0) and empty answers stay empty rather than NaN
+        yield from pd.read_csv(path, chunksize=chunksize, keep_default_na=False,
+                               dtype={'Riddle': str, 'Correct Answer': str, 'Given Answer': str})
+        return
+
+    import pyarrow as pa
+    batches, rows = [], 0
+    for batch in _arrow_batches(path):
+        batches.append(batch)
+        rows += batch.num_rows
+        if rows >= chunksize:
+            yield pa.Table.from_batches(batches).to_pandas()
+            batches, rows = [], 0
+    if batches:
+        yield pa.Table.from_batches(batches).to_pandas()
+
+
+def read_results(path, format=None):
+    """Read a whole results file written by a sink"""
+    import pandas as pd
+    chunks = list(read_result_chunks(path, format))
+    if not chunks:
+        return pd.DataFrame(columns=RESULT_COLUMNS)
+    return pd.concat(chunks, ignore_index=True)
+
+
+def open_result_sink(path=None, format=None, append=False, keep_rows=None):
+    """Open a sink for result rows: in memory without a path, else CSV or Arrow (default from the extension)"""
+    if path is None:
+        return MemoryResultSink()
+    if _format_for(path, format) == "arrow":
+        return ArrowResultSink(path, append=append, keep_rows=keep_rows)
+    return CsvResultSink(path, append=append, keep_rows=keep_rows)
@@ -1,50 +1,126 @@
 from riddlegenerator.riddle_generator import RiddleGenerator
-import pandas as pd
-from icecream import ic
-from difflib import SequenceMatcher
-import re
+from riddlegenerator.rate_limiter import is_rate_limit_error
+from riddlegenerator.batch_jobs import BatchJobRunner
+from riddlegenerator.riddle_index import RiddleIndex, normalize_text
+from riddlegenerator.riddle_store import RiddleStore
+from riddlegenerator.result_sink import MemoryResultSink, open_result_sink, read_results
+from riddlegenerator.checkpoint import Checkpoint
+from riddlegenerator.answer_scoring import check_answer
+from riddlegenerator.resilience import CircuitBreaker
+from riddlegenerator.early_stopping import RankingMonitor
+from riddlegenerator.debug import ic
+from concurrent.futures import ThreadPoolExecutor
+from collections import Counter, defaultdict, deque
+from itertools import zip_longest
+from contextlib import closing, nullcontext
+from functools import partial
+import asyncio
+import threading
 import random
+import zlib
+
+CONCURRENCY_MODES = ("sequential", "threads", "asyncio")
+# Sent as the system prompt of every solver call, so that only the riddle varies between calls
+SOLVER_SYSTEM_PROMPT = "Answer the riddle you are given with just the answer, no explanation."
+
+
+def shard_of(riddler, round_num, num_shards):
+    """Shard a riddler's round belongs to: stable across processes, machines and Python versions"""
+    return zlib.crc32(f"{riddler}/{round_num}".encode()) % num_shards
+
+
+class CompetitionReport(dict):
+    """Report of a competition; with load_results, 'detailed_results' is only read from the
+    results file when first looked up"""
+
+    def __init__(self, load_results=None):
+        super().__init__()
+        self.load_results = load_results
+
+    def __missing__(self, key):
+        if key != 'detailed_results' or self.load_results is None:
+            raise KeyError(key)
+        self[key] = self.load_results()
+        return self[key]
+
+    def __contains__(self, key):
+        return super().__contains__(key) or (key == 'detailed_results' and self.load_results is not None)
+
+    def get(self, key, default=None):
+        return self[key] if key in self else default
+
 
 class RiddleCompetition:
-    def __init__(self, riddles_per_llm=2):
-        self.generator = RiddleGenerator()
-        # Separate scores for word and math riddles
-        self.scores = {
-            "groq": {"word": 0, "math": 0},
-            "openai": {"word": 0, "math": 0},
-            "google": {"word": 0, "math": 0},
-            "anthropic": {"word": 0, "math": 0}
-        }
+    def __init__(self, riddles_per_llm=2, concurrency="sequential", max_workers=None, pipeline_depth=0,
+                 cache_mode=None, riddle_store_path=None, batch_size=1, results_path=None, results_format=None,
+                 checkpoint_path=None, resume=False, config_path=None, metrics_port=None, stream_responses=None,
+                 max_tokens=None, shard=None, early_stopping=None, checkpoint_interval=None):
+        if concurrency not in CONCURRENCY_MODES:
+            raise ValueError(f"Unknown concurrency mode '{concurrency}', expected one of {CONCURRENCY_MODES}")
+        self.generator = RiddleGenerator(cache_mode=cache_mode, config_path=config_path,
+                                         stream_responses=stream_responses, max_tokens=max_tokens)
+        self.competitors = self._get_competitors()  # (name, provider, model) for every llm_configs entry
+        # Separate scores for word and math riddles, for every competitor
+        self.scores = {name: {"word": 0, "math": 0} for name, _, _ in self.competitors}
         self.riddles_per_llm = riddles_per_llm  # Use the provided value
         self.used_riddles = []
+        self.riddle_index = RiddleIndex()  # Near-duplicate index over used_riddles and stored history
+        self._indexed_riddles = 0  # How many of used_riddles are in riddle_index
+        self.concurrency = concurrency  # How solvers are asked: sequential, threads or asyncio
+        self.max_workers = max_workers  # Upper bound on simultaneous solver calls (None = one per solver)
+        self.pipeline_depth = pipeline_depth  # Riddles generated ahead in the background (0 = generate on demand)
+        self.batch_size = batch_size  # Riddles requested per generation call
+        self._riddle_buffers = defaultdict(deque)  # (provider, model, type) -> unused riddles from batches
+        self._scores_lock = threading.Lock()
+        self._riddles_lock = threading.Lock()  # Keeps the similarity check and used_riddles update atomic;
+        # also guards _unit_riddles, which pipelined generation fills in the background
+        self._executor = None
+        self.results_path = results_path  # Detailed results are streamed here as they are scored (None = memory)
+        self.results_format = results_format  # csv or arrow (None = from the file extension)
+        # Progress saved after a round at most every checkpoint_interval seconds (default 30)
+        self.checkpoint = Checkpoint(checkpoint_path, checkpoint_interval) if checkpoint_path else None
+        self.resume = resume  # Pick up from the checkpoint instead of starting over
+        self._completed = set()  # (riddler, round, solver) answers already scored
+        self._unit_riddles = {}  # "riddler name/round" -> riddle asked in that round
+        self._rows_written = 0  # Result rows covered by the completed answers
+        self.breakers = self._initialize_breakers()  # Competitor -> CircuitBreaker pausing it after failures
+        self.shard = shard  # (index, count): only play the (riddler, round) units assigned to this shard
+        self._store_seen_id = None  # Last riddle store row in the similarity index
+        
+        # Stop once the ranking is settled, if asked to or enabled in the config
+        early_stopping_config = self.generator.config.get('early_stopping') or {}
+        if early_stopping is None:
+            early_stopping = early_stopping_config.get('enabled', False)
+        self.ranking_monitor = RankingMonitor.from_config(early_stopping_config) if early_stopping else None
+        
+        # Riddles from earlier runs, if a persistent store is configured
+        riddle_store_path = riddle_store_path or self.generator.config.get('riddle_store', {}).get('path')
+        self.riddle_store = RiddleStore(riddle_store_path) if riddle_store_path else None
+        if self.riddle_store:
+            self._load_riddle_history()
+        
+        # Prometheus endpoint for the generator's call metrics, if a port is given or configured
+        metrics_port = metrics_port or self.generator.config.get('metrics', {}).get('port')
+        self.metrics_server = self.generator.metrics.serve(metrics_port) if metrics_port else None
         
     def _is_similar_riddle(self, new_riddle, similarity_threshold=0.6):
         """Check if a riddle is too similar to previously used ones"""
-        normalized_new = self._normalize_text(new_riddle)
-        key_words = set(normalized_new.split())
-        
-        for old_riddle in self.used_riddles:
-            normalized_old = self._normalize_text(old_riddle)
-            old_words = set(normalized_old.split())
-            
-            common_words = key_words.intersection(old_words)
-            if len(common_words) >= 3:
-                return True
-                
-            similarity = SequenceMatcher(None, normalized_new, normalized_old).ratio()
-            if similarity > similarity_threshold:
-                return True
-                
-        return False
+        # Index anything appended to used_riddles since the last check
+        for old_riddle in self.used_riddles[self._indexed_riddles:]:
+            self.riddle_index.add(old_riddle)
+        self._indexed_riddles = len(self.used_riddles)
+        return self.riddle_index.is_similar(new_riddle, similarity_threshold)
+
+    def _load_riddle_history(self):
+        """Stream word riddles from earlier runs, or from other shards since the last call, into the similarity index"""
+        # Only word riddles are checked for similarity, so math history is not needed
+        for row in self.riddle_store.iter_riddles(riddle_type="word", after_id=self._store_seen_id):
+            self.riddle_index.add(row['riddle'])
+            self._store_seen_id = row['id']
 
     def _normalize_text(self, text):
         """Normalize text for comparison"""
-        text = str(text).lower()
-        text = re.sub(r'[^\w\s]', '', text)
-        filler_words = ['i', 'am', 'a', 'an', 'the', 'but', 'and', 'or', 'what']
-        words = text.split()
-        words = [w for w in words if w not in filler_words]
-        return ' '.join(words)
+        return normalize_text(text)
 
     def _get_unique_riddle(self, provider, model, riddle_type, max_attempts=3):
         """Get a unique riddle of specified type"""
@@ -52,14 +128,22 @@ class RiddleCompetition:
         last_error = None
         
         while attempts < max_attempts:
+            requested = True
             try:
-                self.generator.prompt = self.generator.prompts[riddle_type]
-                riddle_data = self.generator.get_riddle(provider, model)
+                riddle_data, requested = self._next_riddle(provider, model, riddle_type)
                 
-                # Skip similarity check for math riddles
-                if riddle_type == "math" or not self._is_similar_riddle(riddle_data['riddle']):
-                    self.used_riddles.append(riddle_data['riddle'])
-                    return riddle_data
+                # Skip similarity check for math riddles. With a store, the check and the append are
+                # atomic across every process sharing it, after catching up on what the others stored
+                with self._riddles_lock, (self.riddle_store.exclusive() if self.riddle_store else nullcontext()):
+                    if self.riddle_store:
+                        self._load_riddle_history()
+                    if riddle_type == "math" or not self._is_similar_riddle(riddle_data['riddle']):
+                        self.used_riddles.append(riddle_data['riddle'])
+                        if self.riddle_store:
+                            row_id = self.riddle_store.append(riddle_data, provider, model)
+                            if riddle_type == "word":
+                                self._store_seen_id = row_id  # Already indexed through used_riddles
+                        return riddle_data
                     
                 print(f"Attempt {attempts + 1}: Generated similar riddle, trying again...")
                 
@@ -67,7 +151,9 @@ class RiddleCompetition:
                 last_error = e
                 print(f"Attempt {attempts + 1} failed: {str(e)}")
                 
-            attempts += 1
+            # Rejecting a riddle already in hand from a batch doesn't use up an attempt
+            if requested:
+                attempts += 1
             
         # If we failed to get a unique riddle, use a default one
         if riddle_type == "math":
@@ -84,116 +170,515 @@ class RiddleCompetition:
                 "answer": "An echo"
             }
 
+    def _next_riddle(self, provider, model, riddle_type):
+        """Next candidate riddle from a riddler, and whether a new request was needed for it.
+        
+        With batch_size > 1, riddles come from a buffer refilled by one request for a whole batch.
+        """
+        if self.batch_size <= 1:
+            return self.generator.get_riddle(provider, model, riddle_type), True
+        
+        buffer = self._riddle_buffers[(provider, model, riddle_type)]
+        try:
+            return buffer.popleft(), False
+        except IndexError:
+            batch = self.generator.get_riddles(provider, model, riddle_type, self.batch_size)
+            buffer.extend(batch[1:])
+            return batch[0], True
+
+    def _initialize_breakers(self):
+        """A circuit breaker per competitor, from the top-level 'circuit_breaker' config overridden per entry"""
+        breakers = {}
+        for (name, _, _), config in zip(self.competitors, self.generator.config['llm_configs']):
+            settings = dict(self.generator.config.get('circuit_breaker') or {},
+                            **(config.get('circuit_breaker') or {}))
+            breakers[name] = CircuitBreaker.from_config(settings)
+        return breakers
+
     def run_competition(self):
         """Run the riddle competition between LLMs"""
-        results = []
-        active_providers = set(provider for provider, _ in self._get_llm_configs())
+        if self.concurrency == "threads":
+            with ThreadPoolExecutor(max_workers=self.max_workers or len(self.competitors)) as executor:
+                self._executor = executor
+                try:
+                    return self._run_rounds()
+                finally:
+                    self._executor = None
+        return self._run_rounds()
+
+    def _run_rounds(self):
+        """Play every riddler's rounds and return the report"""
+        active_competitors = set(name for name, _, _ in self.competitors)
+        state = self.checkpoint.load() if self.checkpoint and self.resume else None
+        if state:
+            active_competitors = self._restore_checkpoint(state)
+        results = self._open_results(resume=state is not None)
         
-        # Each LLM takes turns being the riddler
-        for riddler_provider, riddler_model in self._get_llm_configs():
-            if riddler_provider not in active_providers:
-                continue
-                
-            print(f"\n=== {riddler_provider} is asking riddles ===")
+        # Each LLM takes turns being the riddler, asking the specified number of riddles
+        units = [unit for unit in self._units()
+                 if self._in_shard(unit[0], unit[3])
+                 and self._pending_solvers(unit[0], unit[3], active_competitors)]
+        try:
+            skipped_units = self._play_units(units, active_competitors, results)
+        except BaseException:
+            # Interrupted: save what was scored since the last checkpoint before giving up
+            self._save_checkpoint(active_competitors, results, force=True)
+            raise
+
+        # Only a run with answers missing, e.g. from throttled solvers, has anything left to resume
+        if self._unfinished(units[:len(units) - len(skipped_units)], active_competitors):
+            self._save_checkpoint(active_competitors, results, force=True)
+        elif self.checkpoint:
+            self.checkpoint.delete()
+
+        report = self._finish_results(results)
+        if self.ranking_monitor:
+            report['early_stopping'] = self._early_stopping_report(units, skipped_units, active_competitors)
+        return report
+
+    def _play_units(self, units, active_competitors, results):
+        """Play the units' rounds, writing scored answers to results; returns the units skipped by early stopping"""
+        current_riddler = None
+        skipped_units = []
+        
+        # Closing the source waits for the riddles generated ahead, which are then kept by the
+        # checkpoint saved next, e.g. when the run is interrupted
+        with closing(self._riddle_source(units)) as source:
+            for index, ((riddler, riddler_provider, riddler_model, round_num), fetch_riddle) in \
+                    enumerate(source):
+                if self.ranking_monitor and self._ranking_settled():
+                    skipped_units = units[index:]
+                    print(f"\nRanking settled at {self.ranking_monitor.confidence:.0%} confidence, "
+                          f"skipping the last {len(skipped_units)} rounds")
+                    break
+                if riddler not in active_competitors:
+                    continue
+                if not self.breakers[riddler].allow():
+                    print(f"\n{riddler} is paused, skipping its round {round_num + 1}")
+                    self.generator.metrics.record(riddler_provider, riddler_model, "riddle", 0, outcome="circuit_open")
+                    continue
             
-            # Ask specified number of riddles
-            for round_num in range(self.riddles_per_llm):
-                riddle_type = "word" if round_num < self.riddles_per_llm/2 else "math"
+                if riddler != current_riddler:
+                    current_riddler = riddler
+                    print(f"\n=== {riddler} is asking riddles ===")
+            
+                riddle_type = self._riddle_type(round_num)
                 print(f"\nRound {round_num + 1}")
-                
+            
                 try:
                     # Get a unique riddle from the riddler
-                    riddle_data = self._get_unique_riddle(riddler_provider, riddler_model, riddle_type)
+                    riddle_data = fetch_riddle()
                     riddle = riddle_data['riddle']
                     correct_answer = riddle_data['answer']
                     solution = riddle_data.get('solution', '')
-                    
+                
                     print(f"Riddle: {riddle}")
                     print(f"Correct Answer: {correct_answer}")
                     if solution:
                         print(f"Solution: {solution}")
+                
+                    # Each other LLM that hasn't answered yet tries to solve it
+                    solvers = self._pending_solvers(riddler, round_num, active_competitors)
+                    for _, provider, model in self._pending_solvers(riddler, round_num, active_competitors, paused=True):
+                        self.generator.metrics.record(provider, model, "response", 0, outcome="circuit_open")
+                    answers = self._ask_solvers([(provider, model) for _, provider, model in solvers],
+                                                self._solver_prompt(riddle))
+                
+                    # Record answers in config order regardless of which solver finished first
+                    for (solver, _, _), (response, error) in zip(solvers, answers):
+                        breaker = self.breakers[solver]
+                        if error is not None:
+                            print(f"Error with solver {solver}: {str(error)}")
+                            if is_rate_limit_error(error):
+                                # Still throttled after retries: skip this answer but keep the solver
+                                print(f"{solver} skipped this round")
+                                continue
+                            # Errors and missed deadlines count towards pausing the solver for a while
+                            if breaker.record_failure():
+                                print(f"{solver} is paused for {breaker.reset_seconds:g}s "
+                                      f"after {breaker.failures} failures")
+                            else:
+                                print(f"{solver} skipped this round")
+                            continue
                     
-                    # Each other LLM tries to solve it
-                    for solver_provider, solver_model in self._get_llm_configs():
-                        if solver_provider != riddler_provider and solver_provider in active_providers:
-                            try:
-                                # Get the solver's answer
-                                prompt = f"Answer this riddle with just the answer, no explanation: {riddle}"
-                                response = self.generator.get_raw_response(solver_provider, solver_model, prompt)
-                                print(f"{solver_provider} answered: {response}")
-                                
-                                # Check if answer is correct
-                                is_correct = self._check_answer(response, correct_answer)
-                                if is_correct:
-                                    self.scores[solver_provider][riddle_type] += 1
-                                
-                                results.append({
-                                    'Round': round_num + 1,
-                                    'Type': riddle_type,
-                                    'Riddler': riddler_provider,
-                                    'Solver': solver_provider,
-                                    'Riddle': riddle,
-                                    'Correct Answer': correct_answer,
-                                    'Given Answer': response,
-                                    'Is Correct': is_correct
-                                })
-                                
-                            except Exception as e:
-                                print(f"Error with solver {solver_provider}: {str(e)}")
-                                active_providers.discard(solver_provider)
-                                print(f"{solver_provider} has been removed from the competition")
-                                
+                        breaker.record_success()
+                        print(f"{solver} answered: {response}")
+                        results.write(self._score_answer(round_num, riddle_type, riddler, solver,
+                                                         riddle, correct_answer, response))
+                        self._completed.add((riddler, round_num, solver))
+                        self._rows_written += 1
+                            
                 except Exception as e:
                     print(f"Error in round {round_num + 1}: {str(e)}")
                     continue
+                finally:
+                    self._save_checkpoint(active_competitors, results)
+        return skipped_units
+
+    def _unfinished(self, units, active_competitors):
+        """Whether any active solver still has to answer one of the units' riddles"""
+        return any((riddler, round_num, solver) not in self._completed
+                   for riddler, _, _, round_num in units
+                   for solver, _, _ in self.competitors
+                   if solver != riddler and solver in active_competitors)
+
+    def _units(self):
+        """(riddler, provider, model, round) units in playing order.
+        
+        Normally each riddler asks all its rounds in turn. When stopping early, every riddler
+        asks one round at a time instead, alternating word and math rounds, so the results
+        so far always cover every riddler and both riddle types evenly.
+        """
+        if not self.ranking_monitor:
+            return [(riddler, provider, model, round_num)
+                    for riddler, provider, model in self.competitors
+                    for round_num in range(self.riddles_per_llm)]
+        word_rounds = [n for n in range(self.riddles_per_llm) if self._riddle_type(n) == "word"]
+        math_rounds = [n for n in range(self.riddles_per_llm) if self._riddle_type(n) == "math"]
+        rounds = [n for pair in zip_longest(word_rounds, math_rounds) for n in pair if n is not None]
+        return [(riddler, provider, model, round_num)
+                for round_num in rounds
+                for riddler, provider, model in self.competitors]
+
+    def _answer_counts(self):
+        """({solver: correct answers}, {solver: answers}) scored so far"""
+        with self._scores_lock:
+            correct = {name: sum(counts.values()) for name, counts in self.scores.items()}
+        answered = Counter(solver for _, _, solver in self._completed)
+        return correct, {name: answered[name] for name, _, _ in self.competitors}
+
+    def _ranking_settled(self):
+        """Whether more rounds would no longer change the ranking, by the ranking monitor"""
+        return self.ranking_monitor.settled(*self._answer_counts())
+
+    def _early_stopping_report(self, units, skipped_units, active_competitors):
+        """Final ranking and intervals of an early-stopping run, and the calls its skipped rounds would have made"""
+        # Riddles already being generated ahead when the run stopped were paid for anyway
+        in_flight = self.pipeline_depth + 1 if self.pipeline_depth else 0
+        riddle_calls = sum(1 for riddler, _, _, round_num in skipped_units[in_flight:]
+                           if f"{riddler}/{round_num}" not in self._unit_riddles)
+        solver_calls = sum(len(self._pending_solvers(riddler, round_num, active_competitors))
+                           for riddler, _, _, round_num in skipped_units)
+        correct, answered = self._answer_counts()
+        intervals = self.ranking_monitor.intervals(correct, answered)
+        return {
+            'settled': bool(skipped_units) or self.ranking_monitor.settled(correct, answered),
+            'confidence': self.ranking_monitor.confidence,
+            'rounds_played': len(units) - len(skipped_units),
+            'rounds_skipped': len(skipped_units),
+            'calls_saved': riddle_calls + solver_calls,
+            'riddle_calls_saved': riddle_calls,
+            'solver_calls_saved': solver_calls,
+            'ranking': self.ranking_monitor.ranking(correct, answered),
+            'intervals': {solver: [round(low, 4), round(high, 4)] for solver, (low, high) in intervals.items()}
+        }
+
+    def _in_shard(self, riddler, round_num):
+        """Whether a riddler's round is this competition's to play"""
+        if self.shard is None:
+            return True
+        index, count = self.shard
+        return shard_of(riddler, round_num, count) == index
+
+    def _pending_solvers(self, riddler, round_num, active_competitors, paused=False):
+        """Active, unpaused (name, provider, model) solvers that still have to answer a riddler's round;
+        with paused, the ones that have to answer it but are paused by their circuit breaker instead"""
+        return [(solver, provider, model)
+                for solver, provider, model in self.competitors
+                if solver != riddler and solver in active_competitors
+                and self.breakers[solver].allow() != paused
+                and (riddler, round_num, solver) not in self._completed]
+
+    def _unit_riddle(self, riddler, provider, model, round_num):
+        """Riddle for a riddler's round: the one from the checkpoint if the round was started, else a new one.
+
+        A new riddle is recorded right away, so a checkpoint keeps riddles generated ahead too.
+        """
+        riddle_data = self._unit_riddles.get(f"{riddler}/{round_num}")
+        if riddle_data is not None:
+            return riddle_data
+        riddle_data = self._get_unique_riddle(provider, model, self._riddle_type(round_num))
+        with self._riddles_lock:
+            self._unit_riddles[f"{riddler}/{round_num}"] = riddle_data
+        return riddle_data
+
+    def _save_checkpoint(self, active_competitors, results, force=False):
+        """Save scores, used riddles and finished answers so the run can be resumed; unless forced,
+        only once the checkpoint's interval has passed"""
+        if not self.checkpoint or not (force or self.checkpoint.due()):
+            return
+        results.flush()  # Every row the checkpoint counts has to be in the file
+        with self._riddles_lock:
+            used_riddles = list(self.used_riddles)
+            unit_riddles = dict(self._unit_riddles)  # Pipelined generation adds to it in the background
+        with self._scores_lock:
+            scores = {name: dict(counts) for name, counts in self.scores.items()}
+        self.checkpoint.save({
+            'riddles_per_llm': self.riddles_per_llm,
+            'scores': scores,
+            'used_riddles': used_riddles,
+            'completed': sorted(self._completed),
+            'active_providers': sorted(active_competitors),  # Competitor names; kept under the old key
+            'unit_riddles': unit_riddles,
+            'rows_written': self._rows_written
+        })
+
+    def _restore_checkpoint(self, state):
+        """Load a saved checkpoint into this competition and return the active competitors"""
+        if state['riddles_per_llm'] != self.riddles_per_llm:
+            raise ValueError(f"Checkpoint is for {state['riddles_per_llm']} riddles per LLM, "
+                             f"not {self.riddles_per_llm}")
+        self.scores = state['scores']
+        with self._riddles_lock:
+            self.used_riddles = list(state['used_riddles'])
+            self._indexed_riddles = 0
+        self._completed = set(tuple(triple) for triple in state['completed'])
+        self._unit_riddles = dict(state['unit_riddles'])
+        self._rows_written = state['rows_written']
+        print(f"Resuming from {self.checkpoint.path}: {len(self._completed)} answers already scored")
+        return set(state['active_providers'])
+
+    def run_offline_competition(self, work_dir="batches", poll_interval=60):
+        """Run the competition through provider batch APIs instead of interactive calls.
+        
+        All riddles are generated first, then every solver prompt is submitted as one batch
+        job per provider (providers without a batch API are asked directly). Answers are
+        joined back into the same detailed results as run_competition.
+        """
+        units = [(riddler, riddler_provider, riddler_model, round_num)
+                 for riddler, riddler_provider, riddler_model in self.competitors
+                 for round_num in range(self.riddles_per_llm)]
+        
+        rounds = []
+        requests = []
+        for (riddler, riddler_provider, riddler_model, round_num), fetch_riddle in self._riddle_source(units):
+            riddle_type = self._riddle_type(round_num)
+            try:
+                riddle_data = fetch_riddle()
+            except Exception as e:
+                print(f"Error in round {round_num + 1}: {str(e)}")
+                continue
+            
+            for solver, solver_provider, solver_model in self.competitors:
+                if solver == riddler:
+                    continue
+                custom_id = f"request-{len(requests)}"
+                requests.append({
+                    'custom_id': custom_id,
+                    'provider': solver_provider,
+                    'model': solver_model,
+                    'prompt': self._solver_prompt(riddle_data['riddle']),
+                    'system_prompt': SOLVER_SYSTEM_PROMPT
+                })
+                rounds.append((custom_id, round_num, riddle_type, riddler, solver, riddle_data))
+        
+        print(f"\nSubmitting {len(requests)} solver prompts")
+        answers = BatchJobRunner(self.generator, work_dir=work_dir, poll_interval=poll_interval).run(requests)
+        
+        results = self._open_results()
+        for custom_id, round_num, riddle_type, riddler, solver, riddle_data in rounds:
+            response, error = answers[custom_id]
+            if error is not None:
+                print(f"Error with solver {solver}: {str(error)}")
+                continue
+            results.write(self._score_answer(round_num, riddle_type, riddler, solver,
+                                             riddle_data['riddle'], riddle_data['answer'], response))
+        
+        return self._finish_results(results)
+
+    def _open_results(self, resume=False):
+        """Open the sink that detailed result rows are written to as they are scored.
+        
+        When resuming, rows from the earlier run are kept up to the last checkpoint.
+        """
+        if resume:
+            return open_result_sink(self.results_path, self.results_format, append=True, keep_rows=self._rows_written)
+        return open_result_sink(self.results_path, self.results_format)
 
-        return self._generate_report(results)
+    def _finish_results(self, results):
+        """Close the result sink and build the report from what it holds"""
+        try:
+            return self._generate_report(results)
+        finally:
+            results.close()
+
+    def _solver_prompt(self, riddle):
+        """Prompt for a solver: just the riddle, as the instructions are in SOLVER_SYSTEM_PROMPT"""
+        return riddle
+
+    def _score_answer(self, round_num, riddle_type, riddler, solver, riddle, correct_answer, response):
+        """Check a solver's answer, update its score and return the detailed result row"""
+        is_correct = self._check_answer(response, correct_answer)
+        if is_correct:
+            self._add_score(solver, riddle_type)
+        
+        return {
+            'Round': round_num + 1,
+            'Type': riddle_type,
+            'Riddler': riddler,
+            'Solver': solver,
+            'Riddle': riddle,
+            'Correct Answer': correct_answer,
+            'Given Answer': response,
+            'Is Correct': is_correct
+        }
+
+    def _riddle_type(self, round_num):
+        """First half of each riddler's rounds are word riddles, the rest are math"""
+        return "word" if round_num < self.riddles_per_llm/2 else "math"
+
+    def _riddle_source(self, units):
+        """Yield (unit, fetch_riddle) pairs in order for each (riddler, model, round) unit.
+        
+        With pipeline_depth > 0 the riddles for upcoming units are generated in the
+        background while solvers work on the current one; fetch_riddle then waits for
+        the prefetched riddle instead of generating it.
+        """
+        if not self.pipeline_depth:
+            for unit in units:
+                yield unit, partial(self._unit_riddle, *unit)
+            return
+        
+        with ThreadPoolExecutor(max_workers=self.pipeline_depth) as generation_pool:
+            remaining = iter(units)
+            pending = deque()
+            
+            def prefetch():
+                unit = next(remaining, None)
+                if unit is not None:
+                    future = generation_pool.submit(self._unit_riddle, *unit)
+                    pending.append((unit, future))
+            
+            # Keep the current unit plus pipeline_depth upcoming ones in flight
+            for _ in range(self.pipeline_depth + 1):
+                prefetch()
+            while pending:
+                unit, future = pending.popleft()
+                prefetch()
+                yield unit, future.result
+
+    def _ask_solver(self, provider, model, prompt):
+        """Ask one solver, returning a (response, error) pair instead of raising"""
+        try:
+            return self.generator.get_raw_response(provider, model, prompt, SOLVER_SYSTEM_PROMPT), None
+        except Exception as e:
+            return None, e
+
+    def _ask_solvers(self, solvers, prompt):
+        """Send the prompt to every solver and return their (response, error) pairs in solver order"""
+        if not solvers:
+            return []
+        if self.concurrency == "threads":
+            return list(self._executor.map(lambda solver: self._ask_solver(*solver, prompt), solvers))
+        if self.concurrency == "asyncio":
+            return self.generator.run_async(self._ask_solvers_async(solvers, prompt))
+        return [self._ask_solver(provider, model, prompt) for provider, model in solvers]
+
+    async def _ask_solvers_async(self, solvers, prompt):
+        """Fan the prompt out to all solvers at once on the generator's event loop, bounded by max_workers"""
+        semaphore = asyncio.Semaphore(self.max_workers or len(solvers))
+
+        async def ask(provider, model):
+            async with semaphore:
+                try:
+                    return await self.generator.aget_raw_response(provider, model, prompt, SOLVER_SYSTEM_PROMPT), None
+                except Exception as e:
+                    return None, e
+
+        # gather preserves argument order, so results line up with solvers
+        return await asyncio.gather(*(ask(provider, model) for provider, model in solvers))
+
+    def _add_score(self, solver, riddle_type):
+        """Increment a solver's score for the given riddle type"""
+        with self._scores_lock:
+            self.scores[solver][riddle_type] += 1
 
     def _check_answer(self, given_answer, correct_answer):
         """Check if the given answer matches the correct answer"""
-        # Clean and normalize both answers
-        given = self._normalize_text(str(given_answer))
-        correct = self._normalize_text(str(correct_answer))
-        
-        # For math riddles, extract and compare numbers
-        if any(char.isdigit() for char in correct):
-            given_nums = re.findall(r'-?\d+\.?\d*', given)
-            correct_nums = re.findall(r'-?\d+\.?\d*', correct)
-            if given_nums and correct_nums:
-                return float(given_nums[0]) == float(correct_nums[0])
-            return False
-        
-        # For word riddles, check similarity
-        similarity = SequenceMatcher(None, given, correct).ratio()
-        return similarity > 0.8
-
-    def _get_llm_configs(self):
-        """Get list of (provider, model) tuples from config"""
-        return [(config['provider'], config['model']) 
-                for config in self.generator.config['llm_configs']]
-
-    def _generate_report(self, results):
-        """Generate a summary report of the competition"""
-        # Create detailed results DataFrame
-        df = pd.DataFrame(results)
+        return check_answer(given_answer, correct_answer)
+
+    def _get_competitors(self):
+        """(name, provider, model) for every llm_configs entry, in config order.
+        
+        A competitor is named by its entry's "name", else by its provider when that provider
+        has one entry, else by "provider/model"; names label scores and result rows.
+        """
+        configs = self.generator.config['llm_configs']
+        entries = Counter(config['provider'] for config in configs)
+        competitors = []
+        for config in configs:
+            provider, model = config['provider'], config['model']
+            name = config.get('name') or (provider if entries[provider] == 1 else f"{provider}/{model}")
+            competitors.append((name, provider, model))
+        names = Counter(name for name, _, _ in competitors)
+        duplicates = sorted(name for name, count in names.items() if count > 1)
+        if duplicates:
+            raise ValueError(f"Competitor names must be unique, but {duplicates} appear more than once; "
+                             f"give the llm_configs entries distinct 'name's")
+        return competitors
+
+    def _generate_report(self, results, chunksize=100000):
+        """Generate a summary report of the competition
+        
+        results is a result sink (or a list of result rows). Correct answers are counted
+        chunk by chunk from the sink, so on-disk results never need to fit in memory at once.
+        The summaries are per competitor; pair_summary breaks them down per riddler and solver.
+        """
+        import pandas as pd  # Only needed for reporting; slow to import
+        if isinstance(results, list):
+            results = MemoryResultSink(results)
+        
+        # Count correct answers per solver and riddle type, and answers per (riddler, solver) pair
+        correct = {riddle_type: {name: 0 for name in self.scores} for riddle_type in ['word', 'math']}
+        asked = {riddle_type: {name: 0 for name in self.scores} for riddle_type in ['word', 'math']}
+        pairs = defaultdict(lambda: [0, 0])  # (riddler, solver) -> [correct, answered]
+        for chunk in results.read_chunks(chunksize):
+            is_correct = chunk['Is Correct'].astype(bool)
+            counts = is_correct.groupby([chunk['Type'], chunk['Solver']]).agg(['sum', 'size'])
+            for (riddle_type, solver), (type_correct, type_answered) in counts.iterrows():
+                for totals, count in ((correct, type_correct), (asked, type_answered)):
+                    totals.setdefault(riddle_type, {}).setdefault(solver, 0)
+                    totals[riddle_type][solver] += int(count)
+            pair_counts = is_correct.groupby([chunk['Riddler'], chunk['Solver']]).agg(['sum', 'size'])
+            for (riddler, solver), (pair_correct, answered) in pair_counts.iterrows():
+                pairs[(riddler, solver)][0] += int(pair_correct)
+                pairs[(riddler, solver)][1] += int(answered)
         
         # Create summary tables for each riddle type
         summaries = {}
         for riddle_type in ['word', 'math']:
-            total_questions = len(self._get_llm_configs()) * (self.riddles_per_llm/2) - (self.riddles_per_llm/2)
+            # Rates are over the riddles each solver answered, which early stopping, skipped
+            # rounds and failed calls can make fewer than planned
             summary = pd.DataFrame({
-                'LLM': list(self.scores.keys()),
-                f'{riddle_type.capitalize()} Riddles Correct': [scores[riddle_type] for scores in self.scores.values()],
-                'Total Questions': [total_questions] * len(self.scores),
+                'LLM': list(correct[riddle_type].keys()),
+                f'{riddle_type.capitalize()} Riddles Correct': list(correct[riddle_type].values()),
+                'Total Questions': [asked[riddle_type].get(name, 0) for name in correct[riddle_type]],
             })
             summary[f'{riddle_type.capitalize()} Success Rate'] = (
-                summary[f'{riddle_type.capitalize()} Riddles Correct'] / summary['Total Questions'] * 100
-            ).round(2)
+                summary[f'{riddle_type.capitalize()} Riddles Correct']
+                / summary['Total Questions'].where(summary['Total Questions'] > 0) * 100
+            ).fillna(0.0).round(2)
+            # Which model each competitor is, now that one provider can field several
+            models = {name: (provider, model) for name, provider, model in self.competitors}
+            summary.insert(1, 'Provider', [models.get(name, (None, None))[0] for name in summary['LLM']])
+            summary.insert(2, 'Model', [models.get(name, (None, None))[1] for name in summary['LLM']])
             summary = summary.sort_values(f'{riddle_type.capitalize()} Success Rate', ascending=False)
             summaries[riddle_type] = summary
         
-        return {
-            'detailed_results': df,
+        pair_summary = pd.DataFrame([(riddler, solver, pair_correct, answered)
+                                     for (riddler, solver), (pair_correct, answered) in pairs.items()],
+                                    columns=['Riddler', 'Solver', 'Correct', 'Answered'])
+        pair_summary['Success Rate'] = (pair_summary['Correct'] / pair_summary['Answered'] * 100).round(2)
+        
+        # Results streamed to a file are only read back into memory if the report's caller asks for them
+        report = CompetitionReport(partial(read_results, results.path, results.format)
+                                   if getattr(results, 'path', None) else None)
+        if not report.load_results:
+            report['detailed_results'] = results.read()
+        report.update({
             'word_summary': summaries['word'],
-            'math_summary': summaries['math']
-        } 
\ No newline at end of file
+            'math_summary': summaries['math'],
+            'pair_summary': pair_summary.sort_values(['Riddler', 'Solver'], ignore_index=True),
+            'metrics': self.generator.metrics.summary()  # Latency, tokens and retries per provider
+        })
+        return report
\ No newline at end of file
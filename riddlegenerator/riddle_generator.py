@@ -1,77 +1,121 @@
 import os
 import json
-from anthropic import Anthropic
-from openai import OpenAI
-from groq import Groq
-import google.generativeai as genai
-from icecream import ic
-import re
+from riddlegenerator.debug import ic
+from riddlegenerator.providers import ADAPTERS, BackgroundLoop, create_adapter
+import riddlegenerator.mock_provider  # Registers the offline "mock" adapter
+from riddlegenerator.rate_limiter import ProviderGovernor, error_status, estimate_tokens, is_rate_limit_error
+from riddlegenerator.metrics import MetricsRecorder
+from riddlegenerator.answer_scoring import answer_line
+from riddlegenerator.json_extract import IncrementalJsonExtractor, extract_json
+from riddlegenerator.resilience import DeadlineExceeded, hedged, with_deadline
+from riddlegenerator.response_cache import CacheMissError, ResponseCache
+from riddlegenerator.riddle_schema import batch_schema, riddle_schema
+from riddlegenerator.riddle_index import RiddleIndex, normalize_text
+from collections import Counter
 from pathlib import Path
-from difflib import SequenceMatcher
 import random
+import time
+
+# Output token caps per role; override with "max_tokens" in the config
+DEFAULT_MAX_TOKENS = {"riddler": 1024, "solver": 64}
 
 class RiddleGenerator:
-    def __init__(self):
-        """Initialize RiddleGenerator with API clients"""
-        self.config = self._load_config()
-        self.clients = self._initialize_clients()
+    def __init__(self, cache_mode=None, config_path=None, stream_responses=None, max_tokens=None):
+        """Initialize RiddleGenerator with API clients.
+        
+        cache_mode overrides the response cache mode from the config ("off", "readwrite" or "replay").
+        config_path replaces config/llm_config.json, e.g. with config/mock_llm_config.json.
+        """
+        self.config = self._load_config(config_path)
+        self.governors = self._initialize_governors()  # Provider -> ProviderGovernor
+        self._loop = BackgroundLoop()  # Runs the async provider adapters for the sync API
+        self.clients = self._initialize_clients()  # Provider -> ProviderAdapter
+        self.call_policies = self._initialize_call_policies()  # (provider, model) -> {"deadlines": ..., "hedging": ...}
+        self.cache = self._initialize_cache(cache_mode)  # ResponseCache, or None when caching is off
+        self._cache_occurrences = Counter()  # How often each call has been made this run
+        self.metrics = MetricsRecorder()  # Latency, tokens, retries and outcome of every provider call
+        # When enabled, replies are streamed and cut off once complete: solver replies after the first
+        # answer line, generated riddles after their JSON
+        self.stream_responses = (stream_responses if stream_responses is not None
+                                 else self.config.get('stream_responses', False))
+        self.json_repairs = Counter()  # How often each repair was needed to parse riddle JSON
+        # Ask for riddles in the providers' native JSON/structured output modes where supported
+        self.structured_output = self.config.get('structured_output', True)
+        self._text_only = set()  # (provider, model) pairs that rejected a response schema
+        # Output token cap per role ("riddler", "solver"); None means the provider's default
+        self.max_tokens = dict(DEFAULT_MAX_TOKENS, **self.config.get('max_tokens', {}), **(max_tokens or {}))
         self.used_riddles = []  # Track used riddles
+        self.riddle_index = RiddleIndex()  # Near-duplicate index over used_riddles
+        self._indexed_riddles = 0  # How many of used_riddles are in riddle_index
         
-        # Define prompts for different types of riddles
-        self.prompts = {
-            "word": """Generate a unique and original word riddle with its answer in JSON format. 
-                Return in this exact JSON format with no additional text:
+        # The instructions for each riddle type are the system prompt: the same for every call,
+        # so providers can serve them from their prompt caches. Prompts only say what to generate.
+        self.system_prompts = {
+            "word": """You write unique and original word riddles with their answers in JSON format.
+                Return each riddle in this exact JSON format with no additional text:
                 {
                     "type": "word",
                     "riddle": "Your unique riddle here",
                     "answer": "The answer"
-                }""",
+                }
+                When asked for several riddles, return a JSON array of such objects, every one different from the others.""",
                 
-            "math": """Generate a simple arithmetic problem with exact numbers.
-                Return in this exact JSON format with no additional text:
+            "math": """You write simple arithmetic problems with exact numbers, with their answers in JSON format.
+                Return each problem in this exact JSON format with no additional text:
                 {
                     "type": "math",
                     "riddle": "Your math problem here",
                     "answer": "The numerical answer",
                     "solution": "Brief step-by-step solution"
-                }"""
+                }
+                When asked for several problems, return a JSON array of such objects, every one different from the others."""
+        }
+        
+        # Define prompts for different types of riddles
+        self.prompts = {
+            "word": "Generate a unique and original word riddle.",
+            "math": "Generate a simple arithmetic problem with exact numbers."
         }
         
         self.prompt = self.prompts["word"]  # Default prompt
+        
+        # Prompts asking for several riddles at once; fill in {count} with str.format
+        self.batch_prompts = {
+            "word": "Generate {count} unique and original word riddles. "
+                    "Return a JSON array of exactly {count} objects.",
+            "math": "Generate {count} different simple arithmetic problems. "
+                    "Return a JSON array of exactly {count} objects."
+        }
 
-    def _load_config(self):
-        """Load configuration from config/llm_config.json"""
+    def _load_config(self, config_path=None):
+        """Load configuration from config/llm_config.json, or from config_path if given"""
         try:
             root_dir = Path(__file__).parent.parent
-            config_path = root_dir / 'config' / 'llm_config.json'
+            config_path = Path(config_path) if config_path else root_dir / 'config' / 'llm_config.json'
             with open(config_path, 'r') as f:
                 return json.load(f)
         except Exception as e:
             raise Exception(f"Failed to load config: {str(e)}")
 
     def _initialize_clients(self):
-        """Initialize API clients"""
+        """Initialize one provider adapter per configured provider"""
         try:
             clients = {}
+            http_config = self.config.get('http', {})
             for config in self.config['llm_configs']:
                 provider = config['provider']
+                if provider in clients:
+                    continue  # Models from the same provider share one adapter
+                adapter = config.get('adapter', provider)  # e.g. several "mock" providers with different options
                 api_key = os.getenv(f"{provider.upper()}_API_KEY")
                 
-                if not api_key:
+                if not api_key and getattr(ADAPTERS.get(adapter), 'requires_api_key', True):
                     ic(f"Warning: No API key found for {provider}")
                     continue
                     
                 try:
-                    if provider == "anthropic":
-                        clients[provider] = Anthropic(api_key=api_key)
-                    elif provider == "openai":
-                        clients[provider] = OpenAI(api_key=api_key)
-                    elif provider == "groq":
-                        clients[provider] = Groq(api_key=api_key)
-                    elif provider == "google":
-                        genai.configure(api_key=api_key)
-                        model = genai.GenerativeModel('gemini-pro')
-                        clients[provider] = model
+                    clients[provider] = create_adapter(adapter, api_key, http_config, config.get('base_url'),
+                                                       config.get('options'))
                 except Exception as e:
                     ic(f"Failed to initialize {provider}: {str(e)}")
                     continue
@@ -81,187 +125,320 @@ class RiddleGenerator:
         except Exception as e:
             raise Exception(f"Failed to initialize clients: {str(e)}")
 
+    def _initialize_governors(self):
+        """Create a rate limiter per provider from the 'rate_limits' config entries.
+
+        The limits are the provider's, so the entries of its models are merged; entries that
+        set the same limit to different values are a config error.
+        """
+        rate_limits = {}
+        for config in self.config['llm_configs']:
+            limits = rate_limits.setdefault(config['provider'], {})
+            for key, value in config.get('rate_limits', {}).items():
+                if limits.setdefault(key, value) != value:
+                    raise ValueError(f"Conflicting rate_limits for {config['provider']}: "
+                                     f"{key} is both {limits[key]} and {value}")
+        return {provider: ProviderGovernor.from_config(limits) for provider, limits in rate_limits.items()}
+
+    def _initialize_call_policies(self):
+        """Per-model deadlines and hedging: the top-level 'deadlines' and 'hedging' config
+        entries, overridden by the same keys in the model's llm_configs entry.
+        
+        "deadlines": {"riddle": seconds, "response": seconds} bounds each call including retries.
+        "hedging": {"percentile": 95, "min_samples": 20, "min_delay": 0.5, "max_hedges": 1} starts a
+        duplicate request once a call has taken longer than that percentile of earlier calls.
+        """
+        policies = {}
+        for config in self.config['llm_configs']:
+            policies[(config['provider'], config['model'])] = {
+                key: dict(self.config.get(key) or {}, **(config.get(key) or {})) for key in ('deadlines', 'hedging')
+            }
+        return policies
+
+    def _call_policy(self, provider, model):
+        """Deadlines and hedging for a model; models not in the config get the top-level ones"""
+        policy = self.call_policies.get((provider, model))
+        if policy is None:
+            policy = {key: dict(self.config.get(key) or {}) for key in ('deadlines', 'hedging')}
+        return policy
+
+    def _hedge_delay(self, provider, model, kind):
+        """Seconds after which a call is hedged, or None if hedging is off or there is too little history"""
+        hedging = self._call_policy(provider, model)['hedging']
+        if not hedging or not hedging.get('enabled', True):
+            return None
+        delay = self.metrics.latency_percentile(provider, model, kind, hedging.get('percentile', 95),
+                                                min_samples=hedging.get('min_samples', 20))
+        return None if delay is None else max(delay, hedging.get('min_delay', 0.0))
+
+    def _initialize_cache(self, cache_mode=None):
+        """Open the on-disk response cache described by the 'cache' config entry"""
+        cache_config = self.config.get('cache', {})
+        mode = cache_mode or cache_config.get('mode', 'off')
+        if mode == 'off':
+            return None
+        path = Path(cache_config.get('path', '.cache/llm_responses.sqlite'))
+        if not path.is_absolute():
+            path = Path(__file__).parent.parent / path
+        return ResponseCache(path, mode=mode,
+                             ttl_seconds=cache_config.get('ttl_seconds'),
+                             max_entries=cache_config.get('max_entries'))
+
     def _normalize_text(self, text):
         """Normalize text for comparison"""
-        text = str(text).lower()
-        text = re.sub(r'[^\w\s]', '', text)
-        filler_words = ['i', 'am', 'a', 'an', 'the', 'but', 'and', 'or', 'what']
-        words = text.split()
-        words = [w for w in words if w not in filler_words]
-        return ' '.join(words)
+        return normalize_text(text)
 
     def _is_similar_riddle(self, new_riddle, similarity_threshold=0.6):
         """Check if a riddle is too similar to previously used ones"""
-        normalized_new = self._normalize_text(new_riddle)
-        key_words = set(normalized_new.split())
-        
-        for old_riddle in self.used_riddles:
-            normalized_old = self._normalize_text(old_riddle)
-            old_words = set(normalized_old.split())
-            
-            common_words = key_words.intersection(old_words)
-            if len(common_words) >= 3:
-                return True
-                
-            similarity = SequenceMatcher(None, normalized_new, normalized_old).ratio()
-            if similarity > similarity_threshold:
-                return True
-                
-        return False
+        # Index anything appended to used_riddles since the last check
+        for old_riddle in self.used_riddles[self._indexed_riddles:]:
+            self.riddle_index.add(old_riddle)
+        self._indexed_riddles = len(self.used_riddles)
+        return self.riddle_index.is_similar(new_riddle, similarity_threshold)
 
     def _extract_json(self, content):
         """Extract and validate JSON from response"""
         try:
-            # Clean the content
-            content = content.strip()
-            
-            # Handle multi-line JSON by joining lines
-            lines = content.split('\n')
-            content = ' '.join(line.strip() for line in lines)
-            
-            # Find the first { and last }
-            start = content.find("{")
-            end = content.rfind("}") + 1
-            if start == -1 or end <= 0:
-                # Try to fix incomplete JSON by adding missing brace
-                if start >= 0 and '"answer":' in content:
-                    content = content + "}"
-                    end = len(content)
-                else:
-                    raise ValueError("No JSON object found")
+            return self._validate_riddle(self._parse_json(content, "object"))
             
-            # Extract and parse JSON
-            json_str = content[start:end]
-            # Remove any escaped quotes and normalize spacing
-            json_str = json_str.replace('\\"', '"').replace('\\n', ' ')
-            json_str = re.sub(r'\s+', ' ', json_str)
-            
-            try:
-                data = json.loads(json_str)
-            except json.JSONDecodeError:
-                # Try to fix common JSON formatting issues
-                json_str = json_str.replace("'", '"')  # Replace single quotes with double quotes
-                json_str = re.sub(r'([{,])\s*(\w+):', r'\1 "\2":', json_str)  # Quote unquoted keys
-                data = json.loads(json_str)
-            
-            # Validate required fields
-            required_fields = ["type", "riddle", "answer"]
-            if not all(field in data for field in required_fields):
-                raise ValueError(f"Missing required fields. Found: {list(data.keys())}")
-            
-            # Convert all values to strings
-            result = {
-                "type": str(data["type"]),
-                "riddle": str(data["riddle"]).strip(),
-                "answer": str(data["answer"]).strip()
-            }
-            
-            # Add solution if present
-            if "solution" in data:
-                result["solution"] = str(data["solution"]).strip()
+        except Exception as e:
+            ic(f"JSON parsing error: {str(e)}\nContent: {content}")
+            raise
+
+    def _extract_json_array(self, content):
+        """Extract a JSON array of riddles from a batch response, validating each item.
+        
+        Invalid items are skipped; an error is raised only if none are usable.
+        """
+        try:
+            data = self._parse_json(content, "array")
+            if isinstance(data, dict):
+                # Model returned a single riddle, or wrapped the list in an object
+                data = next((value for value in data.values() if isinstance(value, list)), [data])
             
-            return result
+            riddles = []
+            for item in data:
+                try:
+                    riddles.append(self._validate_riddle(item))
+                except Exception as e:
+                    ic(f"Skipping invalid riddle in batch: {str(e)}")
+            if not riddles:
+                raise ValueError("No valid riddles in batch")
+            return riddles
             
         except Exception as e:
             ic(f"JSON parsing error: {str(e)}\nContent: {content}")
             raise
 
-    def get_riddle(self, provider, model):
-        """Get a riddle from the specified provider"""
-        response = self._get_raw_riddle(provider, model)
-        return self._extract_json(response)
+    def _parse_json(self, content, kind):
+        """Parse the first JSON object (kind="object") or array ("array") in a response, repairing it if needed"""
+        extracted = extract_json(content, kind)
+        self.json_repairs.update(extracted.repairs)
+        return extracted.value
+
+    def _validate_riddle(self, data):
+        """Check a parsed riddle has the required fields and convert its values to strings"""
+        # Validate required fields
+        required_fields = ["type", "riddle", "answer"]
+        if not isinstance(data, dict) or not all(field in data for field in required_fields):
+            found = list(data.keys()) if isinstance(data, dict) else type(data).__name__
+            raise ValueError(f"Missing required fields. Found: {found}")
+        
+        # Convert all values to strings, on one line each
+        result = {
+            "type": str(data["type"]),
+            "riddle": " ".join(str(data["riddle"]).split()),
+            "answer": " ".join(str(data["answer"]).split())
+        }
+        
+        # Add solution if present
+        if "solution" in data:
+            result["solution"] = " ".join(str(data["solution"]).split())
+        
+        return result
+
+    def get_riddle(self, provider, model, riddle_type=None):
+        """Get a riddle from the specified provider, using the current prompt unless a type is given"""
+        return self._loop.run(self.aget_riddle(provider, model, riddle_type))
+
+    def get_riddles(self, provider, model, riddle_type, count):
+        """Get a batch of riddles of one type from a single request"""
+        return self._loop.run(self.aget_riddles(provider, model, riddle_type, count))
 
-    def _get_raw_riddle(self, provider, model, temperature=0.7):
+    def _get_raw_riddle(self, provider, model, temperature=0.7, prompt=None, system_prompt=None):
         """Get raw response from the model"""
+        return self._loop.run(self._aget_raw_riddle(provider, model, temperature, prompt,
+                                                    system_prompt=system_prompt))
+
+    def get_raw_response(self, provider, model, prompt, system_prompt=None):
+        """Get raw response from the model with error handling"""
+        return self._loop.run(self.aget_raw_response(provider, model, prompt, system_prompt))
+
+    async def aget_riddle(self, provider, model, riddle_type=None):
+        """Async version of get_riddle"""
+        prompt = self.prompts[riddle_type] if riddle_type else self.prompt
+        # Without a type, the current prompt is either one of self.prompts or a complete prompt of its own
+        system_prompt = self.system_prompts.get(riddle_type or self._prompt_type(prompt))
+        response = await self._aget_raw_riddle(provider, model, prompt=prompt, system_prompt=system_prompt,
+                                               response_schema=riddle_schema(riddle_type) if riddle_type else None)
+        return self._extract_json(response)
+
+    async def aget_riddles(self, provider, model, riddle_type, count):
+        """Async version of get_riddles"""
+        prompt = self.batch_prompts[riddle_type].format(count=count)
+        # Leave room for every riddle in the batch
+        max_tokens = max(self.max_tokens['riddler'] or 1024, min(8192, 256 * count))
+        response = await self._aget_raw_riddle(provider, model, prompt=prompt, max_tokens=max_tokens,
+                                               system_prompt=self.system_prompts[riddle_type],
+                                               json_kind="array", response_schema=batch_schema(riddle_type))
+        return self._extract_json_array(response)
+
+    async def _aget_raw_riddle(self, provider, model, temperature=0.7, prompt=None, max_tokens=None,
+                               json_kind="object", response_schema=None, system_prompt=None):
+        """Get raw riddle text from the provider's adapter.
+        
+        response_schema is sent to adapters with structured output support; if the model
+        rejects it, the pair falls back to plain text (parsed by json_extract) for the rest of the run.
+        """
+        prompt = prompt or self.prompt
+        if not self._use_structured_output(provider, model):
+            response_schema = None
+        call = lambda schema: self._call_provider(
+            provider, model, prompt, system_prompt=system_prompt, temperature=temperature,
+            max_tokens=max_tokens or self.max_tokens['riddler'], kind="riddle",
+            stop=IncrementalJsonExtractor(json_kind) if self.stream_responses else None, response_schema=schema
+        )
         try:
-            if provider == "google":
-                client = self.clients.get(provider)
-                response = client.generate_content(self.prompt)
-                return response.text
-                
-            elif provider == "groq":
-                client = self.clients.get(provider)
-                response = client.chat.completions.create(
-                    model=model,
-                    temperature=temperature,
-                    messages=[{"role": "user", "content": self.prompt}]
-                )
-                return response.choices[0].message.content
-                
-            elif provider == "openai":
-                client = self.clients.get(provider)
-                response = client.chat.completions.create(
-                    model=model,
-                    temperature=temperature,
-                    messages=[{"role": "user", "content": self.prompt}]
-                )
-                return response.choices[0].message.content
-                
-            elif provider == "anthropic":
-                client = self.clients.get(provider)
-                response = client.messages.create(
-                    model=model,
-                    temperature=temperature,
-                    max_tokens=1024,
-                    messages=[{"role": "user", "content": self.prompt}]
-                )
-                return response.content[0].text
+            try:
+                completion = await call(response_schema)
+            except Exception as e:
+                if not response_schema or error_status(e) != 400:
+                    raise
+                ic(f"{provider} ({model}) rejected structured output, using plain text: {str(e)}")
+                self._text_only.add((provider, model))
+                completion = await call(None)
+            return completion.text
                 
         except Exception as e:
             ic(f"Error getting response from {provider}: {str(e)}")
             raise
 
-    def get_raw_response(self, provider, model, prompt, system_prompt=None):
-        """Get raw response from the model with error handling"""
+    def _prompt_type(self, prompt):
+        """Riddle type whose prompt this is, or None for any other prompt"""
+        return next((riddle_type for riddle_type, text in self.prompts.items() if text == prompt), None)
+
+    def _use_structured_output(self, provider, model):
+        """Whether riddles from this provider and model are requested with a response schema"""
+        adapter = self.clients.get(provider)
+        return (self.structured_output and (provider, model) not in self._text_only
+                and getattr(adapter, 'supports_structured_output', False))
+
+    async def aget_raw_response(self, provider, model, prompt, system_prompt=None):
+        """Async version of get_raw_response"""
         try:
-            if provider == "google":
-                client = self.clients.get(provider)
-                if system_prompt:
-                    prompt = f"{system_prompt}\n\n{prompt}"
-                response = client.generate_content(prompt)
-                return response.text.strip()
-                
-            elif provider == "groq":
-                client = self.clients.get(provider)
-                messages = []
-                if system_prompt:
-                    messages.append({"role": "system", "content": system_prompt})
-                messages.append({"role": "user", "content": prompt})
-                response = client.chat.completions.create(
-                    model=model,
-                    temperature=0.1,  # Lower temperature for math problems
-                    messages=messages
-                )
-                return response.choices[0].message.content.strip()
-                
-            elif provider == "openai":
-                client = self.clients.get(provider)
-                messages = []
-                if system_prompt:
-                    messages.append({"role": "system", "content": system_prompt})
-                messages.append({"role": "user", "content": prompt})
-                response = client.chat.completions.create(
-                    model=model,
-                    temperature=0.1,  # Lower temperature for math problems
-                    messages=messages
-                )
-                return response.choices[0].message.content.strip()
-                
-            elif provider == "anthropic":
-                client = self.clients.get(provider)
-                response = client.messages.create(
-                    model=model,
-                    temperature=0.1,  # Lower temperature for math problems
-                    max_tokens=1024,
-                    system=system_prompt if system_prompt else None,
-                    messages=[{"role": "user", "content": prompt}]
-                )
-                return response.content[0].text.strip()
+            completion = await self._call_provider(provider, model, prompt, system_prompt=system_prompt,
+                                                   temperature=0.1,  # Lower temperature for math problems
+                                                   max_tokens=self.max_tokens['solver'], kind="response",
+                                                   stop=answer_line if self.stream_responses else None)
+            if self.stream_responses:
+                # Only the answer line counts, whether or not the stream was cut off after it
+                return answer_line(completion.text + "\n") or completion.text.strip()
+            return completion.text.strip()
                 
         except Exception as e:
             ic(f"Error getting response from {provider}: {str(e)}")
             raise
 
+    async def _call_provider(self, provider, model, prompt, system_prompt=None, temperature=0.1, max_tokens=None,
+                             kind="response", stop=None, response_schema=None):
+        """Call a provider's adapter within its rate limits, retrying throttled attempts.
+        
+        Responses are served from and stored in the response cache when it is enabled.
+        Every call is recorded in self.metrics under kind ("riddle" or "response"), and may be
+        hedged according to the provider's call policy. Its deadline bounds each attempt once the
+        rate limiter has let it through, so waiting out a provider's quota never times a call out.
+        With a stop condition the reply is streamed and ends once stop(text so far) is true.
+        response_schema is only passed on when given, for adapters with structured output.
+        """
+        start = time.perf_counter()
+        cache_key = None
+        if self.cache:
+            # A streamed reply ends where its stop condition cut it off, so the condition is part of the key
+            request = {"max_tokens": max_tokens, "response_schema": response_schema,
+                       "stop": getattr(stop, '__name__', type(stop).__name__) if stop else None}
+            call = (provider, model, prompt, system_prompt, temperature, json.dumps(request, sort_keys=True))
+            occurrence = self._cache_occurrences[call]
+            self._cache_occurrences[call] += 1
+            cache_key = ResponseCache.make_key(*call[:5], occurrence=occurrence, request=request)
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                self.metrics.record(provider, model, kind, time.perf_counter() - start, outcome="cache_hit")
+                return cached
+            if self.cache.mode == "replay":
+                self.metrics.record(provider, model, kind, time.perf_counter() - start, outcome="error")
+                raise CacheMissError(f"No cached response from {provider} ({model}) in replay mode")
+
+        retries = []
+        hedges = []
+        policy = self._call_policy(provider, model)
+        try:
+            adapter = self._get_adapter(provider)
+            governor = self.governors.setdefault(provider, ProviderGovernor())
+            schema = {"response_schema": response_schema} if response_schema else {}
+            if stop:
+                make_call = lambda: adapter.stream(model, prompt, system_prompt=system_prompt, temperature=temperature,
+                                                   max_tokens=max_tokens, stop=stop, **schema)
+            else:
+                make_call = lambda: adapter.complete(model, prompt, system_prompt=system_prompt,
+                                                     temperature=temperature, max_tokens=max_tokens, **schema)
+            deadline = policy.get('deadlines', {}).get(kind)
+            governed_call = lambda: governor.call(
+                lambda: with_deadline(make_call(), deadline),
+                estimated_tokens=estimate_tokens(prompt, system_prompt, max_tokens=max_tokens),
+                on_retry=retries.append
+            )
+            completion = await hedged(governed_call, self._hedge_delay(provider, model, kind),
+                                      max_hedges=policy.get('hedging', {}).get('max_hedges', 1),
+                                      on_hedge=hedges.append)
+        except Exception as e:
+            if isinstance(e, DeadlineExceeded):
+                outcome = "timeout"
+            else:
+                outcome = "rate_limited" if is_rate_limit_error(e) else "error"
+            self.metrics.record(provider, model, kind, time.perf_counter() - start, retries=len(retries),
+                                hedges=len(hedges), outcome=outcome)
+            raise
+        
+        self.metrics.record(provider, model, kind, time.perf_counter() - start,
+                            ttft=completion.time_to_first_token,
+                            input_tokens=completion.input_tokens, output_tokens=completion.output_tokens,
+                            cached_input_tokens=completion.cached_input_tokens,
+                            retries=len(retries), hedges=len(hedges))
+        if cache_key:
+            self.cache.put(cache_key, provider, model, completion)
+        return completion
+
+    def _get_adapter(self, provider):
+        """Look up the adapter for a provider"""
+        adapter = self.clients.get(provider)
+        if adapter is None:
+            raise Exception(f"No client available for {provider}")
+        return adapter
+
+    def run_async(self, coro):
+        """Run a coroutine on the provider event loop and wait for its result"""
+        return self._loop.run(coro)
+
+    def close(self):
+        """Close provider connections and stop the event loop"""
+        async def close_adapters():
+            for adapter in self.clients.values():
+                await adapter.aclose()
+        self._loop.run(close_adapters())
+        self._loop.close()
+        if self.cache:
+            self.cache.close()
+
     def _get_unique_riddle(self, provider, model, riddle_type, max_attempts=3):
         """Get a unique riddle of specified type"""
         attempts = 0
@@ -0,0 +1,121 @@
+import re
+import zlib
+from collections import defaultdict
+from difflib import SequenceMatcher
+from functools import lru_cache
+
+FILLER_WORDS = frozenset(['i', 'am', 'a', 'an', 'the', 'but', 'and', 'or', 'what'])
+_PUNCTUATION = re.compile(r'[^\w\s]')
+
+# MinHash parameters: 64 bands of 2 rows flag pairs whose shingle Jaccard is ~0.2 or more
+# (>90% of the time), which covers nearly all riddles with a SequenceMatcher ratio above 0.6
+NUM_PERMUTATIONS = 128
+BAND_ROWS = 2
+SHINGLE_SIZE = 3
+_PRIME = (1 << 31) - 1
+
+
+def normalize_text(text):
+    """Normalize text for comparison: lowercase, no punctuation, no filler words"""
+    text = _PUNCTUATION.sub('', str(text).lower())
+    return ' '.join(w for w in text.split() if w not in FILLER_WORDS)
+
+
+@lru_cache(maxsize=None)
+def _hash_coefficients():
+    """(a, b) of the MinHash permutations, drawn on first use so that importing numpy waits until it is needed"""
+    import numpy as np
+    rng = np.random.default_rng(1234)
+    return (rng.integers(1, _PRIME, NUM_PERMUTATIONS, dtype=np.uint64),
+            rng.integers(0, _PRIME, NUM_PERMUTATIONS, dtype=np.uint64))
+
+
+def minhash_signature(normalized):
+    """MinHash signature of a normalized text's character shingles"""
+    if len(normalized) <= SHINGLE_SIZE:
+        shingles = {normalized}
+    else:
+        shingles = {normalized[i:i + SHINGLE_SIZE] for i in range(len(normalized) - SHINGLE_SIZE + 1)}
+    import numpy as np
+    hash_a, hash_b = _hash_coefficients()
+    hashes = np.fromiter((zlib.crc32(s.encode('utf-8')) for s in shingles), dtype=np.uint64, count=len(shingles))
+    # (a * x + b) mod p stays below 2**63 because a, b < 2**31 and x < 2**32
+    return ((np.outer(hash_a, hashes) + hash_b[:, None]) % _PRIME).min(axis=1)
+
+
+class RiddleIndex:
+    """Near-duplicate index over previously used riddles.
+
+    Applies the same two rules as the original linear scan -- at least min_common_words
+    shared keywords, or a SequenceMatcher ratio above the threshold -- without comparing
+    against every stored riddle. Keywords are looked up through an inverted index, and
+    ratio candidates come from MinHash/LSH buckets over character shingles; only those
+    candidates are compared with SequenceMatcher.
+
+    A riddle sharing min_common_words keywords shares at least one of the query's rarest
+    len(keywords) - min_common_words + 1 keywords, so only those posting lists are read.
+    Keywords in more than max_keyword_riddles riddles are too common to look up at all,
+    so the lookup cost doesn't grow with the history; they still count once a candidate
+    is found through a rarer keyword. candidates_examined counts the riddles checked.
+
+    Not thread-safe: callers serialize access (RiddleCompetition holds its riddles lock).
+    """
+
+    def __init__(self, min_common_words=3, max_keyword_riddles=1000):
+        self.min_common_words = min_common_words
+        self.max_keyword_riddles = max_keyword_riddles
+        self.candidates_examined = 0  # Riddles checked for shared keywords, over all queries
+        self._texts = []  # Normalized text per riddle id
+        self._words = []  # Keyword set per riddle id
+        self._postings = defaultdict(list)  # Keyword -> riddle ids
+        self._bands = [defaultdict(list) for _ in range(NUM_PERMUTATIONS // BAND_ROWS)]  # Band hash -> ids
+
+    def __len__(self):
+        return len(self._texts)
+
+    def _band_keys(self, signature):
+        return [signature[i * BAND_ROWS:(i + 1) * BAND_ROWS].tobytes() for i in range(len(self._bands))]
+
+    def add(self, riddle):
+        """Index a riddle and return its id"""
+        normalized = normalize_text(riddle)
+        riddle_id = len(self._texts)
+        self._texts.append(normalized)
+        words = frozenset(normalized.split())
+        self._words.append(words)
+        for word in words:
+            self._postings[word].append(riddle_id)
+        for band, key in zip(self._bands, self._band_keys(minhash_signature(normalized))):
+            band[key].append(riddle_id)
+        return riddle_id
+
+    def is_similar(self, riddle, similarity_threshold=0.6):
+        """Check if a riddle is too similar to any indexed one"""
+        normalized = normalize_text(riddle)
+
+        # Shared keywords: candidates from the rarest keywords' postings, checked against all keywords
+        words = set(normalized.split())
+        if len(words) >= self.min_common_words:
+            rarest = sorted(words, key=lambda word: len(self._postings.get(word, ())))
+            candidates = set()
+            for word in rarest[:len(words) - self.min_common_words + 1]:
+                postings = self._postings.get(word, ())
+                if len(postings) <= self.max_keyword_riddles:
+                    candidates.update(postings)
+            self.candidates_examined += len(candidates)
+            for riddle_id in candidates:
+                if len(words & self._words[riddle_id]) >= self.min_common_words:
+                    return True
+
+        # Character similarity, only against LSH candidates
+        candidates = set()
+        for band, key in zip(self._bands, self._band_keys(minhash_signature(normalized))):
+            candidates.update(band.get(key, ()))
+        matcher = SequenceMatcher(None, normalized)
+        for riddle_id in candidates:
+            matcher.set_seq2(self._texts[riddle_id])
+            if (matcher.real_quick_ratio() > similarity_threshold
+                    and matcher.quick_ratio() > similarity_threshold
+                    and matcher.ratio() > similarity_threshold):
+                return True
+        return False
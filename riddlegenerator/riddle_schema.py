@@ -0,0 +1,64 @@
+import copy
+
+# JSON schemas of the riddle templates, for providers' structured output modes.
+# Every property is required and no others are allowed, as OpenAI's strict mode demands.
+RIDDLE_SCHEMAS = {
+    "word": {
+        "type": "object",
+        "properties": {
+            "type": {"type": "string", "enum": ["word"]},
+            "riddle": {"type": "string"},
+            "answer": {"type": "string"}
+        },
+        "required": ["type", "riddle", "answer"],
+        "additionalProperties": False
+    },
+    "math": {
+        "type": "object",
+        "properties": {
+            "type": {"type": "string", "enum": ["math"]},
+            "riddle": {"type": "string"},
+            "answer": {"type": "string"},
+            "solution": {"type": "string"}
+        },
+        "required": ["type", "riddle", "answer", "solution"],
+        "additionalProperties": False
+    }
+}
+
+
+def riddle_schema(riddle_type):
+    """Response schema for one riddle of a type"""
+    return {"name": f"{riddle_type}_riddle", "schema": RIDDLE_SCHEMAS[riddle_type]}
+
+
+def batch_schema(riddle_type):
+    """Response schema for a batch of riddles of a type.
+
+    Structured output needs an object at the top level, so the array is wrapped in
+    {"riddles": [...]}, which the batch parser unwraps.
+    """
+    return {
+        "name": f"{riddle_type}_riddles",
+        "schema": {
+            "type": "object",
+            "properties": {"riddles": {"type": "array", "items": RIDDLE_SCHEMAS[riddle_type]}},
+            "required": ["riddles"],
+            "additionalProperties": False
+        }
+    }
+
+
+def without_keywords(schema, *keywords):
+    """Copy of a schema with the given keywords removed at every level, for providers that reject them"""
+    schema = copy.deepcopy(schema)
+    stack = [schema]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, dict):
+            for keyword in keywords:
+                node.pop(keyword, None)
+            stack.extend(node.values())
+        elif isinstance(node, list):
+            stack.extend(node)
+    return schema
@@ -0,0 +1,116 @@
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+COLUMNS = ("id", "riddle", "answer", "solution", "type", "riddler_provider", "riddler_model", "created_at")
+
+
+class RiddleStore:
+    """Append-only SQLite corpus of every riddle used, shared across runs.
+
+    Rows are never updated or deleted. Reads stream through their own connection in
+    batches, so scanning millions of rows keeps memory flat and does not block appends.
+    Several processes may share one store; exclusive() serialises check-then-append.
+    A new store uses WAL, so reads don't block appends; WAL needs shared memory between
+    the processes, so a store shared over a network filesystem should be created with a
+    rollback journal (journal_mode="DELETE"). An existing store keeps its journal mode.
+    """
+
+    def __init__(self, path, journal_mode=None):
+        self.path = str(path)
+        if journal_mode is None and not (os.path.exists(self.path) and os.path.getsize(self.path) > 0):
+            journal_mode = "WAL"
+        self._lock = threading.RLock()
+        self._exclusive = False  # Inside exclusive(): appends commit when it ends
+        if os.path.dirname(self.path):
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        self._conn = sqlite3.connect(self.path, check_same_thread=False, timeout=60)
+        if journal_mode:
+            self._conn.execute(f"PRAGMA journal_mode={journal_mode}")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS riddles (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                riddle TEXT NOT NULL,
+                answer TEXT NOT NULL,
+                solution TEXT,
+                type TEXT NOT NULL,
+                riddler_provider TEXT NOT NULL,
+                riddler_model TEXT NOT NULL,
+                created_at REAL NOT NULL
+            )""")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS riddles_type ON riddles (type)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS riddles_provider ON riddles (riddler_provider)")
+        self._conn.commit()
+
+    def append(self, riddle_data, provider, model):
+        """Record a riddle and return its row id"""
+        with self._lock:
+            cursor = self._conn.execute(
+                "INSERT INTO riddles (riddle, answer, solution, type, riddler_provider, riddler_model, created_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (riddle_data['riddle'], riddle_data['answer'], riddle_data.get('solution'),
+                 riddle_data['type'], provider, model, time.time())
+            )
+            if not self._exclusive:
+                self._conn.commit()
+            return cursor.lastrowid
+
+    @contextmanager
+    def exclusive(self):
+        """Hold the store's write lock, across threads and processes, for the duration of the block.
+        
+        No other connection can append meanwhile, so riddles read inside the block are all
+        there are, and a riddle appended inside it is committed only if the block succeeds.
+        """
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            self._exclusive = True
+            try:
+                yield self
+            except BaseException:
+                self._conn.rollback()
+                raise
+            else:
+                self._conn.commit()
+            finally:
+                self._exclusive = False
+
+    def _where(self, riddle_type=None, provider=None, after_id=None):
+        clauses, params = [], []
+        if riddle_type:
+            clauses.append("type = ?")
+            params.append(riddle_type)
+        if provider:
+            clauses.append("riddler_provider = ?")
+            params.append(provider)
+        if after_id is not None:
+            clauses.append("id > ?")
+            params.append(after_id)
+        return (" WHERE " + " AND ".join(clauses) if clauses else ""), params
+
+    def iter_riddles(self, riddle_type=None, provider=None, after_id=None, batch_size=1000):
+        """Stream stored riddles as dicts in insertion order, optionally filtered"""
+        where, params = self._where(riddle_type, provider, after_id)
+        conn = sqlite3.connect(self.path, timeout=60)
+        try:
+            cursor = conn.execute(f"SELECT {', '.join(COLUMNS)} FROM riddles{where} ORDER BY id", params)
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    break
+                for row in rows:
+                    yield dict(zip(COLUMNS, row))
+        finally:
+            conn.close()
+
+    def count(self, riddle_type=None, provider=None):
+        """Number of stored riddles, optionally filtered"""
+        where, params = self._where(riddle_type, provider)
+        with self._lock:
+            return self._conn.execute(f"SELECT COUNT(*) FROM riddles{where}", params).fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,242 @@
+import json
+import multiprocessing
+import os
+import socket
+import time
+from concurrent.futures import ProcessPoolExecutor
+from riddlegenerator.debug import ic
+from riddlegenerator.riddle_competition import RiddleCompetition
+from riddlegenerator.result_sink import open_result_sink, read_result_chunks
+from riddlegenerator.riddle_store import RiddleStore
+
+# RiddleCompetition arguments a shard plan may carry; results, checkpoints and metrics ports are per shard
+PLAN_ARGS = ("riddles_per_llm", "concurrency", "max_workers", "pipeline_depth", "cache_mode", "riddle_store_path",
+             "batch_size", "results_format", "config_path", "stream_responses", "max_tokens")
+
+
+class ShardQueue:
+    """File-based work queue splitting a competition's (riddler, round) units into shards.
+
+    Every worker that can reach work_dir (local processes, or machines sharing it over a
+    network filesystem) takes shards from the queue until none are left:
+
+        work_dir/plan.json              number of shards and the RiddleCompetition arguments
+        work_dir/shards/<i>.todo        waiting; claimed by atomically renaming it to <i>.claimed
+        work_dir/shards/<i>.done        finished
+        work_dir/results/shard-<i>.*    the shard's detailed results, and its scores and call metrics (.json)
+
+    Units go to shards by shard_of, so the split is the same wherever it is computed. Riddles
+    are deduplicated across shards through the shared riddle store (work_dir/riddles.sqlite
+    unless the plan names one), which uses a rollback journal since WAL doesn't work over a
+    network filesystem; SQLite's locking still needs a filesystem that supports it.
+    Every round is played: a shard only sees its own rounds, so it can't tell when the
+    whole ranking is settled, and early stopping is turned off.
+    """
+
+    def __init__(self, work_dir):
+        self.work_dir = str(work_dir)
+        self.shard_dir = os.path.join(self.work_dir, 'shards')
+        self.results_dir = os.path.join(self.work_dir, 'results')
+        with open(os.path.join(self.work_dir, 'plan.json')) as f:
+            self.plan = json.load(f)
+        self.num_shards = self.plan['num_shards']
+
+    @classmethod
+    def create(cls, work_dir, num_shards, **competition_args):
+        """Write the plan and queue every shard; an existing queue with the same plan is reused as is"""
+        unknown = set(competition_args) - set(PLAN_ARGS)
+        if unknown:
+            raise ValueError(f"Unsupported competition arguments for a sharded run: {sorted(unknown)}")
+        if num_shards < 1:
+            raise ValueError(f"num_shards must be at least 1, not {num_shards}")
+        competition_args.setdefault('riddle_store_path', os.path.join(str(work_dir), 'riddles.sqlite'))
+        plan = {'num_shards': num_shards, 'competition': competition_args}
+
+        plan_path = os.path.join(str(work_dir), 'plan.json')
+        if os.path.exists(plan_path):
+            with open(plan_path) as f:
+                existing = json.load(f)
+            if existing != json.loads(json.dumps(plan)):
+                raise ValueError(f"{work_dir} already holds a different shard plan")
+            return cls(work_dir)
+
+        os.makedirs(os.path.join(str(work_dir), 'shards'), exist_ok=True)
+        os.makedirs(os.path.join(str(work_dir), 'results'), exist_ok=True)
+        RiddleStore(competition_args['riddle_store_path'], journal_mode="DELETE").close()
+        for index in range(num_shards):
+            open(os.path.join(str(work_dir), 'shards', f"{index}.todo"), 'w').close()
+        # Written last, so workers never see a plan without its queue
+        tmp_path = plan_path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(plan, f, indent=2)
+        os.replace(tmp_path, plan_path)
+        return cls(work_dir)
+
+    def _path(self, index, state):
+        return os.path.join(self.shard_dir, f"{index}.{state}")
+
+    def _shards(self, state):
+        return sorted(int(name.split('.')[0]) for name in os.listdir(self.shard_dir) if name.endswith(f".{state}"))
+
+    def status(self):
+        """Number of shards per state: todo, claimed and done"""
+        return {state: len(self._shards(state)) for state in ("todo", "claimed", "done")}
+
+    def claim(self, stale_after=None):
+        """Take the next waiting shard and return its index, or None when there is nothing left to take.
+
+        With stale_after, shards claimed longer ago than that many seconds (by a worker that
+        presumably died) are put back in the queue first.
+        """
+        if stale_after is not None:
+            for index in self._shards("claimed"):
+                try:
+                    if time.time() - os.path.getmtime(self._path(index, "claimed")) > stale_after:
+                        os.rename(self._path(index, "claimed"), self._path(index, "todo"))
+                except FileNotFoundError:
+                    pass  # Finished or requeued by someone else meanwhile
+
+        for index in self._shards("todo"):
+            try:
+                os.rename(self._path(index, "todo"), self._path(index, "claimed"))
+            except FileNotFoundError:
+                continue  # Another worker got there first
+            with open(self._path(index, "claimed"), 'w') as f:
+                f.write(f"{socket.gethostname()}:{os.getpid()}\n")
+            return index
+        return None
+
+    def requeue_abandoned(self):
+        """Put back shards claimed on this machine by worker processes that are no longer running.
+
+        Returns their indexes. Claims from other machines can only expire through claim's stale_after.
+        """
+        requeued = []
+        for index in self._shards("claimed"):
+            try:
+                with open(self._path(index, "claimed")) as f:
+                    host, _, pid = f.read().strip().rpartition(':')
+            except FileNotFoundError:
+                continue
+            if host != socket.gethostname() or not pid.isdigit() or _process_running(int(pid)):
+                continue  # Still being played, claimed elsewhere, or claimed a moment ago and not yet signed
+            try:
+                os.rename(self._path(index, "claimed"), self._path(index, "todo"))
+                requeued.append(index)
+            except FileNotFoundError:
+                pass
+        return requeued
+
+    def results_path(self, index):
+        extension = "arrow" if self.plan['competition'].get('results_format') == "arrow" else "csv"
+        return os.path.join(self.results_dir, f"shard-{index}.{extension}")
+
+    def run_shard(self, index):
+        """Play one claimed shard, save its results, scores and call metrics, and mark it done"""
+        competition = RiddleCompetition(**self.plan['competition'], shard=(index, self.num_shards),
+                                        results_path=self.results_path(index), early_stopping=False)
+        try:
+            competition.run_competition()
+            state = {'shard': index, 'scores': competition.scores, 'metrics': competition.generator.metrics.export()}
+        finally:
+            competition.generator.close()
+            if competition.riddle_store:
+                competition.riddle_store.close()
+        tmp_path = os.path.join(self.results_dir, f"shard-{index}.json.tmp")
+        with open(tmp_path, 'w') as f:
+            json.dump(state, f)
+        os.replace(tmp_path, os.path.join(self.results_dir, f"shard-{index}.json"))
+        os.rename(self._path(index, "claimed"), self._path(index, "done"))
+
+    def work(self, stale_after=None):
+        """Claim and play shards until the queue is empty; returns the indexes played"""
+        played = []
+        while True:
+            index = self.claim(stale_after)
+            if index is None:
+                return played
+            print(f"\n=== Playing shard {index + 1} of {self.num_shards} ===")
+            self.run_shard(index)
+            played.append(index)
+
+    def merge(self, results_path=None):
+        """Combine every shard into one report, as RiddleCompetition.run_competition returns it.
+
+        Detailed results are concatenated in shard order into results_path (default:
+        work_dir/results.csv, or .arrow), scores are summed and call metrics pooled.
+        """
+        status = self.status()
+        if status['done'] != self.num_shards:
+            raise Exception(f"Only {status['done']} of {self.num_shards} shards are done ({status})")
+
+        args = dict(self.plan['competition'], riddle_store_path=None,  # No need to load the riddle history
+                    early_stopping=False)
+        competition = RiddleCompetition(**args)
+        results_format = args.get('results_format')
+        results_path = results_path or os.path.join(
+            self.work_dir, "results.arrow" if results_format == "arrow" else "results.csv")
+        results = open_result_sink(results_path, results_format)
+        try:
+            for index in range(self.num_shards):
+                with open(os.path.join(self.results_dir, f"shard-{index}.json")) as f:
+                    state = json.load(f)
+                for provider, counts in state['scores'].items():
+                    totals = competition.scores.setdefault(provider, {"word": 0, "math": 0})
+                    for riddle_type, count in counts.items():
+                        totals[riddle_type] = totals.get(riddle_type, 0) + count
+                competition.generator.metrics.merge(state['metrics'])
+                for chunk in read_result_chunks(self.results_path(index), results_format):
+                    results.write_frame(chunk)
+            report = competition._finish_results(results)
+        finally:
+            competition.generator.close()
+        report['scores'] = competition.scores
+        return report
+
+
+def _process_running(pid):
+    """Whether a process with this id exists on this machine (assumed so where that can't be checked)"""
+    if os.name != 'posix':
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass  # Someone else's process
+    return True
+
+
+def work(work_dir, stale_after=None):
+    """Worker entry point: play shards from the queue in work_dir until none are left.
+
+    With stale_after, shards claimed more than that many seconds ago are taken over; it
+    must be longer than a shard takes to play.
+    """
+    return ShardQueue(work_dir).work(stale_after)
+
+
+def run_sharded(work_dir, num_shards, processes=None, results_path=None, stale_after=None, **competition_args):
+    """Run a competition split into num_shards shards on local worker processes and return the merged report.
+
+    More workers, on this or other machines, may join through work(work_dir) while it runs.
+    The merged detailed results go to results_path (default: in work_dir). Running again
+    with the same plan continues the queue: shards left claimed by crashed local workers
+    are played again, and with stale_after so are shards claimed elsewhere that long ago.
+    """
+    queue = ShardQueue.create(work_dir, num_shards, **competition_args)
+    requeued = queue.requeue_abandoned()
+    if requeued:
+        print(f"Requeued shards {requeued}, abandoned by workers that are no longer running")
+    status = queue.status()
+    if status['done'] == num_shards:
+        ic(f"Every shard in {work_dir} was already played by an earlier run with the same plan; "
+           f"reporting its results. Use another --shard-dir (or delete {work_dir}) for a new competition.")
+    elif status['done']:
+        print(f"Continuing the queue in {work_dir}: {status['done']} of {num_shards} shards already done")
+    # Fresh interpreters rather than forks of this one, whose provider loop thread wouldn't survive a fork
+    with ProcessPoolExecutor(max_workers=processes or num_shards,
+                             mp_context=multiprocessing.get_context("spawn")) as pool:
+        for future in [pool.submit(work, queue.work_dir, stale_after) for _ in range(processes or num_shards)]:
+            future.result()
+    return queue.merge(results_path)
@@ -1,6 +1,10 @@
 import argparse
-from icecream import ic
-from riddlegenerator.riddle_competition import RiddleCompetition
+import json
+from riddlegenerator.debug import ic
+from riddlegenerator.riddle_competition import RiddleCompetition, CONCURRENCY_MODES
+from riddlegenerator.response_cache import CACHE_MODES
+from riddlegenerator.result_sink import SINK_FORMATS
+from riddlegenerator.sharding import run_sharded, work
 
 
 
@@ -10,14 +14,115 @@ def main():
     parser.add_argument('--rounds', type=int, default=2,
                        help='Number of riddles each LLM will ask (default: 2)')
     parser.add_argument('--output', type=str, default='riddle_competition_results.csv',
-                       help='Output file for detailed results (default: riddle_competition_results.csv)')
+                       help='Output file for detailed results, written as each answer is scored (default: riddle_competition_results.csv)')
+    parser.add_argument('--format', choices=SINK_FORMATS, default=None,
+                       help='Format of the output file; arrow needs pyarrow (default: from the file extension, else csv)')
+    parser.add_argument('--concurrency', choices=CONCURRENCY_MODES, default='sequential',
+                       help='How solvers are asked each round (default: sequential)')
+    parser.add_argument('--max-workers', type=int, default=None,
+                       help='Maximum simultaneous solver calls when running concurrently (default: one per solver)')
+    parser.add_argument('--pipeline-depth', type=int, default=0,
+                       help='Riddles to generate ahead in the background while solvers answer (default: 0)')
+    parser.add_argument('--cache', choices=CACHE_MODES, default=None,
+                       help='Response cache mode; replay only uses cached responses (default: from config)')
+    parser.add_argument('--batch-size', type=int, default=1,
+                       help='Riddles requested from a riddler per call (default: 1)')
+    parser.add_argument('--offline', action='store_true',
+                       help='Answer riddles through provider batch APIs (slow but cheaper; for nightly runs)')
+    parser.add_argument('--batch-dir', type=str, default='batches',
+                       help='Directory for batch-job JSONL files in offline mode (default: batches)')
+    parser.add_argument('--poll-interval', type=float, default=60,
+                       help='Seconds between batch status checks in offline mode (default: 60)')
+    parser.add_argument('--riddle-store', type=str, default=None,
+                       help='SQLite file of riddles from earlier runs to avoid repeating (default: from config)')
+    parser.add_argument('--checkpoint', type=str, default=None,
+                       help='File to save progress to after each round (default: <output>.checkpoint.json)')
+    parser.add_argument('--checkpoint-interval', type=float, default=None,
+                       help='Minimum seconds between checkpoint saves (default: 30)')
+    parser.add_argument('--config', type=str, default=None,
+                       help='Config file to use instead of config/llm_config.json, e.g. config/mock_llm_config.json')
+    parser.add_argument('--resume', action='store_true',
+                       help='Continue an interrupted run from its checkpoint, appending to --output')
+    parser.add_argument('--stream', action='store_true', default=None,
+                       help='Stream solver replies and stop each one after its first answer line')
+    parser.add_argument('--solver-max-tokens', type=int, default=None,
+                       help='Output token cap for solver replies (default: 64, or "max_tokens" in the config)')
+    parser.add_argument('--metrics-port', type=int, default=None,
+                       help='Serve Prometheus metrics of the provider calls on this port while the competition runs')
+    parser.add_argument('--metrics-output', type=str, default=None,
+                       help='JSON file for the per-provider latency, token and retry summary')
+    parser.add_argument('--shards', type=int, default=None,
+                       help='Split the riddler rounds into this many shards, played by worker processes')
+    parser.add_argument('--processes', type=int, default=None,
+                       help='Local worker processes for --shards (default: one per shard)')
+    parser.add_argument('--shard-dir', type=str, default='shards',
+                       help='Work directory of the shard queue; other machines can join through a shared one (default: shards)')
+    parser.add_argument('--join', action='store_true',
+                       help='Only play shards from the queue in --shard-dir, e.g. as an extra worker on another machine')
+    parser.add_argument('--stale-after', type=float, default=None,
+                       help='Seconds after which a shard claimed by another worker counts as abandoned and is '
+                            'played again; must be longer than a shard takes (default: never)')
+    parser.add_argument('--early-stop', action='store_true', default=None,
+                       help='Skip the remaining rounds once the ranking is settled ("early_stopping" in the config)')
     
     args = parser.parse_args()
     
+    if args.shards or args.join:
+        # Shards checkpoint their progress through the queue and report metrics when merged;
+        # each shard only sees its own rounds, so none of them can tell when the ranking is settled
+        unsupported = [flag for flag, value in (('--resume', args.resume), ('--checkpoint', args.checkpoint),
+                                                ('--checkpoint-interval', args.checkpoint_interval),
+                                                ('--metrics-port', args.metrics_port), ('--offline', args.offline),
+                                                ('--early-stop', args.early_stop))
+                       if value is not None and value is not False]
+        if unsupported:
+            parser.error(f"{', '.join(unsupported)} can't be used with {'--join' if args.join else '--shards'}")
+    
+    if args.join:
+        played = work(args.shard_dir, stale_after=args.stale_after)
+        print(f"\nPlayed {len(played)} shards from {args.shard_dir}")
+        return
+    
     try:
-        # Initialize competition with specified number of rounds
-        competition = RiddleCompetition(riddles_per_llm=args.rounds)
-        results = competition.run_competition()
+        if args.shards:
+            competition = None
+            results = run_sharded(args.shard_dir, args.shards, processes=args.processes, results_path=args.output,
+                                  stale_after=args.stale_after,
+                                  riddles_per_llm=args.rounds,
+                                  concurrency=args.concurrency,
+                                  max_workers=args.max_workers,
+                                  pipeline_depth=args.pipeline_depth,
+                                  cache_mode=args.cache,
+                                  batch_size=args.batch_size,
+                                  results_format=args.format,
+                                  config_path=args.config,
+                                  stream_responses=args.stream,
+                                  max_tokens={"solver": args.solver_max_tokens} if args.solver_max_tokens else None,
+                                  **({"riddle_store_path": args.riddle_store} if args.riddle_store else {}))
+        else:
+            # Initialize competition with specified number of rounds
+            competition = RiddleCompetition(riddles_per_llm=args.rounds,
+                                            concurrency=args.concurrency,
+                                            max_workers=args.max_workers,
+                                            pipeline_depth=args.pipeline_depth,
+                                            cache_mode=args.cache,
+                                            riddle_store_path=args.riddle_store,
+                                            batch_size=args.batch_size,
+                                            results_path=args.output,
+                                            results_format=args.format,
+                                            checkpoint_path=args.checkpoint or f"{args.output}.checkpoint.json",
+                                            checkpoint_interval=args.checkpoint_interval,
+                                            resume=args.resume,
+                                            config_path=args.config,
+                                            metrics_port=args.metrics_port,
+                                            stream_responses=args.stream,
+                                            max_tokens={"solver": args.solver_max_tokens} if args.solver_max_tokens else None,
+                                            early_stopping=args.early_stop)
+            if args.offline:
+                results = competition.run_offline_competition(work_dir=args.batch_dir,
+                                                              poll_interval=args.poll_interval)
+            else:
+                results = competition.run_competition()
 
         # Print word riddles summary
         print("\nWord Riddles Summary:")
@@ -27,10 +132,40 @@ def main():
         print("\nMath Riddles Summary:")
         print(results['math_summary'].to_string(index=False))
 
-        # Save detailed results
-        results['detailed_results'].to_csv(args.output, index=False)
+        if 'early_stopping' in results:
+            early_stopping = results['early_stopping']
+            print(f"\nRanking: {', '.join(early_stopping['ranking'])}")
+            if early_stopping['rounds_skipped']:
+                print(f"Stopped early after {early_stopping['rounds_played']} rounds, saving "
+                      f"{early_stopping['calls_saved']} calls ({early_stopping['riddle_calls_saved']} riddles, "
+                      f"{early_stopping['solver_calls_saved']} answers)")
+            else:
+                print(f"Ranking {'settled' if early_stopping['settled'] else 'not settled'} by the last round")
+        
+        # Detailed results were saved as the competition ran
         print(f"\nDetailed results saved to {args.output}")
         
+        # Where the time went, per provider
+        print("\nProvider Latency (seconds):")
+        for provider, stats in results['metrics'].items():
+            latency = stats['latency_seconds']
+            if latency:
+                print(f"{provider}: {stats['calls']} calls, p50 {latency['p50']:.2f}, p95 {latency['p95']:.2f}, "
+                      f"p99 {latency['p99']:.2f}, {stats['retries']} retries")
+                if stats['cached_input_tokens']:
+                    print(f"{provider}: {stats['cached_input_tokens']} of {stats['input_tokens']} input tokens "
+                          f"read from the prompt cache")
+        if args.metrics_output:
+            with open(args.metrics_output, 'w') as f:
+                json.dump(results['metrics'], f, indent=2)
+            print(f"Call metrics saved to {args.metrics_output}")
+        
+        if competition and competition.generator.json_repairs:
+            print(f"Riddle JSON repairs: {dict(competition.generator.json_repairs)}")
+        
+        if competition and competition.generator.cache:
+            print(f"Response cache: {competition.generator.cache.stats()}")
+        
     except Exception as e:
         ic(e)
         raise
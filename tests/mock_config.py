@@ -0,0 +1,29 @@
+import json
+import os
+from riddlegenerator.riddle_competition import RiddleCompetition
+
+# Quick retries, so throttled mock calls don't slow the tests down
+FAST_RETRIES = {"max_retries": 3, "base_delay": 0.01}
+
+
+def mock_config(accuracies=(1.0, 1.0, 1.0), rate_limits=None, **options):
+    """Config with a zero-latency mock competitor per accuracy; options are passed to every mock adapter"""
+    return {"llm_configs": [
+        {"provider": f"mock-{i}", "adapter": "mock", "model": f"mock-model-{i}",
+         "options": dict({"seed": i, "accuracy": accuracy}, **options),
+         "rate_limits": dict(FAST_RETRIES if rate_limits is None else rate_limits)}
+        for i, accuracy in enumerate(accuracies)
+    ]}
+
+
+def write_config(directory, config):
+    """Write config to config.json in directory and return its path"""
+    path = os.path.join(directory, 'config.json')
+    with open(path, 'w') as f:
+        json.dump(config, f)
+    return path
+
+
+def mock_competition(directory, config, **kwargs):
+    """RiddleCompetition playing with config, written to directory"""
+    return RiddleCompetition(config_path=write_config(directory, config), **kwargs)
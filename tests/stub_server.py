@@ -0,0 +1,64 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class StubServer:
+    """Minimal local HTTP server standing in for provider endpoints in tests.
+
+    Routes map (method, path) to a function taking (body, path) and returning
+    (status, payload) or (status, payload, content_type); dict payloads are sent
+    as JSON, strings as-is.
+    """
+
+    def __init__(self, routes):
+        self.routes = routes
+        self.requests = []  # (method, path, body) for every request received
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def _handle(self, method):
+                length = int(self.headers.get('Content-Length') or 0)
+                raw = self.rfile.read(length) if length else b''
+                try:
+                    body = json.loads(raw) if raw else None
+                except ValueError:
+                    body = raw
+                path = self.path.split('?')[0]
+                stub.requests.append((method, path, body))
+
+                route = stub.routes.get((method, path))
+                content_type = 'application/json'
+                if route is None:
+                    status, payload = 404, {"error": {"message": f"No stub for {method} {path}"}}
+                else:
+                    status, payload, *rest = route(body, path)
+                    content_type = rest[0] if rest else content_type
+
+                data = payload.encode() if isinstance(payload, str) else json.dumps(payload).encode()
+                self.send_response(status)
+                self.send_header('Content-Type', content_type)
+                self.send_header('Content-Length', str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def do_GET(self):
+                self._handle('GET')
+
+            def do_POST(self):
+                self._handle('POST')
+
+            def log_message(self, format, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+        self.server.server_close()
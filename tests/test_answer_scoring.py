@@ -0,0 +1,79 @@
+import random
+import re
+import unittest
+from difflib import SequenceMatcher
+from unittest.mock import patch
+import pandas as pd
+from riddlegenerator import answer_scoring
+from riddlegenerator.answer_scoring import answer_line, check_answer, score_answers, score_frame
+from riddlegenerator.riddle_index import normalize_text
+
+
+def reference_check(given_answer, correct_answer):
+    """The original per-answer check from RiddleCompetition._check_answer"""
+    given = normalize_text(str(given_answer))
+    correct = normalize_text(str(correct_answer))
+    if any(char.isdigit() for char in correct):
+        given_nums = re.findall(r'-?\d+\.?\d*', given)
+        correct_nums = re.findall(r'-?\d+\.?\d*', correct)
+        if given_nums and correct_nums:
+            return float(given_nums[0]) == float(correct_nums[0])
+        return False
+    return SequenceMatcher(None, given, correct).ratio() > 0.8
+
+
+def answer_pairs(count, seed=7):
+    """Realistic mix of right, nearly right and wrong word and math answers"""
+    rng = random.Random(seed)
+    words = ["A piano", "An echo", "A towel", "A map", "Your name", "The letter M", "A candle", "Footsteps"]
+    variants = [lambda w: w, str.lower, lambda w: w + ".", lambda w: "It's " + w.lower(),
+                lambda w: w[:-1], lambda w: w.replace("a", "o"), lambda w: rng.choice(words)]
+    pairs = []
+    for _ in range(count):
+        if rng.random() < 0.4:
+            answer = rng.randint(0, 120)
+            given = rng.choice([str(answer), f"{answer} apples", f"The answer is {answer + rng.randint(-1, 1)}",
+                                "I don't know", f"{answer}.0"])
+            pairs.append((given, str(answer)))
+        else:
+            correct = rng.choice(words)
+            pairs.append((rng.choice(variants)(correct), correct))
+    return pairs
+
+
+class TestAnswerScoring(unittest.TestCase):
+    def test_check_answer_matches_original(self):
+        for given, correct in answer_pairs(2000):
+            self.assertEqual(check_answer(given, correct), reference_check(given, correct), (given, correct))
+
+    def test_bulk_scoring_matches_original(self):
+        pairs = answer_pairs(5000)
+        expected = [reference_check(given, correct) for given, correct in pairs]
+        given, correct = zip(*pairs)
+        self.assertEqual(score_answers(given, correct).tolist(), expected)
+        # Same verdicts without rapidfuzz's bulk screening
+        with patch.object(answer_scoring, 'process', None):
+            self.assertEqual(score_answers(given, correct).tolist(), expected)
+
+    def test_score_frame_handles_missing_answers(self):
+        df = pd.DataFrame({'Given Answer': ["a piano", None, float('nan'), "7"],
+                           'Correct Answer': ["A piano", "An echo", "", "7"]}, index=[10, 11, 12, 13])
+        scored = score_frame(df)
+        self.assertEqual(scored.tolist(), [True, False, True, True])
+        self.assertEqual(list(scored.index), [10, 11, 12, 13])
+
+    def test_answer_line(self):
+        self.assertIsNone(answer_line("A pia"))
+        self.assertIsNone(answer_line("A piano"))  # Could still be growing
+        self.assertEqual(answer_line("A piano\n\nExplanation: pianos"), "A piano")
+        self.assertEqual(answer_line("\n  The answer is:\n\n 42 \nBecause"), "42")
+        self.assertEqual(answer_line("```\nA towel\n```"), "A towel")
+        self.assertIsNone(answer_line("The answer is:\n"))
+
+    def test_mismatched_lengths(self):
+        with self.assertRaises(ValueError):
+            score_answers(["a"], ["a", "b"])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,230 @@
+import json
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+from riddlegenerator.batch_jobs import BatchJobRunner
+from riddlegenerator.providers import AnthropicAdapter, Completion, OpenAIAdapter, ProviderAdapter
+from riddlegenerator.riddle_competition import RiddleCompetition
+from tests.stub_server import StubServer
+
+
+def answer_for(prompt):
+    """What the stub 'models' answer"""
+    return "4" if "2 + 2" in prompt else "A piano"
+
+
+class BatchStub:
+    """Stub of the OpenAI Files/Batches and Anthropic Message Batches endpoints.
+
+    Each batch reports in_progress on its first status check and completed on the next;
+    the first poll_errors checks of the OpenAI batch fail with a 503 before that.
+    """
+
+    def __init__(self):
+        self.openai_lines = []
+        self.anthropic_requests = []
+        self.status_checks = {"batch_1": 0, "msgbatch_1": 0}
+        self.poll_errors = 0
+        self.server = StubServer({
+            ('POST', '/v1/files'): self.upload_file,
+            ('POST', '/v1/batches'): self.create_openai_batch,
+            ('GET', '/v1/batches/batch_1'): self.openai_batch,
+            ('GET', '/v1/files/file_out/content'): self.openai_output,
+            ('POST', '/v1/messages/batches'): self.create_anthropic_batch,
+            ('GET', '/v1/messages/batches/msgbatch_1'): self.anthropic_batch,
+            ('GET', '/v1/messages/batches/msgbatch_1/results'): self.anthropic_results,
+        })
+
+    def upload_file(self, body, path):
+        # Multipart upload: keep the JSONL lines of the input file
+        for line in body.decode('utf-8', errors='ignore').splitlines():
+            if line.startswith('{"custom_id"'):
+                self.openai_lines.append(json.loads(line))
+        return 200, {"id": "file_in", "object": "file", "bytes": len(body), "created_at": 0,
+                     "filename": "input.jsonl", "purpose": "batch", "status": "processed"}
+
+    def _openai_batch_object(self, status):
+        return {"id": "batch_1", "object": "batch", "endpoint": "/v1/chat/completions", "input_file_id": "file_in",
+                "completion_window": "24h", "status": status, "created_at": 0,
+                "output_file_id": "file_out" if status == "completed" else None, "error_file_id": None}
+
+    def create_openai_batch(self, body, path):
+        return 200, self._openai_batch_object("validating")
+
+    def openai_batch(self, body, path):
+        if self.poll_errors:
+            self.poll_errors -= 1
+            return 503, {"error": {"message": "Service unavailable", "type": "server_error"}}
+        self.status_checks["batch_1"] += 1
+        return 200, self._openai_batch_object("completed" if self.status_checks["batch_1"] > 1 else "in_progress")
+
+    def openai_output(self, body, path):
+        lines = []
+        for line in self.openai_lines:
+            content = answer_for(line["body"]["messages"][-1]["content"])
+            lines.append(json.dumps({"id": "r", "custom_id": line["custom_id"], "error": None, "response": {
+                "status_code": 200, "request_id": "req",
+                "body": {"choices": [{"index": 0, "message": {"role": "assistant", "content": content}}],
+                         "usage": {"prompt_tokens": 10, "completion_tokens": 2}}}}))
+        return 200, "\n".join(lines)
+
+    def _anthropic_batch_object(self, ended):
+        return {"id": "msgbatch_1", "type": "message_batch",
+                "processing_status": "ended" if ended else "in_progress",
+                "request_counts": {"processing": 0, "succeeded": len(self.anthropic_requests), "errored": 0,
+                                   "canceled": 0, "expired": 0},
+                "created_at": "2024-01-01T00:00:00Z", "expires_at": "2024-01-02T00:00:00Z",
+                "ended_at": "2024-01-01T01:00:00Z" if ended else None,
+                "archived_at": None, "cancel_initiated_at": None,
+                "results_url": f"{self.server.url}/v1/messages/batches/msgbatch_1/results" if ended else None}
+
+    def create_anthropic_batch(self, body, path):
+        self.anthropic_requests.extend(body["requests"])
+        return 200, self._anthropic_batch_object(False)
+
+    def anthropic_batch(self, body, path):
+        self.status_checks["msgbatch_1"] += 1
+        return 200, self._anthropic_batch_object(self.status_checks["msgbatch_1"] > 1)
+
+    def anthropic_results(self, body, path):
+        lines = []
+        for request in self.anthropic_requests:
+            content = answer_for(request["params"]["messages"][0]["content"])
+            lines.append(json.dumps({"custom_id": request["custom_id"], "result": {"type": "succeeded", "message": {
+                "id": "msg", "type": "message", "role": "assistant", "model": request["params"]["model"],
+                "content": [{"type": "text", "text": content}], "stop_reason": "end_turn", "stop_sequence": None,
+                "usage": {"input_tokens": 10, "output_tokens": 2}}}}))
+        return 200, "\n".join(lines)
+
+
+class LiveAdapter(ProviderAdapter):
+    """Provider without a batch API"""
+
+    async def complete(self, model, prompt, system_prompt=None, temperature=0.1, max_tokens=None):
+        return Completion(answer_for(prompt))
+
+
+class SingleModelBatchAdapter(ProviderAdapter):
+    """Batch API that, like OpenAI's, rejects batch files mixing models"""
+
+    supports_batch = True
+
+    def __init__(self):
+        super().__init__("key")
+        self.files = []
+        self.batches = {}
+
+    def batch_line(self, custom_id, model, prompt, system_prompt=None, temperature=0.1, max_tokens=None):
+        return {"custom_id": custom_id, "model": model, "prompt": prompt}
+
+    async def submit_batch(self, path):
+        with open(path) as f:
+            lines = [json.loads(line) for line in f]
+        if len(set(line["model"] for line in lines)) > 1:
+            raise ValueError("A batch can only use one model")
+        self.files.append(path)
+        self.batches[f"batch_{len(self.batches)}"] = lines
+        return f"batch_{len(self.batches) - 1}"
+
+    async def batch_status(self, batch_id):
+        return "completed"
+
+    async def batch_results(self, batch_id):
+        return {line["custom_id"]: Completion(f"{line['model']}: {answer_for(line['prompt'])}")
+                for line in self.batches[batch_id]}
+
+
+def fake_riddle(provider, model, riddle_type, max_attempts=3):
+    if riddle_type == "math":
+        return {"type": "math", "riddle": f"What is 2 + 2? ({provider})", "answer": "4"}
+    return {"type": "word", "riddle": f"What has keys but can't open locks? ({provider})", "answer": "A piano"}
+
+
+class TestBatchJobs(unittest.TestCase):
+    def setUp(self):
+        self.stub = BatchStub()
+        self.stub.server.__enter__()
+        self.work_dir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.stub.server.__exit__(None, None, None)
+        self.work_dir.cleanup()
+
+    def _clients(self):
+        return {
+            "openai": OpenAIAdapter("key", base_url=f"{self.stub.server.url}/v1"),
+            "anthropic": AnthropicAdapter("key", base_url=self.stub.server.url),
+            "groq": LiveAdapter("key"),
+            "google": LiveAdapter("key"),
+        }
+
+    def test_runner_submits_polls_and_joins(self):
+        competition = RiddleCompetition()
+        competition.generator.clients = self._clients()
+        runner = BatchJobRunner(competition.generator, work_dir=self.work_dir.name, poll_interval=0.01)
+        requests = [
+            {"custom_id": "a", "provider": "openai", "model": "gpt", "prompt": "What is 2 + 2?"},
+            {"custom_id": "b", "provider": "anthropic", "model": "claude", "prompt": "Keys but no locks?"},
+            {"custom_id": "c", "provider": "groq", "model": "llama", "prompt": "What is 2 + 2?"},
+            {"custom_id": "d", "provider": "missing", "model": "x", "prompt": "?"},
+        ]
+        answers = runner.run(requests)
+
+        self.assertEqual(answers["a"], ("4", None))
+        self.assertEqual(answers["b"], ("A piano", None))
+        self.assertEqual(answers["c"], ("4", None))
+        self.assertIsNotNone(answers["d"][1])
+        self.assertEqual(self.stub.openai_lines[0]["url"], "/v1/chat/completions")
+        self.assertEqual(self.stub.anthropic_requests[0]["params"]["temperature"], 0.1)
+        # Both batches were still in progress on the first poll
+        self.assertGreaterEqual(min(self.stub.status_checks.values()), 2)
+
+    def test_polling_errors_are_retried(self):
+        competition = RiddleCompetition()
+        competition.generator.clients = self._clients()
+        requests = [{"custom_id": "a", "provider": "openai", "model": "gpt", "prompt": "What is 2 + 2?"}]
+
+        self.stub.poll_errors = 2
+        runner = BatchJobRunner(competition.generator, work_dir=self.work_dir.name, poll_interval=0.01,
+                                max_poll_errors=3)
+        self.assertEqual(runner.run(requests)["a"], ("4", None))
+
+        # Only errors in a row count, and the requests fail once there are too many
+        self.stub.status_checks["batch_1"] = 0
+        self.stub.poll_errors = 3
+        answer, error = runner.run(requests)["a"]
+        self.assertIsNone(answer)
+        self.assertIsNotNone(error)
+
+    def test_one_batch_per_model(self):
+        competition = RiddleCompetition()
+        adapter = competition.generator.clients["openai"] = SingleModelBatchAdapter()
+        runner = BatchJobRunner(competition.generator, work_dir=self.work_dir.name, poll_interval=0.01)
+        requests = [{"custom_id": f"{model}-{i}", "provider": "openai", "model": model, "prompt": "What is 2 + 2?"}
+                    for model in ("gpt-4o", "org/gpt-4o-mini") for i in range(2)]
+        answers = runner.run(requests)
+        self.assertEqual(answers["gpt-4o-0"], ("gpt-4o: 4", None))
+        self.assertEqual(answers["org/gpt-4o-mini-1"], ("org/gpt-4o-mini: 4", None))
+        # Both batches were written within the same second, to separate files
+        self.assertEqual(len(set(adapter.files)), 2)
+        self.assertEqual(sorted(os.listdir(self.work_dir.name)), sorted(os.path.basename(f) for f in adapter.files))
+
+    def test_offline_competition_matches_report_format(self):
+        competition = RiddleCompetition(riddles_per_llm=2)
+        competition.generator.clients = self._clients()
+        with patch.object(competition, '_get_unique_riddle', side_effect=fake_riddle):
+            results = competition.run_offline_competition(work_dir=self.work_dir.name, poll_interval=0.01)
+
+        detailed = results['detailed_results']
+        self.assertEqual(len(detailed), 4 * 2 * 3)
+        self.assertTrue(detailed['Is Correct'].all())
+        self.assertEqual(list(detailed.columns), ['Round', 'Type', 'Riddler', 'Solver', 'Riddle',
+                                                  'Correct Answer', 'Given Answer', 'Is Correct'])
+        self.assertEqual(competition.scores["openai"], {"word": 3, "math": 3})
+        self.assertEqual(len(self.stub.openai_lines), 6)
+        self.assertEqual(len(self.stub.anthropic_requests), 6)
+
+
+if __name__ == '__main__':
+    unittest.main()
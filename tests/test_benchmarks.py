@@ -0,0 +1,23 @@
+import unittest
+from benchmarks.run_benchmarks import compare, measure, synthetic_riddles
+
+
+class TestBenchmarks(unittest.TestCase):
+    def test_measure_reports_seconds_per_call(self):
+        result = measure(lambda: sum(range(100)), repeat=2)
+        self.assertEqual(result['runs'], 2)
+        self.assertLessEqual(result['best'], result['median'])
+        self.assertLess(result['median'], 0.01)
+
+    def test_compare_flags_regressions(self):
+        baseline = {"a": {"median": 1.0}, "b": {"median": 1.0}, "gone": {"median": 1.0}}
+        current = {"a": {"median": 1.05}, "b": {"median": 1.5}, "new": {"median": 1.0}}
+        self.assertEqual(compare(baseline, current, max_regression=10), ["b"])
+
+    def test_synthetic_riddles_are_distinct(self):
+        riddles = synthetic_riddles(1000)
+        self.assertEqual(len(set(riddles)), 1000)
+
+
+if __name__ == '__main__':
+    unittest.main()
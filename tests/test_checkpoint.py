@@ -0,0 +1,151 @@
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+from riddlegenerator.riddle_competition import RiddleCompetition
+from riddlegenerator.checkpoint import Checkpoint
+from riddlegenerator.result_sink import read_results
+from tests.test_riddle_competition import fake_riddle, fake_response
+
+
+class Interrupted(BaseException):
+    """Stands in for a crash or Ctrl-C part-way through a run"""
+
+
+class TestCheckpoint(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.results_path = os.path.join(self.tmp.name, 'results.csv')
+        self.checkpoint_path = os.path.join(self.tmp.name, 'results.checkpoint.json')
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def _competition(self, resume=False, checkpoint_interval=0):
+        return RiddleCompetition(riddles_per_llm=2, results_path=self.results_path,
+                                 checkpoint_path=self.checkpoint_path, resume=resume,
+                                 checkpoint_interval=checkpoint_interval)
+
+    def test_save_is_atomic_and_round_trips(self):
+        checkpoint = Checkpoint(self.checkpoint_path)
+        self.assertIsNone(checkpoint.load())
+        checkpoint.save({'scores': {'groq': {'word': 1, 'math': 0}}})
+        self.assertEqual(checkpoint.load()['scores'], {'groq': {'word': 1, 'math': 0}})
+        self.assertFalse(os.path.exists(self.checkpoint_path + '.tmp'))
+        checkpoint.delete()
+        self.assertFalse(checkpoint.exists())
+
+    def test_saves_are_throttled(self):
+        competition = self._competition(checkpoint_interval=60)
+        with patch.object(competition, '_get_unique_riddle', side_effect=fake_riddle), \
+             patch.object(competition.generator, 'get_raw_response', side_effect=fake_response), \
+             patch.object(competition.checkpoint, 'save', wraps=competition.checkpoint.save) as save:
+            competition.run_competition()
+        # Only the first of 8 rounds is saved, and the finished run leaves no checkpoint behind
+        self.assertEqual(save.call_count, 1)
+        self.assertFalse(os.path.exists(self.checkpoint_path))
+
+    def test_resume_skips_finished_work(self):
+        calls = []
+
+        def crashing_response(provider, model, prompt, system_prompt=None):
+            calls.append(provider)
+            if len(calls) == 11:
+                raise Interrupted()
+            return fake_response(provider, model, prompt, system_prompt)
+
+        # First run dies while the fourth round's solvers are answering; it was only due to save
+        # after the first round, but saves its progress on the way out
+        competition = self._competition(checkpoint_interval=60)
+        with patch.object(competition, '_get_unique_riddle', side_effect=fake_riddle), \
+             patch.object(competition.generator, 'get_raw_response', side_effect=crashing_response):
+            with self.assertRaises(Interrupted):
+                competition.run_competition()
+        self.assertEqual(len(read_results(self.results_path)), 9)
+
+        # A row written after the last checkpoint (e.g. before a hard kill) is dropped on resume
+        with open(self.results_path, 'a', encoding='utf-8') as f:
+            f.write("4,word,groq,anthropic,Unsaved riddle,A piano,A door,False\n")
+
+        # Resuming only asks the 15 remaining answers and reuses the fourth round's riddle
+        resumed = self._competition(resume=True)
+        with patch.object(resumed, '_get_unique_riddle', side_effect=fake_riddle) as riddles, \
+             patch.object(resumed.generator, 'get_raw_response', side_effect=fake_response) as responses:
+            results = resumed.run_competition()
+        self.assertEqual(responses.call_count, 15)
+        self.assertEqual(riddles.call_count, 4)
+        self.assertEqual(len(read_results(self.results_path)), 24)
+
+        # Same outcome as a run that was never interrupted
+        uninterrupted = self._competition()
+        uninterrupted.checkpoint = None
+        uninterrupted.results_path = os.path.join(self.tmp.name, 'uninterrupted.csv')
+        with patch.object(uninterrupted, '_get_unique_riddle', side_effect=fake_riddle), \
+             patch.object(uninterrupted.generator, 'get_raw_response', side_effect=fake_response):
+            expected = uninterrupted.run_competition()
+        self.assertEqual(resumed.scores, uninterrupted.scores)
+        self.assertEqual(results['detailed_results'].to_dict('records'),
+                         expected['detailed_results'].to_dict('records'))
+
+    def test_resume_keeps_riddles_generated_ahead(self):
+        calls = []
+
+        def crashing_response(provider, model, prompt, system_prompt=None):
+            calls.append(provider)
+            if len(calls) == 11:
+                raise Interrupted()
+            return fake_response(provider, model, prompt, system_prompt)
+
+        # Dies during the fourth round, with the riddles of the next three generated ahead
+        competition = self._competition(checkpoint_interval=60)
+        competition.pipeline_depth = 2
+        with patch.object(competition, '_get_unique_riddle', side_effect=fake_riddle) as riddles, \
+             patch.object(competition.generator, 'get_raw_response', side_effect=crashing_response):
+            with self.assertRaises(Interrupted):
+                competition.run_competition()
+        self.assertEqual(riddles.call_count, 7)
+        self.assertEqual(len(Checkpoint(self.checkpoint_path).load()['unit_riddles']), 7)
+
+        # Only the last round still needs a riddle
+        resumed = self._competition(resume=True)
+        with patch.object(resumed, '_get_unique_riddle', side_effect=fake_riddle) as riddles, \
+             patch.object(resumed.generator, 'get_raw_response', side_effect=fake_response) as responses:
+            results = resumed.run_competition()
+        self.assertEqual(riddles.call_count, 1)
+        self.assertEqual(responses.call_count, 15)
+        self.assertEqual(len(results['detailed_results']), 24)
+
+    def test_resume_asks_only_skipped_solvers(self):
+        class ThrottledError(Exception):
+            status_code = 429
+
+        def throttled_google(provider, model, prompt, system_prompt=None):
+            if provider == "google":
+                raise ThrottledError("rate limited")
+            return fake_response(provider, model, prompt, system_prompt)
+
+        competition = self._competition()
+        with patch.object(competition, '_get_unique_riddle', side_effect=fake_riddle), \
+             patch.object(competition.generator, 'get_raw_response', side_effect=throttled_google):
+            competition.run_competition()
+        self.assertTrue(os.path.exists(self.checkpoint_path))
+
+        # Google is asked the riddles it missed, which are reused rather than generated again
+        resumed = self._competition(resume=True)
+        with patch.object(resumed, '_get_unique_riddle', side_effect=fake_riddle) as riddles, \
+             patch.object(resumed.generator, 'get_raw_response', side_effect=fake_response) as responses:
+            results = resumed.run_competition()
+        self.assertEqual(riddles.call_count, 0)
+        self.assertEqual([c.args[0] for c in responses.call_args_list], ["google"] * 6)
+        self.assertEqual(len(results['detailed_results']), 24)
+        self.assertFalse(os.path.exists(self.checkpoint_path))
+
+    def test_mismatched_checkpoint_is_rejected(self):
+        Checkpoint(self.checkpoint_path).save({'riddles_per_llm': 4})
+        competition = self._competition(resume=True)
+        with self.assertRaises(ValueError):
+            competition.run_competition()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,96 @@
+import tempfile
+import unittest
+from riddlegenerator.early_stopping import RankingMonitor, wilson_interval
+from tests.mock_config import mock_competition, mock_config
+
+
+def early_stopping_config(accuracies, **early_stopping):
+    """Mock competitors with these accuracies and an 'early_stopping' config entry"""
+    return dict(mock_config(accuracies), early_stopping=early_stopping)
+
+
+class TestEarlyStopping(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def _competition(self, config, **kwargs):
+        return mock_competition(self.tmp.name, config, **kwargs)
+
+    def test_wilson_interval(self):
+        low, high = wilson_interval(8, 10)
+        self.assertAlmostEqual(low, 0.4902, places=4)
+        self.assertAlmostEqual(high, 0.9433, places=4)
+        self.assertEqual(wilson_interval(0, 0), (0.0, 1.0))
+        self.assertEqual(wilson_interval(10, 10)[1], 1.0)
+        # Higher confidence, wider interval
+        self.assertLess(wilson_interval(8, 10, 0.99)[0], low)
+
+    def test_settled(self):
+        monitor = RankingMonitor(min_answers=10, tie_margin=0.1)
+        self.assertEqual(monitor.ranking({"a": 2, "b": 9}, {"a": 10, "b": 10}), ["b", "a"])
+        # Separated intervals, but too few answers from c
+        self.assertFalse(monitor.settled({"a": 30, "b": 0, "c": 5}, {"a": 30, "b": 30, "c": 9}))
+        self.assertTrue(monitor.settled({"a": 30, "b": 0, "c": 5}, {"a": 30, "b": 30, "c": 10}))
+        # Overlapping and too wide to call a tie
+        self.assertFalse(monitor.settled({"a": 20, "b": 18}, {"a": 30, "b": 30}))
+        # Both perfect with enough answers: a tie
+        self.assertTrue(monitor.settled({"a": 40, "b": 40}, {"a": 40, "b": 40}))
+        # Only the winner needs to be clear
+        answers = {"a": 30, "b": 30, "c": 30}
+        self.assertFalse(monitor.settled({"a": 30, "b": 10, "c": 12}, answers))
+        self.assertTrue(RankingMonitor(top=1).settled({"a": 30, "b": 10, "c": 12}, answers))
+
+    def test_competition_stops_once_settled(self):
+        config = early_stopping_config([1.0, 0.5, 0.0], min_answers=10)
+        full = self._competition(config, riddles_per_llm=40, concurrency="asyncio")
+        self.assertIsNone(full.ranking_monitor)
+        full_results = full.run_competition()
+        full.generator.close()
+        self.assertNotIn('early_stopping', full_results)
+
+        competition = self._competition(config, riddles_per_llm=40, concurrency="asyncio", early_stopping=True)
+        results = competition.run_competition()
+        competition.generator.close()
+        early_stopping = results['early_stopping']
+
+        self.assertTrue(early_stopping['settled'])
+        self.assertEqual(early_stopping['ranking'], ["mock-0", "mock-1", "mock-2"])
+        self.assertGreater(early_stopping['rounds_skipped'], 0)
+        self.assertEqual(early_stopping['rounds_played'] + early_stopping['rounds_skipped'], 3 * 40)
+        self.assertEqual(early_stopping['riddle_calls_saved'], early_stopping['rounds_skipped'])
+        # Every skipped answer is one the full run made
+        detailed = results['detailed_results']
+        self.assertEqual(len(detailed) + early_stopping['solver_calls_saved'], len(full_results['detailed_results']))
+        calls = {provider: stats['calls'] for provider, stats in results['metrics'].items()}
+        full_calls = {provider: stats['calls'] for provider, stats in full_results['metrics'].items()}
+        # A lower bound: riddles generated again for being too similar aren't counted
+        self.assertGreaterEqual(sum(full_calls.values()) - sum(calls.values()), early_stopping['calls_saved'])
+        # Rounds alternate between riddlers and riddle types, so both types were played
+        self.assertEqual(set(detailed['Type']), {"word", "math"})
+        self.assertEqual(set(detailed['Riddler']), {"mock-0", "mock-1", "mock-2"})
+
+        # Success rates are over the riddles actually answered, not the planned rounds
+        for riddle_type in ("word", "math"):
+            summary = results[f'{riddle_type}_summary'].set_index('LLM')
+            answers = detailed[detailed['Type'] == riddle_type]
+            for solver, solver_answers in answers.groupby('Solver'):
+                self.assertEqual(summary.loc[solver, 'Total Questions'], len(solver_answers))
+                self.assertAlmostEqual(summary.loc[solver, f'{riddle_type.capitalize()} Success Rate'],
+                                       round(solver_answers['Is Correct'].mean() * 100, 2))
+            self.assertEqual(summary.loc["mock-0", f'{riddle_type.capitalize()} Success Rate'], 100.0)
+
+    def test_unsettled_ranking_plays_every_round(self):
+        competition = self._competition(early_stopping_config([1.0, 1.0, 1.0], enabled=True, tie_margin=0.0),
+                                        riddles_per_llm=6)
+        results = competition.run_competition()
+        competition.generator.close()
+        self.assertFalse(results['early_stopping']['settled'])
+        self.assertEqual(results['early_stopping']['calls_saved'], 0)
+        self.assertEqual(len(results['detailed_results']), 3 * 6 * 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
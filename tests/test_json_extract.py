@@ -0,0 +1,119 @@
+import asyncio
+import random
+import unittest
+from riddlegenerator.json_extract import IncrementalJsonExtractor, JsonExtractError, extract_json
+from riddlegenerator.providers import ProviderAdapter
+
+RIDDLE = {"type": "word", "riddle": "What has keys but can't open locks?", "answer": "A piano"}
+
+# Response -> (parsed value, repairs)
+MESSY = {
+    'Sure!\n```json\n{"type": "word", "riddle": "What has keys but can\'t open locks?", "answer": "A piano"}\n```\nEnjoy!':
+        (RIDDLE, []),
+    "{'type': 'word', 'riddle': 'What has keys but can't open locks?', 'answer': 'A piano'}":
+        (RIDDLE, ["single_quotes"]),
+    '{\\"type\\": \\"word\\", \\"riddle\\": \\"What has keys but can\'t open locks?\\", \\"answer\\": \\"A piano\\"}':
+        (RIDDLE, ["escaped_quotes"]),
+    '{type: "word", riddle: "What has keys but can\'t open locks?", answer: "A piano"}':
+        (RIDDLE, ["unquoted_keys"]),
+    '{"type": "word",\n "riddle": "What has keys but can\'t open locks?"\n "answer": "A piano",\n}':
+        (RIDDLE, ["missing_commas", "trailing_commas"]),
+    '{"type": "word", "riddle": "What has keys but can\'t open locks?", "answer": "A piano"':
+        (RIDDLE, ["truncated"]),
+    '{"type": "word", "riddle": "What has keys but can\'t open locks?", "answer": "A piano", "solu':
+        (RIDDLE, ["truncated"]),
+    '{"type": "word", "riddle": "What is a "word"?", "answer": "A word"}':
+        ({"type": "word", "riddle": 'What is a "word"?', "answer": "A word"}, ["unescaped_quotes"]),
+    '{"riddle": "Line one\nline two", "answer": "It\\\'s me", "n": 7, "ok": True, "x": None, "s": bare words}':
+        ({"riddle": "Line one\nline two", "answer": "It's me", "n": 7, "ok": True, "x": None, "s": "bare words"},
+         ["control_characters", "invalid_escapes", "python_literals", "unquoted_values"]),
+    'Riddles use {braces} sometimes. {"a": 1} and then {"b": 2}':
+        ({"a": 1}, []),
+}
+
+
+class ChunkedAdapter(ProviderAdapter):
+    """Streams a fixed reply a few characters at a time"""
+
+    supports_streaming = True
+
+    def __init__(self, reply):
+        super().__init__(None)
+        self.reply = reply
+        self.chunks_sent = 0
+
+    async def _stream_text(self, completion, model, prompt, system_prompt=None, temperature=0.1, max_tokens=None):
+        for i in range(0, len(self.reply), 5):
+            self.chunks_sent += 1
+            yield self.reply[i:i + 5]
+
+
+class TestJsonExtract(unittest.TestCase):
+    def test_repairs(self):
+        for response, (value, repairs) in MESSY.items():
+            extracted = extract_json(response)
+            self.assertEqual(extracted.value, value, response)
+            self.assertEqual(extracted.repairs, repairs, response)
+
+    def test_arrays(self):
+        extracted = extract_json('Here you go: [{"riddle": "a", "answer": "b"}, {"riddle": "c", "ans', kind="array")
+        self.assertEqual(extracted.value, [{"riddle": "a", "answer": "b"}, {"riddle": "c"}])
+        self.assertEqual(extracted.repairs, ["truncated"])
+        # A lone object is accepted where an array was asked for
+        self.assertEqual(extract_json('{"riddle": "a"}', kind="array").value, {"riddle": "a"})
+        self.assertEqual(extract_json('Here: [1, 2] then {"a": 1}', kind="object").value, {"a": 1})
+
+    def test_incremental_matches_whole(self):
+        rng = random.Random(0)
+        for response, (value, repairs) in MESSY.items():
+            for _ in range(10):
+                extractor = IncrementalJsonExtractor()
+                position = 0
+                while position < len(response):
+                    size = rng.randint(1, 8)
+                    extractor.feed(response[position:position + size])
+                    position += size
+                extracted = extractor.finish()
+                self.assertEqual((extracted.value, extracted.repairs), (value, repairs), response)
+
+    def test_completes_before_the_stream_ends(self):
+        extractor = IncrementalJsonExtractor()
+        self.assertIsNone(extractor.feed('Sure! {"type": "word", "answer": "A pi'))
+        self.assertIsNone(extractor.feed('ano"'))
+        extracted = extractor.feed('}\n\nI hope you enjoy it!')
+        self.assertEqual(extracted.value, {"type": "word", "answer": "A piano"})
+        self.assertEqual((extracted.start, extracted.end), (6, 43))
+
+    def test_stops_a_stream(self):
+        reply = '{"type": "word", "riddle": "What gets wetter the more it dries?", "answer": "A towel"}' + \
+                "\n\nThis classic riddle plays on the double meaning of drying." * 5
+        adapter = ChunkedAdapter(reply)
+        completion = asyncio.run(adapter.stream("model", "prompt", stop=IncrementalJsonExtractor()))
+        self.assertTrue(completion.stopped_early)
+        self.assertLess(adapter.chunks_sent, len(reply) / 5 / 2)
+        self.assertEqual(extract_json(completion.text).value["answer"], "A towel")
+
+    def test_no_json(self):
+        with self.assertRaises(JsonExtractError):
+            extract_json("I'm sorry, I can't generate riddles right now.")
+        with self.assertRaises(JsonExtractError):
+            extract_json("Nothing { usable ] here")
+        with self.assertRaises(ValueError):
+            extract_json("{}", kind="tuple")
+
+    def test_missing_values(self):
+        for response in ['{"a": ,"b":1}', '{"a": [,]}', '[1, , 2]']:
+            with self.assertRaises(JsonExtractError, msg=response):
+                extract_json(response)
+            extractor = IncrementalJsonExtractor()
+            self.assertIsNone(extractor.feed(response), response)
+            with self.assertRaises(JsonExtractError, msg=response):
+                extractor.finish()
+        # Scanning moves on to the next value that can be parsed
+        response = 'Draft: {"riddle": , } Final: {"riddle": "r", "answer": "a"}'
+        self.assertEqual(extract_json(response).value, {"riddle": "r", "answer": "a"})
+        self.assertEqual(extract_json(response, kind="array").value, {"riddle": "r", "answer": "a"})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,142 @@
+import json
+import socket
+import subprocess
+import sys
+import tempfile
+import unittest
+import urllib.request
+from riddlegenerator.metrics import OK_LATENCY_WINDOW, RESERVOIR_SIZE, MetricsRecorder
+from riddlegenerator.riddle_generator import RiddleGenerator
+from tests.mock_config import mock_competition, mock_config, write_config
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+class TestMetricsRecorder(unittest.TestCase):
+    def setUp(self):
+        self.metrics = MetricsRecorder()
+        for i in range(1, 101):
+            self.metrics.record("openai", "gpt-4", "response", i / 100, input_tokens=10, output_tokens=2)
+        self.metrics.record("openai", "gpt-4", "riddle", 5.0, ttft=0.5, retries=2, outcome="rate_limited")
+        self.metrics.record("openai", "gpt-4", "response", 0.001, outcome="cache_hit")
+
+    def test_summary(self):
+        summary = self.metrics.summary()["openai"]
+        self.assertEqual(summary["calls"], 102)
+        self.assertEqual(summary["outcomes"], {"ok": 100, "rate_limited": 1, "cache_hit": 1})
+        self.assertEqual(summary["retries"], 2)
+        self.assertEqual((summary["input_tokens"], summary["output_tokens"]), (1000, 200))
+        self.assertEqual(summary["latency_seconds"]["max"], 5.0)
+
+        responses = summary["by_model"]["gpt-4/response"]
+        self.assertAlmostEqual(responses["latency_seconds"]["p50"], 0.5, places=1)
+        self.assertAlmostEqual(responses["latency_seconds"]["p95"], 0.95, places=2)
+        # Cache hits never waited for a first token
+        self.assertEqual(self.metrics._series[("openai", "gpt-4", "response")].ttfts.count, 100)
+        self.assertEqual(summary["by_model"]["gpt-4/riddle"]["ttft_seconds"]["max"], 0.5)
+        json.dumps(summary)  # JSON-friendly
+
+    def test_prometheus_text(self):
+        text = self.metrics.prometheus_text()
+        labels = 'provider="openai",model="gpt-4",kind="response"'
+        self.assertIn(f'riddle_llm_calls_total{{{labels},outcome="ok"}} 100', text)
+        self.assertIn('riddle_llm_retries_total{provider="openai",model="gpt-4",kind="riddle"} 2', text)
+        self.assertIn(f'riddle_llm_tokens_total{{{labels},direction="input"}} 1000', text)
+        self.assertIn(f'riddle_llm_call_latency_seconds_bucket{{{labels},le="0.5"}} 51', text)
+        self.assertIn(f'riddle_llm_call_latency_seconds_bucket{{{labels},le="+Inf"}} 101', text)
+        self.assertIn(f'riddle_llm_call_latency_seconds_count{{{labels}}} 101', text)
+
+    def test_memory_is_bounded(self):
+        metrics = MetricsRecorder()
+        for i in range(20000):
+            metrics.record("groq", "llama", "response", (i % 1000) / 1000)
+        series = metrics._series[("groq", "llama", "response")]
+        self.assertEqual(len(series.latencies.sample), RESERVOIR_SIZE)
+        self.assertEqual(len(series.ok_latencies), OK_LATENCY_WINDOW)
+
+        # Counts, means and histograms stay exact; percentiles come from the sample
+        latency = metrics.summary()["groq"]["latency_seconds"]
+        self.assertEqual(metrics.summary()["groq"]["calls"], 20000)
+        self.assertEqual((latency["mean"], latency["max"]), (0.4995, 0.999))
+        self.assertAlmostEqual(latency["p50"], 0.5, delta=0.05)
+        labels = 'provider="groq",model="llama",kind="response"'
+        self.assertIn(f'riddle_llm_call_latency_seconds_bucket{{{labels},le="0.5"}} 10020', metrics.prometheus_text())
+
+        # A shard's export merges into the same totals
+        merged = MetricsRecorder()
+        merged.merge(json.loads(json.dumps(metrics.export())))
+        merged.merge(metrics.export())
+        self.assertEqual(merged.summary()["groq"]["calls"], 40000)
+        self.assertEqual(len(merged._series[("groq", "llama", "response")].latencies.sample), RESERVOIR_SIZE)
+        self.assertEqual(merged.summary()["groq"]["latency_seconds"]["mean"], 0.4995)
+
+    def test_numpy_is_imported_on_first_use(self):
+        # Every CLI run, --help included, imports the competition; numpy is slow to load
+        result = subprocess.run([sys.executable, "-c", "import sys, riddlegenerator.riddle_competition; "
+                                 "print('numpy' in sys.modules)"], capture_output=True, text=True)
+        self.assertEqual(result.stdout.strip(), "False")
+
+    def test_http_endpoint(self):
+        server = self.metrics.serve(free_port())
+        try:
+            url = f"http://127.0.0.1:{server.server_address[1]}/metrics"
+            with urllib.request.urlopen(url) as response:
+                self.assertTrue(response.headers['Content-Type'].startswith('text/plain'))
+                self.assertEqual(response.read().decode('utf-8'), self.metrics.prometheus_text())
+        finally:
+            server.shutdown()
+            server.server_close()
+
+
+class TestCallMetrics(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def _config_path(self, config):
+        return write_config(self.tmp.name, config)
+
+    def test_calls_are_recorded(self):
+        generator = RiddleGenerator(config_path=self._config_path(mock_config(rate_limit_rate=0.5, retry_after=0.001)))
+        generator.governors["mock-0"].max_retries = 20
+        for _ in range(5):
+            generator.get_riddle("mock-0", "mock-model-0", "math")
+            generator.get_raw_response("mock-0", "mock-model-0", "What is 2 + 2?")
+        generator.close()
+
+        summary = generator.metrics.summary()["mock-0"]
+        self.assertEqual(summary["outcomes"], {"ok": 10})
+        self.assertEqual(summary["retries"], generator.governors["mock-0"].retries)
+        self.assertGreater(summary["retries"], 0)
+        self.assertGreater(summary["output_tokens"], 0)
+        self.assertEqual(sorted(summary["by_model"]), ["mock-model-0/response", "mock-model-0/riddle"])
+
+    def test_failed_calls_are_recorded(self):
+        generator = RiddleGenerator(config_path=self._config_path(mock_config(error_rate=1.0)))
+        with self.assertRaises(Exception):
+            generator.get_raw_response("mock-0", "mock-model-0", "What is 2 + 2?")
+        generator.close()
+        self.assertEqual(generator.metrics.summary()["mock-0"]["outcomes"], {"error": 1})
+
+    def test_report_includes_metrics(self):
+        competition = mock_competition(self.tmp.name, mock_config(), riddles_per_llm=2, metrics_port=free_port())
+        try:
+            results = competition.run_competition()
+            with urllib.request.urlopen(f"http://127.0.0.1:{competition.metrics_server.server_address[1]}/") as r:
+                self.assertIn("riddle_llm_calls_total", r.read().decode('utf-8'))
+        finally:
+            competition.metrics_server.shutdown()
+            competition.metrics_server.server_close()
+        self.assertEqual(set(results['metrics']), {"mock-0", "mock-1", "mock-2"})
+        # Each riddler asks 2 riddles; each is answered by the 2 other solvers
+        self.assertEqual(sum(stats['calls'] for stats in results['metrics'].values()), 3 * 2 + 3 * 2 * 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,187 @@
+import asyncio
+import os
+import tempfile
+import time
+import unittest
+from riddlegenerator.answer_scoring import answer_line
+from riddlegenerator.mock_provider import MockAdapter, known_answer
+from riddlegenerator.rate_limiter import ProviderGovernor, is_rate_limit_error
+from riddlegenerator.riddle_generator import RiddleGenerator
+from tests.mock_config import mock_competition, mock_config, write_config
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class TestMockProvider(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def _config_path(self, config):
+        return write_config(self.tmp.name, config)
+
+    def _riddles(self, seed):
+        generator = RiddleGenerator(config_path=self._config_path(mock_config(seed=seed)))
+        riddles = [generator.get_riddle("mock-0", "mock-model-0", riddle_type) for riddle_type in ["word", "math"] * 30]
+        riddles += generator.get_riddles("mock-1", "mock-model-1", "word", 5)
+        generator.close()
+        return riddles
+
+    def test_riddles_are_seeded_and_answerable(self):
+        riddles = self._riddles(seed=7)
+        self.assertEqual(riddles, self._riddles(seed=7))
+        self.assertNotEqual(riddles, self._riddles(seed=8))
+        self.assertEqual(len(riddles), 65)
+        for riddle in riddles:
+            self.assertEqual(known_answer(riddle['riddle']), riddle['answer'])
+        # Once the classic riddles run out, made-up ones keep coming
+        self.assertEqual(len(set(r['riddle'] for r in riddles if r['type'] == "word")), 30)
+
+    def test_solver_accuracy(self):
+        riddle = "What has keys but can't open locks?"
+        prompt = f"Answer this riddle with just the answer, no explanation: {riddle}"
+        always = MockAdapter(options={"accuracy": 1.0})
+        never = MockAdapter(options={"accuracy": {"word": 0.0, "math": 1.0}})
+        self.assertEqual(asyncio.run(always.complete("m", prompt)).text, "A piano")
+        self.assertEqual(asyncio.run(never.complete("m", prompt)).text, "I don't know")
+        self.assertEqual(asyncio.run(never.complete("m", "What is 6 * 7?")).text, "42")
+
+    def test_latency_and_failures(self):
+        slow = MockAdapter(options={"latency": {"distribution": "uniform", "min_ms": 50, "max_ms": 60}})
+        start = time.perf_counter()
+        asyncio.run(slow.complete("m", "hello"))
+        self.assertGreaterEqual(time.perf_counter() - start, 0.05)
+
+        throttled = MockAdapter(options={"rate_limit_rate": 1.0, "retry_after": 0.01})
+        with self.assertRaises(Exception) as context:
+            asyncio.run(throttled.complete("m", "hello"))
+        self.assertTrue(is_rate_limit_error(context.exception))
+        self.assertEqual(context.exception.response.headers['retry-after'], '0.01')
+
+        # The governor retries simulated throttling until it clears
+        flaky = MockAdapter(options={"rate_limit_rate": 0.5, "retry_after": 0.001, "seed": 3, "accuracy": 1.0})
+        governor = ProviderGovernor(max_retries=20)
+
+        async def ask_all():
+            return await asyncio.gather(*(governor.call(lambda: flaky.complete("m", "What is 2 + 2?"))
+                                          for _ in range(10)))
+        completions = asyncio.run(ask_all())
+        self.assertEqual([c.text for c in completions], ["4"] * 10)
+        self.assertGreater(governor.retries, 0)
+
+        broken = MockAdapter(options={"error_rate": 1.0})
+        with self.assertRaises(Exception) as context:
+            asyncio.run(broken.complete("m", "hello"))
+        self.assertEqual(context.exception.status_code, 500)
+
+    def test_streamed_answers_stop_after_the_answer_line(self):
+        verbose = MockAdapter(options={"accuracy": 1.0, "verbosity": 1.0, "token_ms": 2})
+        prompt = "Answer this riddle with just the answer, no explanation: What has keys but can't open locks?"
+        full = asyncio.run(verbose.complete("m", prompt))
+        self.assertTrue(full.text.startswith("A piano\n\nExplanation: "))
+        self.assertEqual(asyncio.run(verbose.complete("m", prompt, max_tokens=3)).text, "A piano\n\nExp")
+
+        cut = asyncio.run(verbose.stream("m", prompt, stop=answer_line))
+        self.assertTrue(cut.stopped_early)
+        self.assertEqual(answer_line(cut.text), "A piano")
+        self.assertLess(cut.output_tokens, full.output_tokens)
+
+    def test_generator_streams_solver_replies(self):
+        config = dict(mock_config(verbosity=1.0, token_ms=1), max_tokens={"riddler": 512})
+        streamed = RiddleGenerator(config_path=self._config_path(config), stream_responses=True)
+        plain = RiddleGenerator(config_path=self._config_path(config), max_tokens={"solver": None})
+        self.assertEqual(streamed.max_tokens, {"riddler": 512, "solver": 64})
+        prompt = "Answer this riddle with just the answer, no explanation: What is 6 * 7?"
+        self.assertEqual(streamed.get_raw_response("mock-0", "mock-model-0", prompt), "42")
+        self.assertTrue(plain.get_raw_response("mock-0", "mock-model-0", prompt).startswith("42\n\nExplanation"))
+        streamed.close()
+        plain.close()
+
+        tokens = [generator.metrics.summary()["mock-0"]["output_tokens"] for generator in (streamed, plain)]
+        self.assertLess(tokens[0], tokens[1])
+
+    def test_malformed_json(self):
+        generator = RiddleGenerator(config_path=self._config_path(mock_config(malformed_rate=1.0,
+                                                                              structured_output=False)))
+        failures = 0
+        for _ in range(20):
+            try:
+                generator.get_riddle("mock-0", "mock-model-0", "word")
+            except Exception:
+                failures += 1
+        generator.close()
+        self.assertGreater(failures, 0)
+
+    def test_structured_output_is_never_malformed(self):
+        generator = RiddleGenerator(config_path=self._config_path(mock_config(malformed_rate=1.0)))
+        riddles = [generator.get_riddle("mock-0", "mock-model-0", "word") for _ in range(20)]
+        riddles += generator.get_riddles("mock-0", "mock-model-0", "math", 5)
+        generator.close()
+        self.assertEqual(len(riddles), 25)
+        self.assertEqual(generator.json_repairs, {})
+
+    def test_competition_runs_offline(self):
+        competition = mock_competition(self.tmp.name, mock_config(), riddles_per_llm=4, concurrency="asyncio")
+        results = competition.run_competition()
+        self.assertEqual(len(results['detailed_results']), 3 * 4 * 2)
+        self.assertTrue(results['detailed_results']['Is Correct'].all())
+        self.assertEqual(set(competition.scores), {"mock-0", "mock-1", "mock-2"})
+
+    def test_cached_prompt_prefixes_are_reported(self):
+        results = {}
+        for cache_min_tokens in (0, 1024):
+            config = mock_config(cache_min_tokens=cache_min_tokens)
+            competition = mock_competition(self.tmp.name, config, riddles_per_llm=4)
+            results[cache_min_tokens] = competition.run_competition()['metrics']
+            competition.generator.close()
+        for provider, stats in results[0].items():
+            # Every call but the first of each system prompt and model reads it from the cache
+            self.assertGreater(stats['cached_input_tokens'], 0)
+            self.assertLess(stats['cached_input_tokens'], stats['input_tokens'])
+            self.assertGreater(stats['cached_input_share'], 0)
+        # The riddle and solver instructions are shorter than the caching minimum of real providers
+        self.assertEqual(sum(stats['cached_input_tokens'] for stats in results[1024].values()), 0)
+
+    def test_several_models_per_provider(self):
+        config = mock_config()
+        config['llm_configs'] = [
+            dict(config['llm_configs'][0], model="mock-small"),
+            dict(config['llm_configs'][0], model="mock-large"),
+            dict(config['llm_configs'][1], name="Contender"),
+        ]
+        competition = mock_competition(self.tmp.name, config, riddles_per_llm=2, concurrency="threads")
+        names = ["mock-0/mock-small", "mock-0/mock-large", "Contender"]
+        self.assertEqual([name for name, _, _ in competition.competitors], names)
+        results = competition.run_competition()
+        competition.generator.close()
+
+        detailed = results['detailed_results']
+        self.assertEqual(set(detailed['Solver']), set(names))
+        self.assertEqual(set(competition.scores), set(names))
+        # Models of the same provider solve each other's riddles, but not their own
+        self.assertEqual(len(detailed.query("Riddler == 'mock-0/mock-small' and Solver == 'mock-0/mock-large'")), 2)
+        self.assertEqual(len(detailed.query("Riddler == Solver")), 0)
+
+        pairs = results['pair_summary']
+        self.assertEqual(len(pairs), 6)
+        self.assertEqual(pairs['Answered'].sum(), len(detailed))
+        self.assertEqual(list(results['word_summary'].query("LLM == 'Contender'")[['Provider', 'Model']].iloc[0]),
+                         ["mock-1", "mock-model-1"])
+        metrics = results['metrics']['mock-0']['by_model']
+        self.assertIn("mock-small/response", metrics)
+        self.assertIn("mock-large/response", metrics)
+
+        config['llm_configs'][1]['name'] = "Contender"
+        with self.assertRaises(ValueError):
+            mock_competition(self.tmp.name, config)
+
+    def test_shipped_mock_config_loads(self):
+        generator = RiddleGenerator(config_path=os.path.join(ROOT, 'config', 'mock_llm_config.json'))
+        self.assertEqual(sorted(generator.clients), ["mock-accurate", "mock-fast", "mock-flaky", "mock-slow"])
+        generator.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,304 @@
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import time
+import unittest
+from riddlegenerator.providers import (
+    ADAPTERS, AnthropicAdapter, BackgroundLoop, Completion, GroqAdapter, OpenAIAdapter,
+    ProviderAdapter, create_adapter, register_adapter
+)
+from riddlegenerator.answer_scoring import answer_line
+from riddlegenerator.riddle_generator import RiddleGenerator
+from riddlegenerator.riddle_schema import riddle_schema
+from tests.stub_server import StubServer
+
+
+def chat_completion(body, path):
+    """OpenAI-style chat completion echoing the last user message"""
+    return 200, {
+        "id": "chatcmpl-1", "object": "chat.completion", "created": 0, "model": body["model"],
+        "choices": [{"index": 0, "finish_reason": "stop",
+                     "message": {"role": "assistant", "content": f"  echo: {body['messages'][-1]['content']}  "}}],
+        "usage": {"prompt_tokens": 11, "completion_tokens": 3, "total_tokens": 14}
+    }
+
+
+def anthropic_message(body, path):
+    """Anthropic-style message echoing the user prompt"""
+    return 200, {
+        "id": "msg_1", "type": "message", "role": "assistant", "model": body["model"],
+        "content": [{"type": "text", "text": f"echo: {body['messages'][0]['content']}"}],
+        "stop_reason": "end_turn", "stop_sequence": None,
+        "usage": {"input_tokens": 9, "output_tokens": 2}
+    }
+
+
+def anthropic_tool_use(body, path):
+    """Anthropic-style message answering with a call to the forced tool"""
+    return 200, {
+        "id": "msg_1", "type": "message", "role": "assistant", "model": body["model"],
+        "content": [{"type": "tool_use", "id": "toolu_1", "name": body["tool_choice"]["name"],
+                     "input": {"type": "word", "riddle": "What has keys?", "answer": "A piano"}}],
+        "stop_reason": "tool_use", "stop_sequence": None,
+        "usage": {"input_tokens": 9, "output_tokens": 20}
+    }
+
+
+def sse(events):
+    """Server-sent events body from (event name or None, payload) pairs"""
+    return "".join((f"event: {name}\n" if name else "") + f"data: {json.dumps(data)}\n\n" for name, data in events)
+
+
+VERBOSE_REPLY = ["The answer", " is:\n", "A pia", "no\n\nExpl", "anation: pianos have", " keys but no locks."]
+
+
+def chat_completion_stream(body, path):
+    """OpenAI-style streamed chat completion of VERBOSE_REPLY"""
+    chunk = {"id": "chatcmpl-1", "object": "chat.completion.chunk", "created": 0, "model": body["model"]}
+    events = [(None, dict(chunk, choices=[{"index": 0, "delta": {"content": text}, "finish_reason": None}]))
+              for text in VERBOSE_REPLY]
+    events.append((None, dict(chunk, choices=[], usage={"prompt_tokens": 11, "completion_tokens": 12,
+                                                           "total_tokens": 23})))
+    return 200, sse(events) + "data: [DONE]\n\n", 'text/event-stream'
+
+
+def anthropic_message_stream(body, path):
+    """Anthropic-style streamed message of VERBOSE_REPLY"""
+    message = {"id": "msg_1", "type": "message", "role": "assistant", "model": body["model"], "content": [],
+               "stop_reason": None, "stop_sequence": None, "usage": {"input_tokens": 9, "output_tokens": 1}}
+    events = [("message_start", {"type": "message_start", "message": message}),
+              ("content_block_start", {"type": "content_block_start", "index": 0,
+                                       "content_block": {"type": "text", "text": ""}})]
+    events += [("content_block_delta", {"type": "content_block_delta", "index": 0,
+                                        "delta": {"type": "text_delta", "text": text}}) for text in VERBOSE_REPLY]
+    events += [("content_block_stop", {"type": "content_block_stop", "index": 0}),
+               ("message_delta", {"type": "message_delta", "delta": {"stop_reason": "end_turn", "stop_sequence": None},
+                                  "usage": {"output_tokens": 12}}),
+               ("message_stop", {"type": "message_stop"})]
+    return 200, sse(events), 'text/event-stream'
+
+
+class SlowEchoAdapter(ProviderAdapter):
+    """Adapter that answers after a fixed delay without any network"""
+
+    async def complete(self, model, prompt, system_prompt=None, temperature=0.1, max_tokens=None):
+        await asyncio.sleep(0.2)
+        return Completion(f" {system_prompt or ''}|{prompt} ", input_tokens=1, output_tokens=1)
+
+
+class TestProviderAdapters(unittest.TestCase):
+    """Adapters talk to a local stub server instead of the real APIs"""
+
+    def setUp(self):
+        self.loop = BackgroundLoop()
+
+    def tearDown(self):
+        self.loop.close()
+
+    def test_openai_compatible_adapters(self):
+        routes = {('POST', '/v1/chat/completions'): chat_completion,
+                  ('POST', '/openai/v1/chat/completions'): chat_completion}
+        with StubServer(routes) as server:
+            for adapter_class, base_url in ((OpenAIAdapter, f"{server.url}/v1"), (GroqAdapter, server.url)):
+                adapter = adapter_class("test-key", base_url=base_url)
+                completion = self.loop.run(adapter.complete("some-model", "riddle?", system_prompt="be brief"))
+                self.loop.run(adapter.aclose())
+                self.assertEqual(completion.text.strip(), "echo: riddle?")
+                self.assertEqual((completion.input_tokens, completion.output_tokens), (11, 3))
+            _, _, body = server.requests[-1]
+            self.assertEqual(body["messages"][0], {"role": "system", "content": "be brief"})
+
+    def test_anthropic_adapter(self):
+        with StubServer({('POST', '/v1/messages'): anthropic_message}) as server:
+            adapter = AnthropicAdapter("test-key", base_url=server.url)
+            completion = self.loop.run(adapter.complete("claude", "riddle?", system_prompt="be brief"))
+            self.loop.run(adapter.aclose())
+        self.assertEqual(completion.text, "echo: riddle?")
+        _, _, body = server.requests[-1]
+        # Too short to be cached, so not marked as a cacheable prefix
+        self.assertEqual(body["system"], "be brief")
+        self.assertEqual(body["max_tokens"], 1024)
+        self.assertEqual(body["temperature"], 0.1)
+
+    def test_prompt_caching(self):
+        def cached_chat_completion(body, path):
+            status, response = chat_completion(body, path)
+            response["usage"]["prompt_tokens_details"] = {"cached_tokens": 8}
+            return status, response
+
+        def cached_anthropic_message(body, path):
+            status, response = anthropic_message(body, path)
+            response["usage"].update(cache_read_input_tokens=1500, cache_creation_input_tokens=0)
+            return status, response
+
+        with StubServer({('POST', '/v1/chat/completions'): cached_chat_completion,
+                         ('POST', '/v1/messages'): cached_anthropic_message}) as server:
+            openai = OpenAIAdapter("test-key", base_url=f"{server.url}/v1")
+            anthropic = AnthropicAdapter("test-key", base_url=server.url)
+            uncached = AnthropicAdapter("test-key", base_url=server.url, options={"prompt_caching": False})
+            long_prompt = "be brief " * 500  # About 1100 tokens
+            completions = [self.loop.run(adapter.complete("model", "riddle?", system_prompt=long_prompt))
+                           for adapter in (openai, anthropic, uncached)]
+            for adapter in (openai, anthropic, uncached):
+                self.loop.run(adapter.aclose())
+        self.assertEqual([(c.input_tokens, c.cached_input_tokens) for c in completions[:2]], [(11, 8), (1509, 1500)])
+        # The long system prompt is marked as a cacheable prefix, unless caching is turned off
+        self.assertEqual([body["system"] for _, _, body in server.requests[1:]],
+                         [[{"type": "text", "text": long_prompt, "cache_control": {"type": "ephemeral"}}], long_prompt])
+
+    def test_streaming_adapters(self):
+        routes = {('POST', '/v1/chat/completions'): chat_completion_stream,
+                  ('POST', '/v1/messages'): anthropic_message_stream}
+        with StubServer(routes) as server:
+            for adapter in (OpenAIAdapter("test-key", base_url=f"{server.url}/v1"),
+                            AnthropicAdapter("test-key", base_url=server.url)):
+                full = self.loop.run(adapter.stream("model", "riddle?", max_tokens=64))
+                cut = self.loop.run(adapter.stream("model", "riddle?", stop=answer_line))
+                self.loop.run(adapter.aclose())
+
+                self.assertEqual(full.text, "".join(VERBOSE_REPLY))
+                self.assertFalse(full.stopped_early)
+                self.assertEqual(full.output_tokens, 12)
+                self.assertIsNotNone(full.time_to_first_token)
+                # Cut off in the chunk that completed the answer line
+                self.assertTrue(cut.stopped_early)
+                self.assertEqual(cut.text, "The answer is:\nA piano\n\nExpl")
+                self.assertEqual(answer_line(cut.text), "A piano")
+                self.assertLess(cut.output_tokens, 12)
+        bodies = [body for _, _, body in server.requests]
+        self.assertTrue(all(body["stream"] for body in bodies))
+        self.assertEqual(bodies[0]["stream_options"], {"include_usage": True})
+        self.assertEqual(bodies[0]["max_tokens"], 64)
+
+    def test_structured_output_requests(self):
+        schema = riddle_schema("word")
+        routes = {('POST', '/v1/chat/completions'): chat_completion,
+                  ('POST', '/openai/v1/chat/completions'): chat_completion,
+                  ('POST', '/v1/messages'): anthropic_tool_use}
+        with StubServer(routes) as server:
+            for adapter in (OpenAIAdapter("test-key", base_url=f"{server.url}/v1"),
+                            GroqAdapter("test-key", base_url=server.url),
+                            AnthropicAdapter("test-key", base_url=server.url)):
+                completion = self.loop.run(adapter.complete("model", "riddle?", response_schema=schema))
+                self.loop.run(adapter.aclose())
+        openai_body, groq_body, anthropic_body = [body for _, _, body in server.requests]
+        self.assertEqual(openai_body["response_format"],
+                         {"type": "json_schema", "json_schema": dict(schema, strict=True)})
+        self.assertEqual(groq_body["response_format"], {"type": "json_object"})
+        self.assertEqual(anthropic_body["tools"][0]["input_schema"], schema["schema"])
+        self.assertEqual(anthropic_body["tool_choice"], {"type": "tool", "name": "word_riddle"})
+        self.assertEqual(json.loads(completion.text)["answer"], "A piano")
+
+    def test_stream_falls_back_to_complete(self):
+        completion = self.loop.run(SlowEchoAdapter("key").stream("model", "riddle?", stop=answer_line))
+        self.assertEqual(completion.text, " |riddle? ")
+        self.assertFalse(completion.stopped_early)
+
+    def test_unknown_provider(self):
+        with self.assertRaises(ValueError):
+            create_adapter("nonexistent", "key")
+
+    def test_client_is_built_on_first_use(self):
+        adapter = OpenAIAdapter("key")
+        self.assertIsNone(adapter._client)
+        self.assertIs(adapter.client, adapter.client)
+        self.loop.run(adapter.aclose())
+        self.assertIsNone(adapter._client)
+
+    def test_missing_sdk(self):
+        class MissingSdkAdapter(ProviderAdapter):
+            sdk_name = "riddlegenerator_no_such_sdk"
+
+        register_adapter("missing-sdk", MissingSdkAdapter)
+        try:
+            with self.assertRaises(ImportError):
+                create_adapter("missing-sdk", "key")
+        finally:
+            del ADAPTERS["missing-sdk"]
+
+    def test_startup_imports_no_vendor_sdks(self):
+        # A fresh interpreter, since this one has long imported everything
+        code = ("import sys; from riddlegenerator.riddle_competition import RiddleCompetition\n"
+                "generator = RiddleCompetition().generator\n"
+                "print(sorted(generator.clients))\n"
+                "print([m for m in ('openai', 'anthropic', 'groq', 'google.generativeai', 'pandas') if m in sys.modules])")
+        env = dict(os.environ, GROQ_API_KEY="key", OPENAI_API_KEY="key", GOOGLE_API_KEY="key", ANTHROPIC_API_KEY="key")
+        output = subprocess.run([sys.executable, "-c", code], env=env, capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))), check=True).stdout.splitlines()
+        self.assertEqual(output[-2], "['anthropic', 'google', 'groq', 'openai']")
+        self.assertEqual(output[-1], "[]")
+
+
+class TestRiddleGeneratorFacade(unittest.TestCase):
+    """The sync API keeps working on top of the async adapters"""
+
+    def setUp(self):
+        register_adapter("slow-echo", SlowEchoAdapter)
+        self.generator = RiddleGenerator()
+        self.generator.clients = {"slow-echo": create_adapter("slow-echo", "key")}
+
+    def tearDown(self):
+        self.generator.close()
+        del ADAPTERS["slow-echo"]
+
+    def test_sync_facade_strips_response(self):
+        response = self.generator.get_raw_response("slow-echo", "model", "riddle?", system_prompt="sys")
+        self.assertEqual(response, "sys|riddle?")
+
+    def test_many_concurrent_calls_share_one_loop(self):
+        async def fan_out():
+            return await asyncio.gather(*(
+                self.generator.aget_raw_response("slow-echo", "model", f"riddle {i}") for i in range(200)
+            ))
+
+        start = time.perf_counter()
+        responses = self.generator.run_async(fan_out())
+        elapsed = time.perf_counter() - start
+        self.assertEqual(responses[7], "|riddle 7")
+        self.assertLess(elapsed, 2.0)
+
+    def test_batch_riddles_are_validated(self):
+        class BatchAdapter(ProviderAdapter):
+            async def complete(self, model, prompt, system_prompt=None, temperature=0.1, max_tokens=None):
+                self.prompt, self.max_tokens = prompt, max_tokens
+                return Completion('Here you go: [{"type": "word", "riddle": "What has keys?", "answer": "A piano"}, '
+                                  '{"riddle": "missing answer"}, '
+                                  '{"type": "word", "riddle": "What gets wetter?", "answer": "A towel"}]')
+
+        adapter = BatchAdapter("key")
+        self.generator.clients = {"batch": adapter}
+        riddles = self.generator.get_riddles("batch", "model", "word", 3)
+        self.assertEqual([r['answer'] for r in riddles], ["A piano", "A towel"])
+        self.assertIn("Generate 3 unique", adapter.prompt)
+        self.assertGreaterEqual(adapter.max_tokens, 1024)
+
+    def test_rejected_schema_falls_back_to_text(self):
+        class NoSchemaError(Exception):
+            status_code = 400
+
+        class PickyAdapter(ProviderAdapter):
+            supports_structured_output = True
+            calls = []
+
+            async def complete(self, model, prompt, system_prompt=None, temperature=0.1, max_tokens=None,
+                               response_schema=None):
+                self.calls.append(response_schema)
+                if response_schema:
+                    raise NoSchemaError("response_format is not supported by this model")
+                return Completion('{"type": "math", "riddle": "What is 2 + 2?", "answer": "4"}')
+
+        self.generator.clients = {"picky": PickyAdapter("key")}
+        for _ in range(2):
+            self.assertEqual(self.generator.get_riddle("picky", "model", "math")["answer"], "4")
+        # The schema is only tried once per model
+        self.assertEqual([call is not None for call in PickyAdapter.calls], [True, False, False])
+
+    def test_missing_client_raises(self):
+        with self.assertRaises(Exception):
+            self.generator.get_raw_response("openai-missing", "model", "riddle?")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,141 @@
+import asyncio
+import tempfile
+import time
+import unittest
+from riddlegenerator.providers import Completion
+from riddlegenerator.rate_limiter import (
+    ProviderGovernor, TokenBucket, estimate_tokens, is_rate_limit_error, is_retryable_error
+)
+from riddlegenerator.riddle_generator import RiddleGenerator
+from tests.mock_config import write_config
+
+
+class FakeStatusError(Exception):
+    """Stand-in for an SDK APIStatusError"""
+
+    def __init__(self, status_code):
+        super().__init__(f"Error code: {status_code}")
+        self.status_code = status_code
+
+
+class TestTokenBucket(unittest.TestCase):
+    def test_burst_then_wait(self):
+        bucket = TokenBucket(per_minute=60)  # One token per second, bursts of 60
+        waits = [bucket.reserve(1) for _ in range(62)]
+        self.assertEqual(waits[:60], [0.0] * 60)
+        self.assertAlmostEqual(waits[60], 1.0, places=1)
+        self.assertAlmostEqual(waits[61], 2.0, places=1)
+
+    def test_adjust_returns_overestimate(self):
+        bucket = TokenBucket(per_minute=600)
+        bucket.reserve(600)
+        bucket.adjust(-300)  # The call used 300 tokens fewer than reserved
+        self.assertEqual(bucket.reserve(300), 0.0)
+
+
+class TestProviderGovernor(unittest.TestCase):
+    def test_error_classification(self):
+        self.assertTrue(is_rate_limit_error(FakeStatusError(429)))
+        self.assertTrue(is_retryable_error(FakeStatusError(529)))
+        self.assertFalse(is_retryable_error(FakeStatusError(401)))
+        self.assertFalse(is_retryable_error(ValueError("bad json")))
+
+    def test_retries_throttled_calls(self):
+        governor = ProviderGovernor(max_retries=3, base_delay=0.01)
+        outcomes = [FakeStatusError(429), FakeStatusError(429), Completion("ok")]
+
+        async def make_call():
+            outcome = outcomes.pop(0)
+            if isinstance(outcome, Exception):
+                raise outcome
+            return outcome
+
+        result = asyncio.run(governor.call(make_call))
+        self.assertEqual(result.text, "ok")
+        self.assertEqual(governor.retries, 2)
+
+    def test_gives_up_after_max_retries(self):
+        governor = ProviderGovernor(max_retries=2, base_delay=0.01)
+
+        async def make_call():
+            raise FakeStatusError(429)
+
+        with self.assertRaises(FakeStatusError):
+            asyncio.run(governor.call(make_call))
+        self.assertEqual(governor.retries, 2)
+
+    def test_non_retryable_errors_raise_immediately(self):
+        governor = ProviderGovernor(base_delay=0.01)
+
+        async def make_call():
+            raise FakeStatusError(400)
+
+        with self.assertRaises(FakeStatusError):
+            asyncio.run(governor.call(make_call))
+        self.assertEqual(governor.retries, 0)
+
+    def test_failed_attempts_return_their_tokens(self):
+        governor = ProviderGovernor(tokens_per_minute=1000, max_retries=3, base_delay=0.01)
+        outcomes = [FakeStatusError(429), FakeStatusError(503), FakeStatusError(400)]
+
+        async def make_call():
+            raise outcomes.pop(0)
+
+        with self.assertRaises(FakeStatusError):
+            asyncio.run(governor.call(make_call, estimated_tokens=400))
+        # Three failed attempts of 400 tokens each would otherwise have overdrawn the bucket
+        self.assertEqual(governor.token_bucket.reserve(1000), 0.0)
+
+    def test_max_in_flight(self):
+        governor = ProviderGovernor(max_in_flight=2)
+        in_flight = []
+        peak = []
+
+        async def make_call():
+            in_flight.append(1)
+            peak.append(len(in_flight))
+            await asyncio.sleep(0.05)
+            in_flight.pop()
+            return Completion("ok")
+
+        async def run():
+            await asyncio.gather(*(governor.call(make_call) for _ in range(6)))
+
+        asyncio.run(run())
+        self.assertEqual(max(peak), 2)
+
+    def test_requests_per_minute_spreads_calls(self):
+        governor = ProviderGovernor(requests_per_minute=600)  # 10 per second after a burst of 600
+        governor.request_bucket.tokens = 0
+
+        async def make_call():
+            return Completion("ok")
+
+        async def run():
+            await asyncio.gather(*(governor.call(make_call) for _ in range(3)))
+
+        start = time.perf_counter()
+        asyncio.run(run())
+        self.assertGreaterEqual(time.perf_counter() - start, 0.25)
+
+    def test_estimate_tokens(self):
+        self.assertEqual(estimate_tokens("a" * 400, None, max_tokens=100), 200)
+
+    def test_provider_limits_are_merged(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            def generator(*rate_limits):
+                return RiddleGenerator(config_path=write_config(tmp, {"llm_configs": [
+                    {"provider": "mock", "adapter": "mock", "model": f"mock-model-{i}", "rate_limits": limits}
+                    for i, limits in enumerate(rate_limits)
+                ]}))
+
+            merged = generator({"requests_per_minute": 60}, {}, {"tokens_per_minute": 1000, "requests_per_minute": 60})
+            merged.close()
+            governor = merged.governors["mock"]
+            self.assertEqual((governor.request_bucket.capacity, governor.token_bucket.capacity), (60, 1000))
+            with self.assertRaises(ValueError):
+                generator({"max_in_flight": 4}, {"max_in_flight": 8})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,87 @@
+import os
+import tempfile
+import unittest
+from unittest.mock import MagicMock
+from riddlegenerator.rescore import JUDGES, LLMJudge, Rescorer, register_judge
+from riddlegenerator.result_sink import open_result_sink, read_results
+
+ROWS = [
+    # (type, riddle, correct answer, given answer, recorded verdict)
+    ("word", "What has keys but can't open locks?", "A piano", "A piano.", True),
+    ("word", "What has keys but can't open locks?", "A piano", "a pianos", True),
+    ("word", "What gets wetter the more it dries?", "A towel", "A sponge", False),
+    ("math", "What is 2 + 2?", "4", "4", True),
+    ("math", "What is 10 / 4?", "2.5", "25", True),
+    ("math", "What is 3 * 3?", "9", "9, or maybe 10", True),
+]
+
+
+def always_judge(df):
+    """Judge registered at runtime by a test: every answer is right"""
+    return [True] * len(df)
+
+
+class TestRescore(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.input_path = os.path.join(self.tmp.name, 'results.csv')
+        sink = open_result_sink(self.input_path)
+        for round_num, (riddle_type, riddle, correct, given, is_correct) in enumerate(ROWS * 50):
+            sink.write({'Round': round_num + 1, 'Type': riddle_type, 'Riddler': 'groq', 'Solver': 'openai',
+                        'Riddle': riddle, 'Correct Answer': correct, 'Given Answer': given,
+                        'Is Correct': is_correct})
+        sink.close()
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def _rescore(self, judge, output_name='rescored.csv', **kwargs):
+        output_path = os.path.join(self.tmp.name, output_name)
+        stats = Rescorer(judge=judge, chunksize=40, **kwargs).run(self.input_path, output_path)
+        return stats, read_results(output_path)
+
+    def test_heuristic_judge_reproduces_verdicts_in_parallel(self):
+        stats, df = self._rescore("heuristic", workers=2)
+        self.assertEqual(stats["rows"], 300)
+        self.assertEqual(stats["changed"], 0)
+        self.assertEqual(list(df['Round']), list(range(1, 301)))  # Order is kept across chunks
+        self.assertEqual(df.drop(columns='Is Correct').to_dict('records'),
+                         read_results(self.input_path).drop(columns='Is Correct').to_dict('records'))
+
+    def test_exact_judge_is_stricter(self):
+        stats, df = self._rescore("exact", output_name='rescored.arrow', workers=2)
+        self.assertEqual(list(df['Is Correct'][:6]), [True, False, False, True, False, False])
+        self.assertEqual(stats["changed"], 150)
+        self.assertEqual(stats["correct"], {"openai/word": 50, "openai/math": 50})
+
+    def test_llm_judge_asks_each_distinct_answer_once(self):
+        generator = MagicMock()
+        generator.get_raw_response.side_effect = lambda provider, model, prompt: (
+            "Yes." if "Given answer: A sponge" in prompt else "no")
+        judge = LLMJudge(generator, "groq", "llama", max_workers=4)
+        stats, df = self._rescore(judge)
+        # 6 distinct answers, repeated in each of 8 chunks, are asked once each
+        self.assertEqual(generator.get_raw_response.call_count, 6)
+        self.assertEqual(list(df['Is Correct'][:6]), [False, False, True, False, False, False])
+        self.assertEqual(stats["changed"], 300)
+
+    def test_registered_judge_runs_in_workers(self):
+        register_judge("always", always_judge)
+        try:
+            stats, df = self._rescore("always", workers=2)
+        finally:
+            del JUDGES["always"]
+        self.assertTrue(df['Is Correct'].all())
+        self.assertEqual(stats["changed"], 50)
+
+    def test_output_must_be_a_new_file(self):
+        with self.assertRaises(ValueError):
+            Rescorer().run(self.input_path, self.input_path)
+
+    def test_unknown_judge(self):
+        with self.assertRaises(ValueError):
+            Rescorer(judge="vibes")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,235 @@
+import asyncio
+import tempfile
+import time
+import unittest
+from unittest.mock import patch
+from riddlegenerator.providers import Completion, ProviderAdapter
+from riddlegenerator.resilience import CircuitBreaker, DeadlineExceeded, hedged, with_deadline
+from riddlegenerator.riddle_competition import RiddleCompetition
+from riddlegenerator.riddle_generator import RiddleGenerator
+from tests.mock_config import mock_config, write_config
+from tests.test_rate_limiter import FakeStatusError
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class StragglerAdapter(ProviderAdapter):
+    """Answers in 10ms, except that every slow_every-th call takes a second"""
+
+    def __init__(self, slow_every):
+        super().__init__(None)
+        self.slow_every = slow_every
+        self.calls = 0
+        self.cancelled = 0
+
+    async def complete(self, model, prompt, system_prompt=None, temperature=0.1, max_tokens=None):
+        self.calls += 1
+        try:
+            await asyncio.sleep(1.0 if self.calls % self.slow_every == 0 else 0.01)
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+        return Completion("A piano")
+
+
+class ThrottledAdapter(ProviderAdapter):
+    """Answers in 10ms after turning the first throttled calls away with a 429 and a Retry-After"""
+
+    def __init__(self, throttled, retry_after):
+        super().__init__(None)
+        self.throttled = throttled
+        self.retry_after = retry_after
+        self.calls = 0
+
+    async def complete(self, model, prompt, system_prompt=None, temperature=0.1, max_tokens=None):
+        self.calls += 1
+        await asyncio.sleep(0.01)
+        if self.calls <= self.throttled:
+            error = FakeStatusError(429)
+            error.response = type('Response', (), {'headers': {'retry-after': str(self.retry_after)}})()
+            raise error
+        return Completion("A piano")
+
+
+class TestResilience(unittest.TestCase):
+    def test_hedge_wins_and_cancels_the_straggler(self):
+        started = []
+        cancelled = []
+
+        async def call():
+            attempt = len(started)
+            started.append(attempt)
+            try:
+                await asyncio.sleep(1.0 if attempt == 0 else 0.01)
+            except asyncio.CancelledError:
+                cancelled.append(attempt)
+                raise
+            return attempt
+
+        hedges = []
+        start = time.perf_counter()
+        result = asyncio.run(hedged(call, delay=0.05, on_hedge=hedges.append))
+        self.assertLess(time.perf_counter() - start, 0.5)
+        self.assertEqual(result, 1)
+        self.assertEqual(hedges, [1])
+        self.assertEqual(cancelled, [0])
+
+    def test_no_hedge_without_delay_or_when_fast(self):
+        async def call():
+            await asyncio.sleep(0.01)
+            return "ok"
+
+        hedges = []
+        self.assertEqual(asyncio.run(hedged(call, delay=None, on_hedge=hedges.append)), "ok")
+        self.assertEqual(asyncio.run(hedged(call, delay=1.0, on_hedge=hedges.append)), "ok")
+        self.assertEqual(hedges, [])
+
+    def test_failed_attempt_waits_for_the_hedge(self):
+        attempts = []
+
+        async def call():
+            attempts.append(len(attempts))
+            if len(attempts) == 1:
+                await asyncio.sleep(0.1)
+                raise RuntimeError("first attempt failed")
+            await asyncio.sleep(0.2)
+            return "second"
+
+        self.assertEqual(asyncio.run(hedged(call, delay=0.05)), "second")
+
+        async def failing():
+            raise RuntimeError("down")
+
+        with self.assertRaises(RuntimeError):
+            asyncio.run(hedged(failing, delay=0.05, max_hedges=2))
+
+    def test_deadline(self):
+        async def slow():
+            await asyncio.sleep(1.0)
+
+        with self.assertRaises(DeadlineExceeded) as raised:
+            asyncio.run(with_deadline(slow(), 0.05))
+        self.assertEqual(raised.exception.status_code, 504)
+        self.assertEqual(asyncio.run(with_deadline(asyncio.sleep(0, result="done"), None)), "done")
+
+    def test_circuit_breaker(self):
+        clock = FakeClock()
+        breaker = CircuitBreaker(failure_threshold=2, reset_seconds=10, max_reset_seconds=30, clock=clock)
+        self.assertFalse(breaker.record_failure())
+        self.assertEqual(breaker.state, "closed")
+        self.assertTrue(breaker.record_failure())
+        self.assertEqual(breaker.state, "open")
+        self.assertFalse(breaker.allow())
+
+        clock.now = 10
+        self.assertEqual(breaker.state, "half_open")
+        self.assertTrue(breaker.allow())
+        # The trial fails: open again for twice as long
+        self.assertTrue(breaker.record_failure())
+        self.assertEqual(breaker.reset_seconds, 20)
+        clock.now = 29
+        self.assertFalse(breaker.allow())
+        clock.now = 30
+        self.assertTrue(breaker.record_failure())
+        self.assertEqual(breaker.reset_seconds, 30)  # Capped
+
+        clock.now = 60
+        breaker.record_success()
+        self.assertEqual((breaker.state, breaker.reset_seconds, breaker.failures, breaker.trips), ("closed", 10, 0, 3))
+
+    def test_from_config(self):
+        breaker = CircuitBreaker.from_config({"failure_threshold": 5})
+        self.assertEqual((breaker.failure_threshold, breaker.reset_seconds), (5, 30))
+
+
+class TestResilientCalls(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def _config_path(self, **settings):
+        return write_config(self.tmp.name, dict(mock_config(rate_limits={"max_retries": 0}), **settings))
+
+    def test_generator_hedges_stragglers(self):
+        generator = RiddleGenerator(config_path=self._config_path(
+            hedging={"percentile": 95, "min_samples": 10, "min_delay": 0.05}))
+        adapter = generator.clients["mock-0"] = StragglerAdapter(slow_every=10)
+        try:
+            start = time.perf_counter()
+            for _ in range(30):
+                self.assertEqual(generator.get_raw_response("mock-0", "mock-model-0", "Riddle?"), "A piano")
+            elapsed = time.perf_counter() - start
+        finally:
+            generator.close()
+        summary = generator.metrics.summary()["mock-0"]
+        # The first straggler comes before there is enough history; the later ones are hedged
+        self.assertEqual(summary["hedges"], 2)
+        self.assertEqual(adapter.cancelled, 2)
+        self.assertLess(elapsed, 2.0)
+
+    def test_generator_deadline(self):
+        generator = RiddleGenerator(config_path=self._config_path(deadlines={"response": 0.2}))
+        generator.clients["mock-0"] = StragglerAdapter(slow_every=1)
+        try:
+            with self.assertRaises(DeadlineExceeded):
+                generator.get_raw_response("mock-0", "mock-model-0", "Riddle?")
+        finally:
+            generator.close()
+        self.assertEqual(generator.metrics.summary()["mock-0"]["outcomes"], {"timeout": 1})
+
+    def test_throttling_does_not_count_against_the_deadline(self):
+        config = dict(mock_config(rate_limits={"max_retries": 3}), deadlines={"response": 0.2})
+        generator = RiddleGenerator(config_path=write_config(self.tmp.name, config))
+        adapter = generator.clients["mock-0"] = ThrottledAdapter(throttled=2, retry_after=0.15)
+        try:
+            start = time.perf_counter()
+            self.assertEqual(generator.get_raw_response("mock-0", "mock-model-0", "Riddle?"), "A piano")
+            elapsed = time.perf_counter() - start
+        finally:
+            generator.close()
+        # Waiting out the Retry-Afters takes longer than the deadline, but each attempt is quick
+        self.assertGreater(elapsed, 0.2)
+        self.assertEqual(adapter.calls, 3)
+        summary = generator.metrics.summary()["mock-0"]
+        self.assertEqual((summary["retries"], summary["outcomes"]), (2, {"ok": 1}))
+
+    def test_paused_solver_is_readmitted(self):
+        competition = RiddleCompetition(riddles_per_llm=4, config_path=self._config_path(
+            circuit_breaker={"failure_threshold": 2, "reset_seconds": 10}))
+        clock = FakeClock()
+        for breaker in competition.breakers.values():
+            breaker._clock = clock
+        failures = iter([True, True])
+
+        def flaky_response(provider, model, prompt, system_prompt=None):
+            clock.now += 3  # Each answer takes a while
+            if provider == "mock-2" and next(failures, False):
+                raise RuntimeError("service unavailable")
+            return "A piano"
+
+        with patch.object(competition.generator, 'get_raw_response', side_effect=flaky_response):
+            results = competition.run_competition()
+        competition.generator.close()
+        breaker = competition.breakers["mock-2"]
+        self.assertEqual((breaker.trips, breaker.state), (1, "closed"))
+        answered = results['detailed_results'].query("Solver == 'mock-2'")
+        # Two failures, then it sits out a few rounds and answers again
+        self.assertGreater(len(answered), 0)
+        self.assertLess(len(answered), 6)
+        self.assertIn("mock-2", set(results['detailed_results']['Riddler']))
+        # The answers it missed while paused are counted, but not as calls
+        skipped = results['metrics']['mock-2']['by_model']['mock-model-2/response']
+        self.assertEqual(skipped['outcomes'], {"circuit_open": 2 * 4 - len(answered) - 2})
+        self.assertEqual(skipped['calls'], 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,126 @@
+import os
+import tempfile
+import time
+import unittest
+from riddlegenerator.providers import ADAPTERS, Completion, ProviderAdapter, create_adapter, register_adapter
+from riddlegenerator.response_cache import CacheMissError, ResponseCache
+from riddlegenerator.riddle_generator import RiddleGenerator
+from riddlegenerator.answer_scoring import answer_line
+
+
+class CountingAdapter(ProviderAdapter):
+    """Adapter that numbers its responses so cache hits are visible"""
+
+    calls = 0
+
+    async def complete(self, model, prompt, system_prompt=None, temperature=0.1, max_tokens=None,
+                       response_schema=None):
+        CountingAdapter.calls += 1
+        return Completion(f"answer {CountingAdapter.calls}", input_tokens=5, output_tokens=2)
+
+
+class TestResponseCache(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, 'cache.sqlite')
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_key_covers_every_input(self):
+        base = ResponseCache.make_key("openai", "gpt", "riddle?", "sys", 0.1)
+        self.assertEqual(base, ResponseCache.make_key("openai", "gpt", "riddle?", "sys", 0.1))
+        self.assertNotEqual(base, ResponseCache.make_key("openai", "gpt", "riddle?", "sys", 0.7))
+        self.assertNotEqual(base, ResponseCache.make_key("openai", "gpt", "riddle?", None, 0.1))
+        self.assertNotEqual(base, ResponseCache.make_key("openai", "gpt", "riddle?", "sys", 0.1, occurrence=1))
+        self.assertNotEqual(base, ResponseCache.make_key("openai", "gpt", "riddle?", "sys", 0.1,
+                                                         request={"max_tokens": 64}))
+
+    def test_hits_misses_and_persistence(self):
+        cache = ResponseCache(self.path)
+        self.assertIsNone(cache.get("k"))
+        cache.put("k", "openai", "gpt", Completion("cached", 3, 1))
+        cache.close()
+
+        cache = ResponseCache(self.path)
+        completion = cache.get("k")
+        self.assertEqual((completion.text, completion.input_tokens, completion.output_tokens), ("cached", 3, 1))
+        self.assertEqual(cache.stats()["hits"], 1)
+        cache.close()
+
+    def test_ttl_expiry(self):
+        cache = ResponseCache(self.path, ttl_seconds=0.05)
+        cache.put("k", "openai", "gpt", Completion("stale"))
+        time.sleep(0.1)
+        self.assertIsNone(cache.get("k"))
+        self.assertEqual(cache.stats()["entries"], 0)
+        cache.close()
+
+    def test_lru_eviction(self):
+        cache = ResponseCache(self.path, max_entries=2)
+        cache.put("a", "p", "m", Completion("a"))
+        time.sleep(0.01)
+        cache.put("b", "p", "m", Completion("b"))
+        time.sleep(0.01)
+        cache.get("a")  # "b" is now least recently used
+        time.sleep(0.01)
+        cache.put("c", "p", "m", Completion("c"))
+        self.assertIsNotNone(cache.get("a"))
+        self.assertIsNone(cache.get("b"))
+        self.assertIsNotNone(cache.get("c"))
+        cache.close()
+
+    def test_replay_is_read_only(self):
+        cache = ResponseCache(self.path, mode="replay")
+        cache.put("k", "p", "m", Completion("ignored"))
+        self.assertIsNone(cache.get("k"))
+        cache.close()
+
+
+class TestGeneratorCaching(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        register_adapter("counting", CountingAdapter)
+        CountingAdapter.calls = 0
+
+    def tearDown(self):
+        del ADAPTERS["counting"]
+        self.tmp.cleanup()
+
+    def _generator(self, mode):
+        generator = RiddleGenerator(cache_mode="off")
+        generator.cache = ResponseCache(os.path.join(self.tmp.name, 'cache.sqlite'), mode=mode)
+        generator.clients = {"counting": create_adapter("counting", "key")}
+        return generator
+
+    def test_rerun_is_served_from_cache(self):
+        first = self._generator("readwrite")
+        answers = [first.get_raw_response("counting", "m", "riddle?") for _ in range(2)]
+        first.close()
+        self.assertEqual(answers, ["answer 1", "answer 2"])  # Repeats within a run are distinct calls
+
+        rerun = self._generator("replay")
+        rerun.clients = {}  # No API access at all
+        replayed = [rerun.get_raw_response("counting", "m", "riddle?") for _ in range(2)]
+        self.assertEqual(replayed, answers)
+        self.assertEqual(rerun.cache.stats()["hits"], 2)
+        with self.assertRaises(CacheMissError):
+            rerun.get_raw_response("counting", "m", "a different riddle?")
+        rerun.close()
+        self.assertEqual(CountingAdapter.calls, 2)
+
+    def test_request_parameters_are_part_of_the_key(self):
+        calls = [{"max_tokens": 64}, {"max_tokens": 8}, {"max_tokens": 64, "response_schema": {"name": "riddle"}},
+                 {"max_tokens": 64, "stop": answer_line}]
+        for _ in range(2):
+            generator = self._generator("readwrite")
+            answers = [generator.run_async(generator._call_provider("counting", "m", "riddle?", **call)).text
+                       for call in calls]
+            generator.close()
+        # Calls differing only in their output cap, schema or stop condition each missed the cache once
+        self.assertEqual(CountingAdapter.calls, len(calls))
+        self.assertEqual(answers, ["answer 1", "answer 2", "answer 3", "answer 4"])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,153 @@
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+from riddlegenerator.riddle_competition import RiddleCompetition
+from riddlegenerator.result_sink import (
+    ArrowResultSink, CsvResultSink, MemoryResultSink, _arrow_batches, open_result_sink, read_results
+)
+from tests.test_riddle_competition import fake_riddle, fake_response
+
+try:
+    import pyarrow
+except ImportError:
+    pyarrow = None
+
+
+def row(round_num, solver, is_correct, riddle_type="word"):
+    return {'Round': round_num, 'Type': riddle_type, 'Riddler': 'groq', 'Solver': solver,
+            'Riddle': 'What has keys, but can\'t open locks?', 'Correct Answer': 'A piano',
+            'Given Answer': 'A "grand" piano', 'Is Correct': is_correct}
+
+
+class TestResultSink(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def _check_round_trip(self, path, format=None):
+        sink = open_result_sink(path, format)
+        sink.write(row(1, 'openai', True))
+        # Rows are on disk once flushed, before the sink is closed
+        sink.flush()
+        self.assertEqual(len(read_results(path, format)), 1)
+        sink.write(row(2, 'google', False, "math"))
+        sink.close()
+
+        df = read_results(path, format)
+        self.assertEqual(df.to_dict('records'), [row(1, 'openai', True), row(2, 'google', False, "math")])
+
+    def test_csv_round_trip(self):
+        self._check_round_trip(os.path.join(self.tmp.name, 'results.csv'))
+
+    @unittest.skipIf(pyarrow is None, "pyarrow not installed")
+    def test_arrow_round_trip(self):
+        self._check_round_trip(os.path.join(self.tmp.name, 'results.arrow'))
+
+    def test_append_keeps_earlier_rows(self):
+        path = os.path.join(self.tmp.name, 'results.csv')
+        sink = CsvResultSink(path)
+        sink.write(row(1, 'openai', True))
+        sink.close()
+        sink = CsvResultSink(path, append=True)
+        sink.write(row(2, 'google', True))
+        self.assertEqual(list(sink.read()['Round']), [1, 2])
+        self.assertEqual([len(chunk) for chunk in sink.read_chunks(chunksize=1)], [1, 1])
+        sink.close()
+
+    @unittest.skipIf(pyarrow is None, "pyarrow not installed")
+    def test_arrow_survives_interrupted_write(self):
+        path = os.path.join(self.tmp.name, 'results.arrow')
+        sink = open_result_sink(path)
+        sink.write(row(1, 'openai', True))
+        sink.flush()
+        sink.write(row(2, 'google', True))
+        sink.close()
+        # Simulate a crash part-way through the last batch
+        with open(path, 'r+b') as f:
+            f.truncate(os.path.getsize(path) - 20)
+        self.assertEqual(list(read_results(path)['Round']), [1])
+
+    @unittest.skipIf(pyarrow is None, "pyarrow not installed")
+    def test_arrow_append_keeps_earlier_rows(self):
+        path = os.path.join(self.tmp.name, 'results.arrow')
+        sink = ArrowResultSink(path, batch_rows=2)
+        for round_num in range(1, 6):
+            sink.write(row(round_num, 'openai', True))
+        sink.close()
+        # Two full batches and the rest written on close
+        self.assertEqual(len(list(_arrow_batches(path))), 3)
+
+        sink = ArrowResultSink(path, append=True)
+        sink.write(row(6, 'google', True))
+        self.assertEqual(list(sink.read()['Round']), [1, 2, 3, 4, 5, 6])
+        sink.close()
+
+        # Resuming from a checkpoint that counted 3 rows drops the ones after them
+        sink = ArrowResultSink(path, append=True, keep_rows=3)
+        sink.write(row(4, 'google', False))
+        sink.close()
+        self.assertEqual(list(read_results(path)['Round']), [1, 2, 3, 4])
+        self.assertFalse(os.path.exists(path + '.tmp'))
+
+    @unittest.skipIf(pyarrow is None, "pyarrow not installed")
+    def test_arrow_resume(self):
+        path = os.path.join(self.tmp.name, 'results.arrow')
+        checkpoint_path = os.path.join(self.tmp.name, 'results.checkpoint.json')
+        calls = []
+
+        def crashing_response(provider, model, prompt, system_prompt=None):
+            calls.append(provider)
+            if len(calls) == 11:
+                raise KeyboardInterrupt()
+            return fake_response(provider, model, prompt, system_prompt)
+
+        competition = RiddleCompetition(riddles_per_llm=2, results_path=path, checkpoint_path=checkpoint_path)
+        with patch.object(competition, '_get_unique_riddle', side_effect=fake_riddle), \
+             patch.object(competition.generator, 'get_raw_response', side_effect=crashing_response):
+            with self.assertRaises(KeyboardInterrupt):
+                competition.run_competition()
+        self.assertEqual(len(read_results(path)), 9)
+
+        resumed = RiddleCompetition(riddles_per_llm=2, results_path=path, checkpoint_path=checkpoint_path,
+                                    resume=True)
+        with patch.object(resumed, '_get_unique_riddle', side_effect=fake_riddle), \
+             patch.object(resumed.generator, 'get_raw_response', side_effect=fake_response) as responses:
+            results = resumed.run_competition()
+        self.assertEqual(responses.call_count, 15)
+        self.assertEqual(len(read_results(path)), 24)
+        self.assertEqual(len(results['detailed_results']), 24)
+
+    def test_unknown_format(self):
+        with self.assertRaises(ValueError):
+            open_result_sink(os.path.join(self.tmp.name, 'results.txt'), 'xml')
+
+    def test_report_streams_results_to_file(self):
+        path = os.path.join(self.tmp.name, 'results.csv')
+        competition = RiddleCompetition(riddles_per_llm=2, results_path=path)
+        with patch.object(competition, '_get_unique_riddle', side_effect=fake_riddle), \
+             patch.object(competition.generator, 'get_raw_response', side_effect=fake_response):
+            results = competition.run_competition()
+
+        on_disk = read_results(path)
+        self.assertEqual(len(on_disk), 24)  # 4 riddlers x 2 rounds x 3 solvers
+        # Read back from the file only when asked for
+        self.assertNotIn('detailed_results', results.keys())
+        self.assertIn('detailed_results', results)
+        self.assertEqual(results['detailed_results'].to_dict('records'), on_disk.to_dict('records'))
+
+        # Summaries computed from the file agree with the running scores
+        for riddle_type in ('word', 'math'):
+            summary = results[f'{riddle_type}_summary']
+            correct = dict(zip(summary['LLM'], summary[f'{riddle_type.capitalize()} Riddles Correct']))
+            self.assertEqual(correct, {p: s[riddle_type] for p, s in competition.scores.items()})
+
+        # Chunked counting gives the same summary as reading everything at once
+        in_memory = competition._generate_report(MemoryResultSink(on_disk.to_dict('records')), chunksize=5)
+        self.assertTrue(in_memory['word_summary'].equals(results['word_summary']))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,171 @@
+import asyncio
+import time
+import unittest
+from unittest.mock import patch
+from riddlegenerator.riddle_competition import RiddleCompetition
+
+SOLVER_DELAY = 0.1
+
+def fake_riddle(provider, model, riddle_type, max_attempts=3):
+    """Return a fixed riddle without calling any API"""
+    if riddle_type == "math":
+        return {"type": "math", "riddle": f"What is 2 + 2? ({provider})", "answer": "4", "solution": "2 + 2 = 4"}
+    return {"type": "word", "riddle": f"What has keys but can't open locks? ({provider})", "answer": "A piano"}
+
+def fake_response(provider, model, prompt, system_prompt=None):
+    """Answer after a fixed delay; anthropic always gets it wrong"""
+    time.sleep(SOLVER_DELAY)
+    if provider == "anthropic":
+        return "A door"
+    return "4" if "2 + 2" in prompt else "A piano"
+
+async def fake_response_async(provider, model, prompt, system_prompt=None):
+    """Async counterpart of fake_response used by the asyncio mode"""
+    await asyncio.sleep(SOLVER_DELAY)
+    if provider == "anthropic":
+        return "A door"
+    return "4" if "2 + 2" in prompt else "A piano"
+
+class TestRiddleCompetition(unittest.TestCase):
+    """Offline tests for RiddleCompetition using patched model calls"""
+
+    def _run(self, concurrency, **kwargs):
+        competition = RiddleCompetition(riddles_per_llm=2, concurrency=concurrency, **kwargs)
+        with patch.object(competition, '_get_unique_riddle', side_effect=fake_riddle), \
+             patch.object(competition.generator, 'get_raw_response', side_effect=fake_response), \
+             patch.object(competition.generator, 'aget_raw_response', side_effect=fake_response_async):
+            start = time.perf_counter()
+            results = competition.run_competition()
+            elapsed = time.perf_counter() - start
+        return competition, results, elapsed
+
+    def test_concurrent_modes_match_sequential(self):
+        sequential, sequential_results, _ = self._run("sequential")
+        for mode in ("threads", "asyncio"):
+            competition, results, _ = self._run(mode)
+            self.assertEqual(competition.scores, sequential.scores)
+            self.assertEqual(results['detailed_results'].to_dict('records'),
+                             sequential_results['detailed_results'].to_dict('records'))
+
+    def test_concurrent_round_takes_slowest_solver_time(self):
+        # 4 riddlers x 2 rounds x 3 solvers sequentially is ~24 delays; concurrently ~8
+        _, _, elapsed = self._run("threads")
+        self.assertLess(elapsed, 8 * SOLVER_DELAY * 2)
+
+    def test_max_workers_bounds_concurrency(self):
+        _, _, elapsed = self._run("asyncio", max_workers=1)
+        self.assertGreaterEqual(elapsed, 24 * SOLVER_DELAY * 0.9)
+
+    def test_pipelined_generation_overlaps_solving(self):
+        competition = RiddleCompetition(riddles_per_llm=2, concurrency="threads", pipeline_depth=4)
+        riddles = {
+            "word": iter(["What has keys but can't open locks?", "Tomorrow never arrives, yet always coming; name me.",
+                          "Thirty white horses on a red hill: first they champ, then they stamp.",
+                          "Feed me and I live, give me water and I die."]),
+            "math": iter(["What is 2 + 2?", "What is 3 + 5?", "What is 7 - 1?", "What is 6 x 3?"]),
+        }
+
+        def slow_riddle(provider, model, riddle_type=None):
+            time.sleep(SOLVER_DELAY)
+            return {"type": riddle_type, "riddle": next(riddles[riddle_type]), "answer": "4"}
+
+        with patch.object(competition.generator, 'get_riddle', side_effect=slow_riddle), \
+             patch.object(competition.generator, 'get_raw_response', side_effect=fake_response):
+            start = time.perf_counter()
+            results = competition.run_competition()
+            elapsed = time.perf_counter() - start
+
+        # 8 generations + 8 solver rounds back to back would take ~16 delays
+        self.assertLess(elapsed, 12 * SOLVER_DELAY)
+        self.assertEqual(len(results['detailed_results']), 4 * 2 * 3)
+        self.assertEqual(len(competition.used_riddles), 8)
+
+    def test_pipelined_dedup_rejects_repeats(self):
+        competition = RiddleCompetition(riddles_per_llm=2, pipeline_depth=3)
+        repeated = {"type": "word", "riddle": "What has keys but can't open locks?", "answer": "A piano"}
+
+        def repeating_riddle(provider, model, riddle_type=None):
+            return dict(repeated) if riddle_type == "word" else fake_riddle(provider, model, riddle_type)
+
+        with patch.object(competition.generator, 'get_riddle', side_effect=repeating_riddle), \
+             patch.object(competition.generator, 'get_raw_response', side_effect=fake_response):
+            competition.run_competition()
+
+        # Of the four word rounds only the first is accepted, the rest fall back to the default riddle
+        self.assertEqual(competition.used_riddles.count(repeated['riddle']), 1)
+
+    def test_batched_generation_needs_fewer_calls(self):
+        competition = RiddleCompetition(riddles_per_llm=4, batch_size=2)
+        words = iter(["What has keys but can't open locks?", "Tomorrow never arrives, yet always coming; name me.",
+                      "Thirty white horses on a red hill: first they champ, then they stamp.",
+                      "Feed me and I live, give me water and I die.", "What gets wetter the more it dries?",
+                      "The more you take, the more you leave behind.", "What has a neck but no head?",
+                      "What can travel around the world while staying in a corner?"])
+        calls = []
+
+        def batch(provider, model, riddle_type, count):
+            calls.append((provider, riddle_type, count))
+            if riddle_type == "math":
+                return [{"type": "math", "riddle": f"What is {len(calls)} + {i}?", "answer": str(len(calls) + i)}
+                        for i in range(count)]
+            return [{"type": "word", "riddle": next(words), "answer": "A towel"} for _ in range(count)]
+
+        with patch.object(competition.generator, 'get_riddles', side_effect=batch), \
+             patch.object(competition.generator, 'get_riddle') as single, \
+             patch.object(competition.generator, 'get_raw_response', side_effect=fake_response):
+            results = competition.run_competition()
+
+        # 4 riddlers x 2 types, one call each instead of one per round
+        self.assertEqual(len(calls), 8)
+        single.assert_not_called()
+        self.assertEqual(len(set(results['detailed_results']['Riddle'])), 16)
+
+    def test_batch_candidates_go_through_dedup(self):
+        competition = RiddleCompetition(riddles_per_llm=2, batch_size=3)
+        repeated = {"type": "word", "riddle": "What has keys but can't open locks?", "answer": "A piano"}
+        fresh = {"type": "word", "riddle": "What gets wetter the more it dries?", "answer": "A towel"}
+        with patch.object(competition.generator, 'get_riddles', return_value=[repeated, dict(repeated), fresh]) as batch:
+            first = competition._get_unique_riddle("groq", "llama", "word")
+            second = competition._get_unique_riddle("groq", "llama", "word")
+        self.assertEqual((first['riddle'], second['riddle']), (repeated['riddle'], fresh['riddle']))
+        batch.assert_called_once()
+
+    def test_failed_solver_is_removed(self):
+        competition = RiddleCompetition(riddles_per_llm=2, concurrency="threads")
+
+        def failing_response(provider, model, prompt, system_prompt=None):
+            if provider == "google":
+                raise RuntimeError("service unavailable")
+            return fake_response(provider, model, prompt, system_prompt)
+
+        with patch.object(competition, '_get_unique_riddle', side_effect=fake_riddle), \
+             patch.object(competition.generator, 'get_raw_response', side_effect=failing_response):
+            results = competition.run_competition()
+        self.assertNotIn("google", set(results['detailed_results']['Solver']))
+        self.assertNotIn("google", set(results['detailed_results']['Riddler']))
+
+    def test_throttled_solver_is_kept(self):
+        competition = RiddleCompetition(riddles_per_llm=2)
+        throttled = iter([True, False] * 20)
+
+        class ThrottledError(Exception):
+            status_code = 429
+
+        def sometimes_throttled(provider, model, prompt, system_prompt=None):
+            if provider == "google" and next(throttled):
+                raise ThrottledError("rate limited")
+            return "A piano"
+
+        with patch.object(competition, '_get_unique_riddle', side_effect=fake_riddle), \
+             patch.object(competition.generator, 'get_raw_response', side_effect=sometimes_throttled):
+            results = competition.run_competition()
+        google_answers = results['detailed_results'].query("Solver == 'google'")
+        self.assertEqual(len(google_answers), 3)  # Half of its 6 answers were throttled
+        self.assertIn("google", set(results['detailed_results']['Riddler']))
+
+    def test_unknown_concurrency_mode(self):
+        with self.assertRaises(ValueError):
+            RiddleCompetition(concurrency="processes")
+
+if __name__ == '__main__':
+    unittest.main()
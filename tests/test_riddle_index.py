@@ -0,0 +1,85 @@
+import random
+import unittest
+from difflib import SequenceMatcher
+from riddlegenerator.riddle_index import RiddleIndex, normalize_text
+
+
+def linear_scan(new_riddle, used_riddles, similarity_threshold=0.6):
+    """The original O(n) similarity check the index replaces"""
+    normalized_new = normalize_text(new_riddle)
+    key_words = set(normalized_new.split())
+    for old_riddle in used_riddles:
+        normalized_old = normalize_text(old_riddle)
+        if len(key_words.intersection(normalized_old.split())) >= 3:
+            return True
+        if SequenceMatcher(None, normalized_new, normalized_old).ratio() > similarity_threshold:
+            return True
+    return False
+
+
+class TestRiddleIndex(unittest.TestCase):
+    def test_normalize_text(self):
+        self.assertEqual(normalize_text("What am I? The Echo, and a SHADOW!"), "echo shadow")
+
+    def test_shared_keywords(self):
+        index = RiddleIndex()
+        index.add("I have cities, but no houses. I have mountains, but no trees.")
+        self.assertTrue(index.is_similar("Cities without houses, mountains without trees"))
+        self.assertFalse(index.is_similar("What gets wetter the more it dries?"))
+
+    def test_character_similarity(self):
+        index = RiddleIndex()
+        index.add("What is 17 x 6?")
+        self.assertTrue(index.is_similar("What is 17 x 8?"))
+        self.assertFalse(index.is_similar("Name a bird that cannot fly"))
+
+    def test_matches_linear_scan(self):
+        rng = random.Random(7)
+        vocab = ["".join(rng.choice("abcdefghilmnoprstu") for _ in range(rng.randint(3, 7))) for _ in range(300)]
+
+        def make():
+            return " ".join(rng.choice(vocab) for _ in range(rng.randint(3, 9)))
+
+        def mutate(riddle):
+            words = riddle.split()
+            words[rng.randrange(len(words))] = rng.choice(vocab)
+            return " ".join(words)
+
+        used = [make() for _ in range(300)]
+        index = RiddleIndex()
+        for riddle in used:
+            index.add(riddle)
+
+        probes = [mutate(rng.choice(used)) for _ in range(100)] + [make() for _ in range(100)]
+        expected = [linear_scan(probe, used) for probe in probes]
+        actual = [index.is_similar(probe) for probe in probes]
+
+        # The index never flags a riddle the scan would accept, and misses at most a few near-duplicates
+        self.assertFalse(any(a and not e for a, e in zip(actual, expected)))
+        self.assertLessEqual(sum(e and not a for a, e in zip(actual, expected)), 4)
+
+
+    def test_keyword_lookup_examines_few_candidates(self):
+        rng = random.Random(3)
+        vocab = ["".join(rng.choice("abcdefghilmnoprstu") for _ in range(8)) for _ in range(5000)]
+
+        def make():
+            # Common words in every riddle, plus a few rare ones
+            return " ".join(["have", "no", "can"] + rng.sample(vocab, 4))
+
+        index = RiddleIndex()
+        for _ in range(10000):
+            index.add(make())
+        probes = [make() for _ in range(50)]
+        for probe in probes:
+            index.is_similar(probe)
+        # Every stored riddle shares the common words, but only those sharing a rare one are examined
+        self.assertLess(index.candidates_examined / len(probes), 50)
+
+        # Riddles sharing common words are still found once they share a rarer one too
+        index.add("have no can zzzunique")
+        self.assertTrue(index.is_similar("zzzunique have no"))
+
+
+if __name__ == '__main__':
+    unittest.main()
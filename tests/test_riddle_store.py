@@ -0,0 +1,53 @@
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+from riddlegenerator.riddle_competition import RiddleCompetition
+from riddlegenerator.riddle_store import RiddleStore
+
+
+class TestRiddleStore(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, 'riddles.sqlite')
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_append_and_filtered_streaming(self):
+        store = RiddleStore(self.path)
+        store.append({"type": "word", "riddle": "What has keys?", "answer": "A piano"}, "groq", "llama")
+        store.append({"type": "math", "riddle": "What is 2 + 2?", "answer": "4", "solution": "Add"}, "openai", "gpt")
+        store.append({"type": "word", "riddle": "What gets wetter?", "answer": "A towel"}, "openai", "gpt")
+
+        self.assertEqual(store.count(), 3)
+        self.assertEqual([r['riddle'] for r in store.iter_riddles(riddle_type="word")],
+                         ["What has keys?", "What gets wetter?"])
+        rows = list(store.iter_riddles(provider="openai", batch_size=1))
+        self.assertEqual([r['type'] for r in rows], ["math", "word"])
+        self.assertEqual(rows[0]['solution'], "Add")
+        self.assertEqual(rows[0]['riddler_model'], "gpt")
+        self.assertEqual([r['id'] for r in store.iter_riddles(after_id=rows[0]['id'])], [rows[1]['id']])
+        store.close()
+
+    def test_competition_dedups_against_earlier_runs(self):
+        store = RiddleStore(self.path)
+        store.append({"type": "word", "riddle": "I have cities, but no houses, mountains but no trees",
+                      "answer": "A map"}, "anthropic", "claude")
+        store.close()
+
+        competition = RiddleCompetition(riddles_per_llm=2, riddle_store_path=self.path)
+        repeat = {"type": "word", "riddle": "I have cities but no houses and mountains but no trees",
+                  "answer": "A map"}
+        fresh = {"type": "word", "riddle": "What gets wetter the more it dries?", "answer": "A towel"}
+        with patch.object(competition.generator, 'get_riddle', side_effect=[repeat, fresh]):
+            riddle_data = competition._get_unique_riddle("groq", "llama", "word")
+
+        self.assertEqual(riddle_data['riddle'], fresh['riddle'])
+        self.assertEqual(competition.riddle_store.count(riddle_type="word"), 2)
+        self.assertEqual(competition.riddle_store.count(provider="groq"), 1)
+        competition.riddle_store.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,118 @@
+import os
+import socket
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+import unittest
+from riddlegenerator.riddle_competition import RiddleCompetition, shard_of
+from riddlegenerator.riddle_store import RiddleStore
+from riddlegenerator.sharding import ShardQueue, run_sharded
+from tests.mock_config import mock_config, write_config
+
+
+class TestSharding(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.config_path = write_config(self.tmp.name, mock_config([0.7, 0.7, 0.7]))
+        self.work_dir = os.path.join(self.tmp.name, 'shards')
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_shard_assignment_is_deterministic_and_complete(self):
+        units = [(f"provider-{p}", round_num) for p in range(5) for round_num in range(20)]
+        shards = [shard_of(provider, round_num, 4) for provider, round_num in units]
+        self.assertEqual(shard_of("groq", 0, 4), shard_of("groq", 0, 4))
+        self.assertEqual(shard_of("groq", 3, 7), 6)  # crc32, not Python's randomised hash
+        self.assertEqual(set(shards), {0, 1, 2, 3})
+
+        competitions = [RiddleCompetition(riddles_per_llm=4, config_path=self.config_path, shard=(i, 3))
+                        for i in range(3)]
+        owners = [[i for i, competition in enumerate(competitions) if competition._in_shard(f"mock-{p}", r)]
+                  for p in range(3) for r in range(4)]
+        self.assertTrue(all(len(owner) == 1 for owner in owners))
+        for competition in competitions:
+            competition.generator.close()
+
+    def test_queue_claims(self):
+        queue = ShardQueue.create(self.work_dir, 3, riddles_per_llm=2, config_path=self.config_path)
+        self.assertEqual([queue.claim(), queue.claim()], [0, 1])
+        self.assertEqual(queue.status(), {"todo": 1, "claimed": 2, "done": 0})
+        self.assertEqual(queue.claim(), 2)
+        self.assertIsNone(queue.claim())
+
+        # A worker that died holding shard 1 loses it once its claim is stale
+        old = time.time() - 120
+        os.utime(os.path.join(self.work_dir, 'shards', '1.claimed'), (old, old))
+        self.assertEqual(queue.claim(stale_after=60), 1)
+        self.assertIsNone(queue.claim(stale_after=60))
+
+        # The same plan reuses the queue; a different one is refused
+        self.assertEqual(ShardQueue.create(self.work_dir, 3, riddles_per_llm=2, config_path=self.config_path).status(),
+                         {"todo": 0, "claimed": 3, "done": 0})
+        with self.assertRaises(ValueError):
+            ShardQueue.create(self.work_dir, 4, riddles_per_llm=2, config_path=self.config_path)
+        with self.assertRaises(ValueError):
+            ShardQueue.create(self.work_dir, 3, results_path="results.csv")
+        with self.assertRaises(ValueError):
+            ShardQueue.create(self.work_dir, 3, early_stopping=True)
+
+        # WAL doesn't work for machines sharing the store over a network filesystem
+        conn = sqlite3.connect(os.path.join(self.work_dir, 'riddles.sqlite'))
+        self.assertEqual(conn.execute("PRAGMA journal_mode").fetchone()[0], "delete")
+        conn.close()
+        with self.assertRaises(Exception):
+            queue.merge()
+
+    def test_abandoned_claims_are_requeued(self):
+        queue = ShardQueue.create(self.work_dir, 3, riddles_per_llm=2, config_path=self.config_path)
+        self.assertEqual([queue.claim(), queue.claim(), queue.claim()], [0, 1, 2])
+        finished = subprocess.Popen([sys.executable, "-c", "pass"])
+        finished.wait()
+        with open(os.path.join(self.work_dir, 'shards', '1.claimed'), 'w') as f:
+            f.write(f"{socket.gethostname()}:{finished.pid}\n")
+        with open(os.path.join(self.work_dir, 'shards', '2.claimed'), 'w') as f:
+            f.write(f"another-machine:{finished.pid}\n")
+        # Shard 0 is still held by this process and shard 2 by another machine
+        self.assertEqual(queue.requeue_abandoned(), [1])
+        self.assertEqual(queue.status(), {"todo": 1, "claimed": 2, "done": 0})
+
+    def test_cli_rejects_options_shards_ignore(self):
+        script = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'run_competition.py')
+        result = subprocess.run([sys.executable, script, '--shards', '2', '--resume', '--offline', '--early-stop',
+                                 '--shard-dir', self.work_dir], capture_output=True, text=True)
+        self.assertEqual(result.returncode, 2)
+        self.assertIn("--resume, --offline, --early-stop can't be used with --shards", result.stderr)
+        self.assertFalse(os.path.exists(self.work_dir))
+
+    def test_sharded_run_matches_a_single_process(self):
+        single = RiddleCompetition(riddles_per_llm=4, config_path=self.config_path)
+        expected = single.run_competition()
+        single.generator.close()
+
+        report = run_sharded(self.work_dir, 3, processes=3, riddles_per_llm=4, config_path=self.config_path)
+        results = report['detailed_results']
+        key = ['Riddler', 'Round', 'Solver']
+        self.assertEqual(sorted(map(tuple, results[key].values.tolist())),
+                         sorted(map(tuple, expected['detailed_results'][key].values.tolist())))
+
+        # Every shard's mock riddlers start from the same seed; the shared store keeps their riddles unique
+        store = RiddleStore(os.path.join(self.work_dir, 'riddles.sqlite'))
+        stored = [row['riddle'] for row in store.iter_riddles(riddle_type="word")]
+        store.close()
+        self.assertGreater(len(stored), 3)
+        self.assertEqual(len(set(stored)), len(stored))
+
+        correct = results[results['Is Correct'].astype(bool)].groupby('Solver').size().to_dict()
+        for provider, counts in report['scores'].items():
+            self.assertEqual(counts['word'] + counts['math'], correct.get(provider, 0))
+        # At least one riddle per unit plus every answer
+        self.assertGreaterEqual(sum(stats['outcomes'].get('ok', 0) for stats in report['metrics'].values()),
+                                len(results) + 12)
+        self.assertTrue(os.path.exists(os.path.join(self.work_dir, 'results.csv')))
+
+
+if __name__ == '__main__':
+    unittest.main()